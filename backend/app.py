@@ -9,12 +9,19 @@ from flask_jwt_extended import JWTManager
 import logging
 from flask_jwt_extended.exceptions import JWTExtendedException
 from flask import jsonify
+from utils.query_stats import init_query_stats
+from utils.metrics import init_metrics
 
 # Import models for migration
 from models.user import User
 from models.parking_lot import ParkingLot
 from models.parking_spot import ParkingSpot
 from models.vehicle import Vehicle
+from models.spot_change import SpotChange
+from models.revenue_daily import RevenueDaily
+from models.occupancy_sample import OccupancySample
+from models.forecast_profile import LotForecastProfile
+from models.monthly_report import MonthlyReport
 
 # Import blueprints
 from routes.auth import auth_bp
@@ -37,6 +44,8 @@ CORS(app,
 db.init_app(app)
 migrate.init_app(app, db)
 mail.init_app(app)
+init_query_stats(app)
+init_metrics(app)
 
 # Cache
 cache.init_app(app)
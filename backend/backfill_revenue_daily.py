@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Script to rebuild the revenue_daily rollup from the parking history
+
+Usage: python backfill_revenue_daily.py [--start YYYY-MM-DD] [--end YYYY-MM-DD]
+(both inclusive; without them every day is rebuilt)
+"""
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from utils.revenue import backfill_revenue_daily
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild the revenue_daily rollup')
+    parser.add_argument('--start', help='first release day to rebuild (YYYY-MM-DD)')
+    parser.add_argument('--end', help='last release day to rebuild (YYYY-MM-DD)')
+    args = parser.parse_args()
+    start = datetime.strptime(args.start, '%Y-%m-%d') if args.start else None
+    end = datetime.strptime(args.end, '%Y-%m-%d') + timedelta(days=1) if args.end else None
+
+    with app.app_context():
+        rows = backfill_revenue_daily(start, end)
+        print(f"✅ Rebuilt {rows} lot/day row(s) of revenue_daily")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark: history CSV export, load-everything vs streamed gzip
+
+Gives one user `rows` sessions (default 1,000,000) in a temporary SQLite file
+and exports them with write_history_csv() (yield_per chunks, lot joined,
+gzip), reporting wall time, peak Python memory (tracemalloc) and file size
+at growing row counts. The old task (.all() ORM objects, lot lazy-loaded,
+plain CSV) is measured up to LEGACY_MAX rows.
+
+Usage: python bench_csv_export.py [rows]   (default 1,000,000)
+"""
+import csv
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import pytz
+
+from bench_harness import make_app
+from extensions import db
+from models.parking_history import ParkingHistory
+from models.parking_lot import ParkingLot
+from utils.csv_export import export_filename, write_history_csv
+
+NUM_LOTS = 20
+LEGACY_MAX = 250000
+START = datetime(2020, 1, 1)
+
+
+def legacy_export(path):
+    """The previous export task's body"""
+    records = ParkingHistory.query.filter_by(user_id=1).order_by(ParkingHistory.parking_time.desc()).all()
+    with open(path, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(['slot_id', 'spot_id', 'lot_name', 'parking_time', 'released_time', 'cost', 'remarks'])
+        for r in records:
+            writer.writerow([
+                r.id, r.spot_id, r.lot.name if r.lot else '',
+                r.parking_time.replace(tzinfo=pytz.UTC).astimezone(pytz.timezone('Asia/Kolkata')).strftime('%Y-%m-%d %I:%M %p') if r.parking_time else '',
+                r.released_time.replace(tzinfo=pytz.UTC).astimezone(pytz.timezone('Asia/Kolkata')).strftime('%Y-%m-%d %I:%M %p') if r.released_time else '',
+                r.total_cost or 0, r.status or ''
+            ])
+    db.session.expunge_all()
+
+
+def grow(start, end):
+    db.session.execute(ParkingHistory.__table__.insert(), [{
+        'user_id': 1, 'vehicle_id': 1, 'lot_id': 1 + i % NUM_LOTS, 'spot_id': 1,
+        'parking_time': START + timedelta(minutes=i * 7), 'released_time': START + timedelta(minutes=i * 7 + 95),
+        'total_cost': 40.0, 'status': 'out'
+    } for i in range(start, end)])
+    db.session.commit()
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 2 ** 20
+
+
+def main():
+    max_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    with tempfile.TemporaryDirectory() as directory:
+        app = make_app(f"sqlite:///{os.path.join(directory, 'bench.db')}", EXPORT_DIR=directory,
+                       SQL_QUERY_BUDGET_STRICT=False)
+        with app.app_context():
+            db.session.execute(ParkingLot.__table__.insert(), [{
+                'name': f'Lot {i}', 'address': 'Bench Road', 'pincode': '600001', 'price_per_hour': 20,
+                'max_spots': 100, 'location': 'Bench Road'
+            } for i in range(NUM_LOTS)])
+            size, rows = 0, 62500
+            while size < max_rows:
+                rows = min(rows, max_rows)
+                grow(size, rows)
+                size = rows
+                filename = export_filename(1, f'bench-{rows}')
+                elapsed, peak = measure(lambda: write_history_csv(1, filename))
+                file_mb = os.path.getsize(os.path.join(directory, filename)) / 2 ** 20
+                line = f"{rows:>9,} rows  streamed gzip {elapsed:6.2f} s, peak {peak:6.1f} MiB, {file_mb:5.1f} MiB file"
+                if rows <= LEGACY_MAX:
+                    legacy_path = os.path.join(directory, f'legacy-{rows}.csv')
+                    elapsed, peak = measure(lambda: legacy_export(legacy_path))
+                    file_mb = os.path.getsize(legacy_path) / 2 ** 20
+                    line += f"  |  load-all {elapsed:6.2f} s, peak {peak:7.1f} MiB, {file_mb:5.1f} MiB file"
+                print(line)
+                rows *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Benchmark: free-spot forecast accuracy and compute time
+
+Simulates a year of sessions for a few lots (weekday commuter peaks, quieter
+weekends, log-normal stays), stores them as ParkingHistory in a temporary
+SQLite file and builds the profiles from the first 51 weeks. For every hour
+of the held-out last week it forecasts 1-4 hours ahead from the true current
+occupancy and compares with what actually happened, next to a "nothing
+changes" baseline. Also times the profile build and a single forecast.
+
+Usage: python bench_forecast.py [lots]   (default 10)
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+
+import numpy as np
+
+from bench_harness import make_app
+from extensions import db
+from models.parking_lot import ParkingLot
+from utils.forecast import (EPOCH, SLOT_SECONDS, SLOTS_PER_WEEK, build_profiles, forecast_free_spots,
+                            refresh_forecast_profiles, to_epoch)
+
+WEEKS = 52
+CAPACITY = 400
+# Monday 2025-10-20 00:00 UTC
+START = to_epoch(EPOCH + timedelta(days=20381))
+HORIZONS = (1, 2, 3, 4)
+
+
+def arrival_rates(rng, lot):
+    """Expected arrivals per 15-minute slot of the week for one lot"""
+    hours = np.arange(SLOTS_PER_WEEK) / 4 % 24
+    weekday = np.arange(SLOTS_PER_WEEK) < 5 * 96
+    morning = np.exp(-((hours - 9) ** 2) / 2)
+    evening = np.exp(-((hours - 18) ** 2) / 3)
+    base = np.where(weekday, 6 * morning + 3 * evening + 0.4, 2 * np.exp(-((hours - 13) ** 2) / 8) + 0.3)
+    return base * (0.5 + lot / 10) * rng.uniform(0.9, 1.1)
+
+
+def simulate(rng, num_lots):
+    lots, arrive, depart = [], [], []
+    slot_starts = START + np.arange(WEEKS * SLOTS_PER_WEEK) * SLOT_SECONDS
+    for lot in range(num_lots):
+        rates = np.tile(arrival_rates(rng, lot), WEEKS)
+        counts = rng.poisson(rates)
+        times = np.repeat(slot_starts, counts) + rng.integers(0, SLOT_SECONDS, counts.sum())
+        stays = np.clip(rng.lognormal(np.log(2.5 * 3600), 0.6, len(times)), 900, 14 * 3600).astype(np.int64)
+        lots.append(np.full(len(times), lot))
+        arrive.append(times)
+        depart.append(times + stays)
+    return np.concatenate(lots), np.concatenate(arrive), np.concatenate(depart)
+
+
+def store(lot_index, arrive, depart, num_lots):
+    db.session.add_all([ParkingLot(
+        name=f'Lot {i}', address='Forecast Road', pincode='600001', price_per_hour=20,
+        max_spots=CAPACITY, location='Forecast Road', total_spots=CAPACITY
+    ) for i in range(num_lots)])
+    db.session.commit()
+    as_text = lambda seconds: (EPOCH + timedelta(seconds=int(seconds))).strftime('%Y-%m-%d %H:%M:%S.000000')
+    # Sessions still open at the cutoff each hold their own spot
+    rows = [{
+        'user_id': 1, 'vehicle_id': 1, 'lot_id': int(lot) + 1, 'spot_id': 1 if d >= 0 else i + 2,
+        'parking_time': as_text(a), 'released_time': as_text(d) if d >= 0 else None,
+        'total_cost': 20.0 if d >= 0 else None, 'status': 'out' if d >= 0 else 'active'
+    } for i, (lot, a, d) in enumerate(zip(lot_index, arrive, depart))]
+    for i in range(0, len(rows), 50000):
+        db.session.execute(db.text(
+            "INSERT INTO parking_history (user_id, vehicle_id, lot_id, spot_id, parking_time, released_time, total_cost, status) "
+            "VALUES (:user_id, :vehicle_id, :lot_id, :spot_id, :parking_time, :released_time, :total_cost, :status)"
+        ), rows[i:i + 50000])
+    db.session.commit()
+
+
+def occupancy_at(arrive_sorted, depart_sorted, moments):
+    return np.searchsorted(arrive_sorted, moments, 'right') - np.searchsorted(depart_sorted, moments, 'right')
+
+
+def main():
+    num_lots = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    rng = np.random.default_rng(11)
+    lot_index, arrive, depart = simulate(rng, num_lots)
+    train_end = START + (WEEKS - 1) * 7 * 24 * 3600
+    # Only sessions that had started by the end of training are in the database
+    seen = arrive < train_end
+    depart_seen = np.where(depart < train_end, depart, -1)
+    print(f"{len(arrive):,} simulated sessions, {num_lots} lots, {WEEKS} weeks")
+
+    start = time.perf_counter()
+    build_profiles(lot_index[seen], arrive[seen], depart_seen[seen], num_lots, START, train_end)
+    print(f"NumPy binning of {seen.sum():,} sessions: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    with tempfile.TemporaryDirectory() as directory:
+        app = make_app(f"sqlite:///{os.path.join(directory, 'bench.db')}", FORECAST_HISTORY_WEEKS=WEEKS - 1)
+        with app.app_context():
+            store(lot_index[seen], arrive[seen], depart_seen[seen], num_lots)
+
+            start = time.perf_counter()
+            refresh_forecast_profiles(now=EPOCH + timedelta(seconds=train_end))
+            print(f"Nightly refresh (query + binning + store): {time.perf_counter() - start:.2f} s")
+
+            errors = {h: [] for h in HORIZONS}
+            baseline = {h: [] for h in HORIZONS}
+            timings = []
+            for lot in range(num_lots):
+                mine = lot_index == lot
+                arrive_sorted, depart_sorted = np.sort(arrive[mine]), np.sort(depart[mine])
+                for origin in range(train_end, train_end + 7 * 24 * 3600, 3600):
+                    occupied_now = int(occupancy_at(arrive_sorted, depart_sorted, [origin])[0])
+                    lot_view = SimpleNamespace(id=lot + 1, total_spots=CAPACITY, occupied_count=occupied_now)
+                    start = time.perf_counter()
+                    forecast = forecast_free_spots(lot_view, max(HORIZONS), now=EPOCH + timedelta(seconds=origin))
+                    timings.append(time.perf_counter() - start)
+                    for h in HORIZONS:
+                        actual_free = CAPACITY - occupancy_at(arrive_sorted, depart_sorted, [origin + h * 3600])[0]
+                        errors[h].append(abs(forecast[h * 4 - 1][1] - actual_free))
+                        baseline[h].append(abs((CAPACITY - occupied_now) - actual_free))
+
+    print(f"Forecast call: {np.median(timings) * 1000:.2f} ms median")
+    print(f"{'horizon':>8} {'forecast MAE':>13} {'no-change MAE':>14}   (free spots, held-out week)")
+    for h in HORIZONS:
+        print(f"{h:>7}h {np.mean(errors[h]):>13.1f} {np.mean(baseline[h]):>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Shared setup for the benchmark and self-contained test scripts.
+
+Builds a throwaway Flask app wired like app.py (same blueprints, JWT, extensions)
+but backed by SQLite and an in-process cache, so the scripts run without Redis,
+MailHog or the real parking.db. make_parking_app() adds the lot, driver and
+admin most of the tests start from.
+"""
+import os
+import sys
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token
+from werkzeug.security import generate_password_hash
+from config import Config
+from extensions import db, cache, mail
+from models.user import User
+from models.parking_lot import ParkingLot
+from models.parking_spot import ParkingSpot
+from models.vehicle import Vehicle
+from models.parking_history import ParkingHistory
+from models.base import AppConfig
+from models.spot_change import SpotChange
+from models.revenue_daily import RevenueDaily
+from models.occupancy_sample import OccupancySample
+from models.forecast_profile import LotForecastProfile
+from models.monthly_report import MonthlyReport
+from utils.query_stats import init_query_stats
+from utils.metrics import init_metrics
+from utils.search_index import ensure_search_index
+
+
+def make_app(database_uri='sqlite://', **overrides):
+    """Create an app with every blueprint registered and all tables created"""
+    from routes.auth import auth_bp
+    from routes.admin import admin_bp
+    from routes.parking import parking_bp
+
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=database_uri,
+        CACHE_TYPE='SimpleCache',
+        TESTING=True,
+        JWT_SECRET_KEY='bench-jwt-secret-key-for-local-scripts',
+        JWT_TOKEN_LOCATION=['headers'],
+        SPOT_EVENTS_REDIS_URL=None,
+        SQL_QUERY_BUDGET_STRICT=True,
+        METRICS_DIR=None,
+    )
+    app.config.update(overrides)
+
+    JWTManager(app)
+    db.init_app(app)
+    cache.init_app(app)
+    mail.init_app(app)
+    init_query_stats(app)
+    init_metrics(app)
+
+    app.register_blueprint(auth_bp, url_prefix='/api/auth')
+    app.register_blueprint(admin_bp, url_prefix='/api/admin')
+    app.register_blueprint(parking_bp, url_prefix='/api/parking')
+
+    with app.app_context():
+        db.create_all()
+        ensure_search_index()
+    return app
+
+
+def seed_lot(num_spots, occupied=0, name='Bench Lot', price_per_hour=20.0):
+    """Create a lot with spots numbered 1..num_spots, the first `occupied` of them taken"""
+    lot = ParkingLot(
+        name=name,
+        address=f'{name} Street',
+        pincode='600001',
+        price_per_hour=price_per_hour,
+        max_spots=num_spots,
+        location=f'{name} Street',
+        total_spots=num_spots,
+        occupied_count=occupied
+    )
+    db.session.add(lot)
+    db.session.flush()
+    db.session.execute(
+        ParkingSpot.__table__.insert(),
+        [{'lot_id': lot.id, 'spot_number': str(i), 'is_occupied': i <= occupied}
+         for i in range(1, num_spots + 1)]
+    )
+    db.session.commit()
+    return lot
+
+
+def make_user(email, role='user', full_name=None):
+    user = User(
+        email=email,
+        full_name=full_name or email.split('@')[0],
+        phone='0000000000',
+        password_hash=generate_password_hash('bench', method='pbkdf2:sha256:1'),
+        role=role
+    )
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def auth_headers(user):
+    return {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+
+
+def make_parking_app(num_spots=4, occupied=0, lot_name='Bench Lot', price_per_hour=20.0, plates=('TN01AB1234',),
+                     full_name=None, **overrides):
+    """
+    make_app(**overrides) with the common test fixture: one lot, a driver
+    owning a vehicle per plate and an admin. Returns (app, ctx) where ctx has
+    lot_id, spots ({number: id}), user_id, vehicle_ids, vehicle_id (the first
+    vehicle), plates and the driver's and admin's auth headers as user / admin.
+    """
+    app = make_app(**overrides)
+    with app.app_context():
+        lot = seed_lot(num_spots, occupied=occupied, name=lot_name, price_per_hour=price_per_hour)
+        user = make_user('driver@example.com', full_name=full_name)
+        vehicles = [Vehicle(user_id=user.id, license_plate=plate) for plate in plates]
+        db.session.add_all(vehicles)
+        db.session.commit()
+        ctx = {
+            'lot_id': lot.id,
+            'spots': {int(s.spot_number): s.id for s in ParkingSpot.query.filter_by(lot_id=lot.id)},
+            'user_id': user.id,
+            'vehicle_ids': [v.id for v in vehicles],
+            'vehicle_id': vehicles[0].id if vehicles else None,
+            'plates': list(plates),
+            'user': auth_headers(user),
+            'admin': auth_headers(make_user('admin@example.com', role='admin')),
+        }
+    return app, ctx
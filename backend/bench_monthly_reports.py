@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Benchmark: monthly report run, one task per user vs chunked bulk batches
+
+Creates users (default 100,000) in a temporary SQLite file with a few sessions
+each in the reported month, then builds every report message the old way (per
+user: user lookup, history query, one lot query per session, render) and with
+report_recipients() chunks through monthly_report_messages(). Sending is left
+out of both. The per-user path is only timed on the first LEGACY_MAX users
+and extrapolated.
+
+Usage: python bench_monthly_reports.py [users]   (default 100,000)
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import pytz
+from flask import render_template
+from sqlalchemy import event
+
+from bench_harness import make_app
+from extensions import db
+from models.parking_history import ParkingHistory
+from models.parking_lot import ParkingLot
+from models.user import User
+from utils.monthly_reports import month_range, monthly_report_messages, report_recipients
+
+NUM_LOTS = 20
+LEGACY_MAX = 5000
+MONTH, YEAR = 5, 2026
+
+
+def legacy_report(user_id):
+    """DB work and rendering of the previous send_monthly_report_email"""
+    start_date, end_date = month_range(MONTH, YEAR)
+    user = db.session.get(User, user_id)
+    records = ParkingHistory.query.filter(
+        ParkingHistory.user_id == user_id,
+        ParkingHistory.parking_time >= start_date,
+        ParkingHistory.parking_time < end_date
+    ).order_by(ParkingHistory.parking_time.desc()).all()
+    lot_usage = {}
+    for r in records:
+        lot_name = r.lot.name if r.lot else "Unknown"
+        lot_usage[lot_name] = lot_usage.get(lot_name, 0) + 1
+    total_hours = sum(((r.released_time or datetime.now()) - r.parking_time).total_seconds() / 3600 for r in records)
+    now_ist = datetime.now(pytz.timezone('Asia/Kolkata'))
+    render_template(
+        'monthly_report.html', user=user, total_bookings=len(records),
+        total_spent=sum(r.total_cost or 0 for r in records),
+        most_used_lot=max(lot_usage, key=lot_usage.get) if lot_usage else "N/A", records=records,
+        month=start_date.strftime('%B'), year=YEAR, current_time=now_ist.strftime('%I:%M %p'),
+        generated_date=now_ist.strftime('%B %d, %Y at %I:%M %p'),
+        avg_duration=total_hours / len(records) if records else 0, total_hours=total_hours,
+        completed_sessions=len(records), pytz=pytz, datetime=datetime
+    )
+    # Each task ran in its own session
+    db.session.expunge_all()
+
+
+def legacy_run(users):
+    for user_id in range(2, min(users, LEGACY_MAX) + 2):
+        legacy_report(user_id)
+    return min(users, LEGACY_MAX)
+
+
+def bulk_run(users):
+    reports = 0
+    for chunk in report_recipients():
+        reports += len(monthly_report_messages(chunk, MONTH, YEAR))
+        db.session.expunge_all()
+    return reports
+
+
+def populate(users):
+    db.session.execute(ParkingLot.__table__.insert(), [{
+        'name': f'Lot {i}', 'address': 'Bench Road', 'pincode': '600001', 'price_per_hour': 20,
+        'max_spots': 100, 'location': 'Bench Road'
+    } for i in range(NUM_LOTS)])
+    db.session.execute(User.__table__.insert(), [{
+        'full_name': f'Driver {i}', 'email': f'user{i}@example.com', 'phone': '0000000000',
+        'password_hash': 'x', 'role': 'user'
+    } for i in range(users)])
+    # 0-8 sessions in the month per user, plus two in the month before
+    month_start, _ = month_range(MONTH, YEAR)
+    rows = []
+    for user_id in range(2, users + 2):
+        for n in range(user_id % 9):
+            start = month_start + timedelta(days=(user_id + n * 3) % 28, hours=8 + n)
+            rows.append((user_id, start, 'out'))
+        for n in range(2):
+            rows.append((user_id, month_start - timedelta(days=3 + n), 'out'))
+    db.session.execute(ParkingHistory.__table__.insert(), [{
+        'user_id': user_id, 'vehicle_id': user_id, 'lot_id': 1 + (user_id + i) % NUM_LOTS, 'spot_id': 1,
+        'parking_time': start, 'released_time': start + timedelta(hours=2), 'total_cost': 40.0, 'status': status
+    } for i, (user_id, start, status) in enumerate(rows)])
+    db.session.commit()
+    return len(rows)
+
+
+def measure(fn, users):
+    statements = []
+    listener = lambda *args: statements.append(1)
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    start = time.perf_counter()
+    try:
+        reports = fn(users)
+    finally:
+        elapsed = time.perf_counter() - start
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    return reports, len(statements), elapsed
+
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as directory:
+        app = make_app(f"sqlite:///{os.path.join(directory, 'bench.db')}", SQL_QUERY_BUDGET_STRICT=False)
+        with app.app_context():
+            # make_app has no users; ids start at 2 so the admin-free range lines up with populate()
+            db.session.execute(User.__table__.insert(), {'full_name': 'Admin', 'email': 'admin@example.com',
+                                                         'phone': '0', 'password_hash': 'x', 'role': 'admin'})
+            sessions = populate(users)
+            print(f"{users:,} users, {sessions:,} sessions, batch size {app.config['MONTHLY_REPORT_BATCH_SIZE']}")
+            for label, fn in (('per-user tasks', legacy_run), ('bulk batches', bulk_run)):
+                reports, round_trips, elapsed = measure(fn, users)
+                line = f"  {label:>14}: {reports:,} reports, {round_trips:>7,} round trips, {elapsed:7.2f} s"
+                if reports < users:
+                    line += f"  (~{elapsed * users / reports / 60:.1f} min for all {users:,})"
+                print(line)
+
+
+if __name__ == "__main__":
+    main()
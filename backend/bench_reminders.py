@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark: daily reminder selection, per-user queries vs chunked anti-join
+
+Creates users (default 100,000) in a temporary SQLite file, a third of them
+with a session today and some with a session still open, then compares the
+database work of a reminder run: the old loop (one "parked today?" query per
+user, then per enqueued task a user, lots and open-session query) against
+reminder_recipients() chunks plus one lot query per batch. Counts round trips
+and wall time; email rendering and sending are left out of both.
+
+Usage: python bench_reminders.py [users]   (default 100,000)
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from bench_harness import make_app
+from extensions import db
+from models.parking_history import ParkingHistory
+from models.parking_lot import ParkingLot
+from models.user import User
+from utils.reminders import reminder_recipients
+
+NUM_LOTS = 20
+
+
+def legacy_reminder_run(today):
+    """DB work of the previous send_daily_email_reminders + one send_reminder_email per user"""
+    day_start = datetime.combine(today, datetime.min.time())
+    pending = []
+    for user in User.query.filter_by(role='user').all():
+        has_parked_today = ParkingHistory.query.filter(
+            ParkingHistory.user_id == user.id,
+            ParkingHistory.parking_time >= day_start,
+            ParkingHistory.parking_time < day_start + timedelta(days=1)
+        ).first() is not None
+        if not has_parked_today:
+            pending.append(user.id)
+    for user_id in pending:
+        db.session.get(User, user_id)
+        ParkingLot.query.filter_by(is_active=True).all()
+        ParkingHistory.query.filter(ParkingHistory.user_id == user_id, ParkingHistory.released_time.is_(None)).first()
+        # Each task ran in its own session
+        db.session.expunge_all()
+    return len(pending)
+
+
+def chunked_reminder_run(today):
+    recipients = 0
+    for chunk in reminder_recipients(today):
+        ParkingLot.query.filter_by(is_active=True).all()
+        recipients += len(chunk)
+    return recipients
+
+
+def populate(users, today):
+    db.session.execute(ParkingLot.__table__.insert(), [{
+        'name': f'Lot {i}', 'address': 'Bench Road', 'pincode': '600001', 'price_per_hour': 20,
+        'max_spots': 100, 'location': 'Bench Road'
+    } for i in range(NUM_LOTS)])
+    db.session.execute(User.__table__.insert(), [{
+        'full_name': f'Driver {i}', 'email': f'user{i}@example.com', 'phone': '0000000000',
+        'password_hash': 'x', 'role': 'user'
+    } for i in range(users)])
+    # Five past sessions each, a session today for every third user, an open one for every tenth
+    day_start = datetime.combine(today, datetime.min.time())
+    rows = []
+    for user_id in range(1, users + 1):
+        for back in range(1, 6):
+            start = day_start - timedelta(days=back * 3, hours=user_id % 9)
+            rows.append((user_id, start, start + timedelta(hours=2), 'out'))
+        if user_id % 3 == 0:
+            rows.append((user_id, day_start + timedelta(hours=8), day_start + timedelta(hours=9), 'out'))
+        if user_id % 10 == 0:
+            rows.append((user_id, day_start - timedelta(hours=5), None, 'active'))
+    db.session.execute(ParkingHistory.__table__.insert(), [{
+        'user_id': user_id, 'vehicle_id': user_id, 'lot_id': 1 + user_id % NUM_LOTS,
+        'spot_id': user_id if status == 'active' else 1, 'parking_time': start, 'released_time': end,
+        'total_cost': 40.0 if end else None, 'status': status
+    } for user_id, start, end, status in rows])
+    db.session.commit()
+    return len(rows)
+
+
+def measure(fn, today):
+    statements = []
+    listener = lambda *args: statements.append(1)
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    start = time.perf_counter()
+    try:
+        recipients = fn(today)
+    finally:
+        elapsed = time.perf_counter() - start
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    return recipients, len(statements), elapsed
+
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    today = datetime(2026, 6, 10).date()
+    with tempfile.TemporaryDirectory() as directory:
+        app = make_app(f"sqlite:///{os.path.join(directory, 'bench.db')}", SQL_QUERY_BUDGET_STRICT=False)
+        with app.app_context():
+            sessions = populate(users, today)
+            print(f"{users:,} users, {sessions:,} sessions, batch size {app.config['REMINDER_BATCH_SIZE']}")
+            for label, fn in (('per-user queries', legacy_reminder_run), ('chunked anti-join', chunked_reminder_run)):
+                recipients, round_trips, elapsed = measure(fn, today)
+                print(f"  {label:>18}: {recipients:,} recipients, {round_trips:>7,} round trips, {elapsed:6.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark: admin revenue summary, per-lot Python loop vs one GROUP BY
+
+Generates synthetic completed sessions (20 lots, a quarter of them without a
+total_cost so the duration fallback is exercised) in a temporary SQLite file,
+checks both implementations agree on a small set, then times the GROUP BY on
+the full set. The old loop materializes every row as an object, so it is only
+timed up to LEGACY_MAX rows. Finally builds the revenue_daily rollup and times
+the time series served from it.
+
+Usage: python bench_revenue_summary.py [rows]   (default 5,000,000)
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from bench_harness import make_app
+from extensions import db
+from models.parking_history import ParkingHistory
+from models.parking_lot import ParkingLot
+from utils.revenue import revenue_per_lot, backfill_revenue_daily, revenue_series
+
+NUM_LOTS = 20
+LEGACY_MAX = 200000
+
+
+def legacy_revenue_per_lot():
+    """The previous summary_revenue loop, kept for comparison"""
+    result = []
+    for lot in ParkingLot.query.all():
+        histories = ParkingHistory.query.filter_by(lot_id=lot.id, status='out').all()
+        total_revenue = 0.0
+        for h in histories:
+            if h.parking_time and h.released_time:
+                duration_hours = (h.released_time - h.parking_time).total_seconds() / 3600
+                total_revenue += h.total_cost or (duration_hours * lot.price_per_hour)
+        result.append((lot.id, lot.name, total_revenue))
+    return result
+
+
+def generate_history(rows):
+    """Append `rows` sessions with one INSERT ... SELECT over a recursive CTE (active ones on distinct spots)"""
+    db.session.execute(db.text("""
+        WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < :rows)
+        INSERT INTO parking_history (user_id, vehicle_id, lot_id, spot_id, parking_time, released_time, total_cost, status)
+        SELECT 1 + i % 5000, 1 + i % 8000, 1 + i % :lots, CASE WHEN i % 50 = 0 THEN i ELSE 1 + i % 2000 END,
+               datetime('2026-01-01', '+' || (i % 400000) || ' minutes'),
+               datetime('2026-01-01', '+' || (i % 400000 + 15 + i % 600) || ' minutes'),
+               CASE WHEN i % 4 = 0 THEN NULL ELSE (i % 97) * 2.5 END,
+               CASE WHEN i % 50 = 0 THEN 'active' ELSE 'out' END
+        FROM n
+    """), {'rows': rows, 'lots': NUM_LOTS})
+    db.session.commit()
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5000000
+    with tempfile.TemporaryDirectory() as directory:
+        app = make_app(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+        with app.app_context():
+            db.session.add_all([ParkingLot(
+                name=f'Lot {i}', address='Bench Road', pincode='600001', price_per_hour=10 + i,
+                max_spots=100, location='Bench Road'
+            ) for i in range(NUM_LOTS)])
+            db.session.commit()
+
+            check_rows = min(rows, LEGACY_MAX)
+            generate_history(check_rows)
+            legacy, legacy_s = timed(legacy_revenue_per_lot)
+            grouped, grouped_s = timed(revenue_per_lot)
+            assert [(i, n, round(r, 2)) for i, n, r in legacy] == [(i, n, round(r, 2)) for i, n, r in grouped]
+            print(f"{check_rows:>10,} rows  python loop {legacy_s:8.2f}s  GROUP BY {grouped_s:8.3f}s  "
+                  f"({legacy_s / grouped_s:.0f}x)")
+
+            if rows > check_rows:
+                start = time.perf_counter()
+                generate_history(rows - check_rows)
+                print(f"generated {rows:,} rows in {time.perf_counter() - start:.1f}s")
+                _, grouped_s = timed(revenue_per_lot)
+                print(f"{rows:>10,} rows  GROUP BY {grouped_s:8.3f}s")
+                _, ranged_s = timed(lambda: revenue_per_lot(datetime(2026, 3, 1), datetime(2026, 4, 1)))
+                print(f"{rows:>10,} rows  GROUP BY, one month {ranged_s:8.3f}s")
+
+            day_rows, backfill_s = timed(backfill_revenue_daily)
+            print(f"revenue_daily backfill: {day_rows} lot/day rows in {backfill_s:.2f}s")
+            for period in ('daily', 'weekly', 'monthly'):
+                for lot_id in (None, 1):
+                    series, series_s = timed(lambda: revenue_series(period, lot_id))
+                    print(f"  {period:>8} series, {'all lots' if lot_id is None else 'one lot':>8}: "
+                          f"{len(series):>4} points in {series_s * 1000:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
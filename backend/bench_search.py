@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark: admin search, full-table Python matching vs the trigram FTS5 index
+
+Grows users, lots and spots in a temporary SQLite file (the search tables are
+filled by their triggers as rows are inserted) and times each search endpoint
+for a rare and a common term at every size. The old implementations load every
+row and match in Python, so they are only timed up to LEGACY_MAX rows.
+
+Usage: python bench_search.py [max rows]   (default 400,000)
+"""
+import os
+import sys
+import tempfile
+import time
+
+from bench_harness import make_app, make_user, auth_headers
+from extensions import db
+from models.parking_lot import ParkingLot
+from models.parking_spot import ParkingSpot
+from models.user import User
+
+SPOTS_PER_LOT = 200
+LEGACY_MAX = 100000
+QUERIES = {
+    'users': [('rare', 'user12345'), ('common', 'example'), ('short', 'ab')],
+    'parking-lots': [('rare', 'harbour 77'), ('common', 'street')],
+    'parking-spots': [('rare', 'spot 4242'), ('common', 'occupied')],
+}
+
+
+def legacy_search(kind, query_str):
+    """The previous endpoints' matching loops, kept for comparison"""
+    if kind == 'users':
+        return [u.id for u in User.query.all()
+                if query_str in (u.full_name or '').lower() or query_str in (u.email or '').lower()]
+    if kind == 'parking-lots':
+        return [lot.id for lot in ParkingLot.query.all()
+                if any(query_str in value.lower() for value in (lot.name, lot.address, lot.pincode, lot.location))]
+    return [spot.id for spot in ParkingSpot.query.all()
+            if query_str in spot.lot.name.lower() or query_str in spot.spot_number.lower()
+            or query_str in ('occupied' if spot.is_occupied else 'available')]
+
+
+def grow(users, start):
+    """Add users (and a lot of SPOTS_PER_LOT spots per 1,000 users) up to `users` rows"""
+    db.session.execute(User.__table__.insert(), [{
+        'full_name': f'Driver {i}', 'email': f'user{i}@example.com', 'phone': '0000000000',
+        'password_hash': 'x', 'role': 'user'
+    } for i in range(start, users)])
+    for lot in range(start // 1000, users // 1000):
+        result = db.session.execute(ParkingLot.__table__.insert(), {
+            'name': f'Harbour {lot}', 'address': f'{lot} Main Street', 'pincode': '600001',
+            'price_per_hour': 20, 'max_spots': SPOTS_PER_LOT, 'location': 'Main Street'
+        })
+        db.session.execute(ParkingSpot.__table__.insert(), [{
+            'lot_id': result.inserted_primary_key[0], 'spot_number': f'Spot {lot * SPOTS_PER_LOT + i}',
+            'is_occupied': i % 7 == 0
+        } for i in range(SPOTS_PER_LOT)])
+    db.session.commit()
+
+
+def main():
+    max_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 400000
+    with tempfile.TemporaryDirectory() as directory:
+        app = make_app(f"sqlite:///{os.path.join(directory, 'bench.db')}", CACHE_TYPE='NullCache',
+                       SQL_QUERY_BUDGET_STRICT=False)
+        client = app.test_client()
+        with app.app_context():
+            headers = auth_headers(make_user('admin@example.com', role='admin'))
+        size, rows = 1, 12500
+        while rows <= max_rows:
+            with app.app_context():
+                grow(rows, size)
+            size = rows
+            print(f"{rows:,} users, {rows // 1000 * SPOTS_PER_LOT:,} spots")
+            for kind, queries in QUERIES.items():
+                for label, query_str in queries:
+                    url = f'/api/admin/{kind}/search?query={query_str}&limit=50'
+                    client.get(url, headers=headers)
+                    start = time.perf_counter()
+                    for _ in range(5):
+                        resp = client.get(url, headers=headers)
+                    indexed_ms = (time.perf_counter() - start) / 5 * 1000
+                    line = f"  {kind:>14} {label:>7} {len(resp.get_json()['results']):>3} hits  index {indexed_ms:7.2f} ms"
+                    if rows <= LEGACY_MAX:
+                        with app.app_context():
+                            start = time.perf_counter()
+                            legacy_search(kind, query_str)
+                            line += f"  python loop {(time.perf_counter() - start) * 1000:8.1f} ms"
+                    print(line)
+            rows *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark: spot list payload size and latency, JSON vs ?format=bitmap
+
+Builds a 10k-spot lot with 30% of the spots holding a vehicle and compares
+the default per-spot JSON with the compact bitmap payload, raw and gzipped,
+uncached (cache invalidated before every call) and cached.
+
+Usage: python bench_spot_payload.py [spots] [rounds]
+"""
+import base64
+import gzip
+import json
+import random
+import sys
+import time
+
+from bench_harness import make_app, seed_lot, make_user, auth_headers
+from extensions import db
+from models.parking_spot import ParkingSpot
+from models.vehicle import Vehicle
+from utils.cache_utils import invalidate_tags, lot_tag
+
+
+def seed_parked_lot(num_spots, occupancy=0.3):
+    lot = seed_lot(num_spots, name='Big Lot')
+    owner = make_user('fleet@example.com')
+    spot_ids = [s.id for s in ParkingSpot.query.filter_by(lot_id=lot.id).all()]
+    parked = random.sample(spot_ids, int(num_spots * occupancy))
+    db.session.execute(ParkingSpot.__table__.update().where(ParkingSpot.id.in_(parked)).values(is_occupied=True))
+    db.session.execute(Vehicle.__table__.insert(), [
+        {'user_id': owner.id, 'spot_id': spot_id, 'license_plate': f'MH12{i:06d}'}
+        for i, spot_id in enumerate(parked)
+    ])
+    lot.occupied_count = len(parked)
+    db.session.commit()
+    return lot.id, owner
+
+
+def timed_get(client, app, url, headers, lot_id, rounds, cached):
+    samples = []
+    for _ in range(rounds):
+        if not cached:
+            with app.app_context():
+                invalidate_tags(lot_tag(lot_id))
+        start = time.perf_counter()
+        resp = client.get(url, headers=headers)
+        samples.append(time.perf_counter() - start)
+        assert resp.status_code == 200
+    samples.sort()
+    return resp.get_data(), samples[len(samples) // 2] * 1000
+
+
+def main():
+    num_spots = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    random.seed(7)
+    app = make_app()
+    client = app.test_client()
+    with app.app_context():
+        lot_id, owner = seed_parked_lot(num_spots)
+        headers = auth_headers(owner)
+
+    print(f"{num_spots} spots, {int(num_spots * 0.3)} occupied")
+    print(f"{'format':>8} {'bytes':>10} {'gzipped':>9} {'uncached ms':>12} {'cached ms':>10}")
+    bodies = {}
+    for fmt in ('json', 'bitmap'):
+        url = f'/api/parking/lots/{lot_id}/spots' + ('?format=bitmap' if fmt == 'bitmap' else '')
+        body, uncached_ms = timed_get(client, app, url, headers, lot_id, rounds, cached=False)
+        _, cached_ms = timed_get(client, app, url, headers, lot_id, rounds, cached=True)
+        bodies[fmt] = body
+        print(f"{fmt:>8} {len(body):>10} {len(gzip.compress(body)):>9} {uncached_ms:>12.2f} {cached_ms:>10.2f}")
+
+    # Both formats must describe the same occupancy
+    spots = json.loads(bodies['json'])['spots']
+    occupancy = json.loads(bodies['bitmap'])['occupancy']
+    bits = base64.b64decode(occupancy['bitmap'])
+    by_number = sorted(spots, key=lambda s: int(s['spot_number']))
+    assert all(bool(bits[i >> 3] & (0x80 >> (i & 7))) == s['is_occupied'] for i, s in enumerate(by_number))
+    assert {by_number[i]['vehicle_plate'] for i, _ in occupancy['plates']} == {p for _, p in occupancy['plates']}
+    print(f"Size ratio: {len(bodies['json']) / len(bodies['bitmap']):.1f}x smaller")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 from celery import Celery
+from utils.metrics import init_celery_metrics
 
 # Import the export task to ensure it is registered with Celery
 try:
@@ -15,4 +16,5 @@ def make_celery(app):
             with app.app_context():
                 return self.run(*args, **kwargs)
     celery.Task = ContextTask
+    init_celery_metrics(celery, app.config)
     return celery 
\ No newline at end of file
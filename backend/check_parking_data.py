@@ -119,7 +119,7 @@ def create_current_month_data():
                 db.session.commit()
             
             # Get or create spot
-            spot = ParkingSpot.query.filter_by(lot_id=parking_lot.id).first()
+            spot = ParkingSpot.query.filter_by(lot_id=parking_lot.id).order_by(ParkingSpot.id).offset(i).first()
             if not spot:
                 spot = ParkingSpot(
                     lot_id=parking_lot.id,
@@ -11,6 +11,72 @@ class Config:
     CELERY_BROKER_URL = 'redis://localhost:6379/1'
     CELERY_RESULT_BACKEND = 'redis://localhost:6379/1'
     
+    # Spot change feed for /api/parking/events (unset = in-process bus)
+    SPOT_EVENTS_REDIS_URL = 'redis://localhost:6379/2'
+    SPOT_EVENTS_BACKLOG = 10000
+    SPOT_EVENTS_HEARTBEAT = 15
+    
+    # Per-lot spot change log kept for /lots/<id>/spots/changes
+    SPOT_CHANGE_LOG_SIZE = 1000
+    
+    # SQL statements allowed per request, by endpoint (see utils/query_stats.py);
+    # strict mode raises instead of logging a warning
+    SQL_QUERY_BUDGETS = {
+        'parking.get_available_lots': 2,
+        'parking.get_lot_spots': 3,
+        'parking.get_lot_spot_changes': 3,
+        'parking.get_user_vehicles': 3,
+        'parking.get_parking_history': 3,
+        'parking.get_monthly_reports': 1,
+        'parking.get_monthly_report': 6,
+        'parking.park_vehicle': 16,
+        'parking.unpark_vehicle': 16,
+        'parking.auto_park_vehicle': 20,
+        'admin.dashboard': 2,
+        'admin.dashboard_live': 2,
+        'admin.get_users': 3,
+        'admin.get_parking_lots': 3,
+        'admin.get_parking_lot_spots': 4,
+        'admin.summary_occupancy': 3,
+        'admin.summary_revenue': 3,
+    }
+    SQL_QUERY_BUDGET_DEFAULT = None
+    SQL_REPEAT_THRESHOLD = 10
+    SQL_QUERY_BUDGET_STRICT = False
+    
+    # Daily reminders (utils/reminders.py): recipients per query chunk and batch task
+    REMINDER_BATCH_SIZE = 500
+    # Monthly reports (utils/monthly_reports.py): users per aggregate query and batch task
+    MONTHLY_REPORT_BATCH_SIZE = 500
+
+    # Occupancy history (utils/occupancy.py): sample every N seconds, keep raw
+    # samples for a week, hourly rollups for longer; heatmap hours in IST
+    OCCUPANCY_SAMPLE_INTERVAL = 60
+    OCCUPANCY_RAW_RETENTION_DAYS = 7
+    OCCUPANCY_HOURLY_RETENTION_DAYS = 400
+    OCCUPANCY_UTC_OFFSET_MINUTES = 330
+    
+    # Free-spot forecasts (utils/forecast.py), profiles rebuilt nightly
+    FORECAST_HISTORY_WEEKS = 8
+    FORECAST_MAX_HOURS = 24
+    
+    # /metrics: each web and Celery worker process writes its snapshot here so
+    # a scrape of any worker reports all of them (None or an empty METRICS_DIR
+    # environment variable = this process only, nothing written)
+    METRICS_DIR = os.environ.get(
+        'METRICS_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'metrics')
+    ) or None
+    METRICS_FLUSH_INTERVAL = 5
+    # Snapshots not rewritten for this long (crashed or idle workers) are dropped
+    METRICS_MAX_AGE = 300
+    
+    # History CSV exports (utils/csv_export.py): gzip files written here,
+    # rows fetched and progress reported per chunk, files deleted after
+    # EXPORT_RETENTION seconds
+    EXPORT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'exports')
+    EXPORT_CHUNK_SIZE = 1000
+    EXPORT_RETENTION = 24 * 3600
+    
     # Email Configuration for MailHog
     MAIL_SERVER = 'localhost'
     MAIL_PORT = 1025
@@ -19,6 +85,13 @@ class Config:
     MAIL_USE_TLS = False
     MAIL_USE_SSL = False
     MAIL_DEFAULT_SENDER = 'test@example.com'
+    # Bulk sending (utils/mail_dispatch.py): emails per SMTP connection, emails
+    # per second (0 = unlimited), retry rounds for temporary failures and the
+    # wait before the first retry (doubled each round)
+    MAIL_BATCH_SIZE = 200
+    MAIL_RATE_LIMIT = 20
+    MAIL_MAX_RETRIES = 3
+    MAIL_RETRY_BACKOFF = 2.0
     
     # Session cookie settings for local development
     SESSION_COOKIE_SAMESITE = 'Lax'
@@ -0,0 +1,7 @@
+"""
+pytest setup: test runs import app/celery_app, whose metrics would otherwise
+flush per-process snapshots into instance/metrics at exit
+"""
+import os
+
+os.environ.setdefault('METRICS_DIR', '')
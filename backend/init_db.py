@@ -1,6 +1,7 @@
 from app import app
 from extensions import db
 from models.user import User
+from utils.search_index import ensure_search_index
 from werkzeug.security import generate_password_hash
 
 ADMIN_EMAIL = "admin@example.com"
@@ -8,6 +9,8 @@ ADMIN_PASSWORD = "admin123"
 
 with app.app_context():
     db.create_all()
+    # create_all() skips the FTS table and its triggers
+    ensure_search_index()
     print("All tables created!")
 
     # Check if admin exists
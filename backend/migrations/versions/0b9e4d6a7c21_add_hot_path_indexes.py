@@ -0,0 +1,53 @@
+"""add hot path indexes
+
+Revision ID: 0b9e4d6a7c21
+Revises: f2d7a91c5e38
+Create Date: 2026-10-18 16:03:52.220914
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b9e4d6a7c21'
+down_revision = 'f2d7a91c5e38'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('parking_history', schema=None) as batch_op:
+        batch_op.create_index('ix_parking_history_user_time', ['user_id', 'parking_time'], unique=False)
+        batch_op.create_index('ix_parking_history_active', ['vehicle_id', 'spot_id'], unique=False,
+                              sqlite_where=sa.text("status = 'active'"))
+        batch_op.create_index('ix_parking_history_open_user', ['user_id'], unique=False,
+                              sqlite_where=sa.text('released_time IS NULL'))
+        batch_op.create_index('ix_parking_history_out_released', ['released_time', 'lot_id'], unique=False,
+                              sqlite_where=sa.text("status = 'out'"))
+
+    with op.batch_alter_table('parking_spot', schema=None) as batch_op:
+        batch_op.create_index('ix_parking_spot_lot_occupied', ['lot_id', 'is_occupied'], unique=False)
+
+    with op.batch_alter_table('vehicle', schema=None) as batch_op:
+        batch_op.create_index('ix_vehicle_user_id', ['user_id'], unique=False)
+        batch_op.create_index('ix_vehicle_spot_id', ['spot_id'], unique=False,
+                              sqlite_where=sa.text('spot_id IS NOT NULL'))
+
+    # Refresh the planner statistics so the new indexes are picked up
+    op.execute('ANALYZE')
+
+
+def downgrade():
+    with op.batch_alter_table('vehicle', schema=None) as batch_op:
+        batch_op.drop_index('ix_vehicle_spot_id')
+        batch_op.drop_index('ix_vehicle_user_id')
+
+    with op.batch_alter_table('parking_spot', schema=None) as batch_op:
+        batch_op.drop_index('ix_parking_spot_lot_occupied')
+
+    with op.batch_alter_table('parking_history', schema=None) as batch_op:
+        batch_op.drop_index('ix_parking_history_out_released')
+        batch_op.drop_index('ix_parking_history_open_user')
+        batch_op.drop_index('ix_parking_history_active')
+        batch_op.drop_index('ix_parking_history_user_time')
@@ -0,0 +1,35 @@
+"""add occupancy counters to parking_lot
+
+Revision ID: 3f0c9a7d21e4
+Revises: 85e46796b4a7
+Create Date: 2026-10-18 10:12:40.218311
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f0c9a7d21e4'
+down_revision = '85e46796b4a7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('parking_lot', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('total_spots', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('occupied_count', sa.Integer(), nullable=False, server_default='0'))
+
+    # Backfill from the existing spots
+    op.execute("""
+        UPDATE parking_lot SET
+            total_spots = (SELECT COUNT(*) FROM parking_spot WHERE parking_spot.lot_id = parking_lot.id),
+            occupied_count = (SELECT COUNT(*) FROM parking_spot WHERE parking_spot.lot_id = parking_lot.id AND parking_spot.is_occupied = 1)
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('parking_lot', schema=None) as batch_op:
+        batch_op.drop_column('occupied_count')
+        batch_op.drop_column('total_spots')
@@ -0,0 +1,79 @@
+"""add parking_spot.current_history_id
+
+Revision ID: 6c1f8e3b2a94
+Revises: 0b9e4d6a7c21
+Create Date: 2026-10-18 16:41:09.537102
+
+Adds parking_spot.current_history_id (a foreign key to parking_history) and a
+unique partial index allowing one active session per spot. To make that index
+possible, duplicate active sessions on a spot are closed first: all but the
+newest get status 'out', released_time = parking_time and total_cost 0. That
+rewrite is permanent; downgrade drops the column and index but cannot restore
+the closed sessions.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6c1f8e3b2a94'
+down_revision = '0b9e4d6a7c21'
+branch_labels = None
+depends_on = None
+
+# The spot search index's sync triggers, as in f2d7a91c5e38
+SPOT_SEARCH_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS spot_search_ai AFTER INSERT ON "parking_spot" BEGIN
+        INSERT INTO spot_search(rowid, spot_number) VALUES (new.id, new.spot_number); END""",
+    """CREATE TRIGGER IF NOT EXISTS spot_search_ad AFTER DELETE ON "parking_spot" BEGIN
+        INSERT INTO spot_search(spot_search, rowid, spot_number) VALUES ('delete', old.id, old.spot_number); END""",
+    """CREATE TRIGGER IF NOT EXISTS spot_search_au AFTER UPDATE OF spot_number ON "parking_spot" BEGIN
+        INSERT INTO spot_search(spot_search, rowid, spot_number) VALUES ('delete', old.id, old.spot_number);
+        INSERT INTO spot_search(rowid, spot_number) VALUES (new.id, new.spot_number); END""",
+]
+
+
+def upgrade():
+    # SQLite can only add the foreign key by rebuilding the table, which drops
+    # the search-index triggers on parking_spot; they are recreated below
+    with op.batch_alter_table('parking_spot', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('current_history_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_parking_spot_current_history_id', 'parking_history',
+                                    ['current_history_id'], ['id'], ondelete='SET NULL')
+    for statement in SPOT_SEARCH_TRIGGERS:
+        op.execute(statement)
+
+    # Older races could leave several active sessions on one spot; keep the
+    # latest and close the rest as zero-length sessions (not undone by downgrade)
+    op.execute("""
+        UPDATE parking_history
+        SET status = 'out', released_time = parking_time, total_cost = 0
+        WHERE status = 'active' AND id NOT IN (
+            SELECT MAX(id) FROM parking_history WHERE status = 'active' GROUP BY spot_id
+        )
+    """)
+    with op.batch_alter_table('parking_history', schema=None) as batch_op:
+        batch_op.drop_index('ix_parking_history_active')
+        batch_op.create_index('uq_parking_history_active_spot', ['spot_id'], unique=True,
+                              sqlite_where=sa.text("status = 'active'"))
+
+    op.execute("""
+        UPDATE parking_spot
+        SET current_history_id = (
+            SELECT id FROM parking_history
+            WHERE parking_history.spot_id = parking_spot.id AND parking_history.status = 'active'
+        )
+        WHERE is_occupied
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('parking_history', schema=None) as batch_op:
+        batch_op.drop_index('uq_parking_history_active_spot')
+        batch_op.create_index('ix_parking_history_active', ['vehicle_id', 'spot_id'], unique=False,
+                              sqlite_where=sa.text("status = 'active'"))
+    with op.batch_alter_table('parking_spot', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_parking_spot_current_history_id', type_='foreignkey')
+        batch_op.drop_column('current_history_id')
+    for statement in SPOT_SEARCH_TRIGGERS:
+        op.execute(statement)
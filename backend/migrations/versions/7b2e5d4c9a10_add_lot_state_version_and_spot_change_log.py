@@ -0,0 +1,39 @@
+"""add lot state_version and spot_change log
+
+Revision ID: 7b2e5d4c9a10
+Revises: 3f0c9a7d21e4
+Create Date: 2026-10-18 11:02:17.540982
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b2e5d4c9a10'
+down_revision = '3f0c9a7d21e4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('parking_lot', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('state_version', sa.Integer(), nullable=False, server_default='0'))
+
+    op.create_table('spot_change',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('lot_id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('spot_id', sa.Integer(), nullable=False),
+    sa.Column('is_occupied', sa.Boolean(), nullable=False),
+    sa.Column('vehicle_plate', sa.String(length=20), nullable=True),
+    sa.ForeignKeyConstraint(['lot_id'], ['parking_lot.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('lot_id', 'version', name='uq_spot_change_lot_version')
+    )
+
+
+def downgrade():
+    op.drop_table('spot_change')
+    with op.batch_alter_table('parking_lot', schema=None) as batch_op:
+        batch_op.drop_column('state_version')
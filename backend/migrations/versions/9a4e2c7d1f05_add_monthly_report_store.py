@@ -0,0 +1,33 @@
+"""add monthly_report store
+
+Revision ID: 9a4e2c7d1f05
+Revises: 6c1f8e3b2a94
+Create Date: 2026-10-18 16:02:47.318552
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a4e2c7d1f05'
+down_revision = '6c1f8e3b2a94'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('monthly_report',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('month', sa.Integer(), nullable=False),
+    sa.Column('data', sa.Text(), nullable=False),
+    sa.Column('html', sa.Text(), nullable=False),
+    sa.Column('generated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'year', 'month')
+    )
+
+
+def downgrade():
+    op.drop_table('monthly_report')
@@ -0,0 +1,44 @@
+"""add revenue_daily rollup
+
+Revision ID: c41e8a2f6b37
+Revises: 7b2e5d4c9a10
+Create Date: 2026-10-18 11:48:05.318240
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41e8a2f6b37'
+down_revision = '7b2e5d4c9a10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('revenue_daily',
+    sa.Column('lot_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.Column('sessions', sa.Integer(), nullable=False),
+    sa.Column('hours', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['lot_id'], ['parking_lot.id'], ),
+    sa.PrimaryKeyConstraint('lot_id', 'day')
+    )
+
+    # Backfill from the completed sessions (same rules as utils/revenue.py)
+    op.execute("""
+        INSERT INTO revenue_daily (lot_id, day, revenue, sessions, hours)
+        SELECT h.lot_id, date(h.released_time),
+               SUM(COALESCE(NULLIF(h.total_cost, 0), (julianday(h.released_time) - julianday(h.parking_time)) * 24 * l.price_per_hour)),
+               COUNT(*),
+               SUM((julianday(h.released_time) - julianday(h.parking_time)) * 24)
+        FROM parking_history h JOIN parking_lot l ON l.id = h.lot_id
+        WHERE h.status = 'out' AND h.parking_time IS NOT NULL AND h.released_time IS NOT NULL
+        GROUP BY h.lot_id, date(h.released_time)
+    """)
+
+
+def downgrade():
+    op.drop_table('revenue_daily')
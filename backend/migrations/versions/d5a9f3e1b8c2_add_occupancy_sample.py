@@ -0,0 +1,39 @@
+"""add occupancy_sample
+
+Revision ID: d5a9f3e1b8c2
+Revises: c41e8a2f6b37
+Create Date: 2026-10-18 12:06:41.902573
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5a9f3e1b8c2'
+down_revision = 'c41e8a2f6b37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('occupancy_sample',
+    sa.Column('lot_id', sa.Integer(), nullable=False),
+    sa.Column('ts', sa.DateTime(), nullable=False),
+    sa.Column('resolution', sa.Integer(), nullable=False),
+    sa.Column('samples', sa.Integer(), nullable=False),
+    sa.Column('occupied_sum', sa.Integer(), nullable=False),
+    sa.Column('occupied_min', sa.Integer(), nullable=False),
+    sa.Column('occupied_max', sa.Integer(), nullable=False),
+    sa.Column('capacity_sum', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['lot_id'], ['parking_lot.id'], ),
+    sa.PrimaryKeyConstraint('lot_id', 'ts', 'resolution')
+    )
+    with op.batch_alter_table('occupancy_sample', schema=None) as batch_op:
+        batch_op.create_index('ix_occupancy_sample_ts', ['ts'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('occupancy_sample', schema=None) as batch_op:
+        batch_op.drop_index('ix_occupancy_sample_ts')
+    op.drop_table('occupancy_sample')
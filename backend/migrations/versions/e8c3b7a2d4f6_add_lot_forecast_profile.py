@@ -0,0 +1,32 @@
+"""add lot_forecast_profile
+
+Revision ID: e8c3b7a2d4f6
+Revises: d5a9f3e1b8c2
+Create Date: 2026-10-18 12:31:09.774120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8c3b7a2d4f6'
+down_revision = 'd5a9f3e1b8c2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('lot_forecast_profile',
+    sa.Column('lot_id', sa.Integer(), nullable=False),
+    sa.Column('arrivals', sa.LargeBinary(), nullable=False),
+    sa.Column('departures', sa.LargeBinary(), nullable=False),
+    sa.Column('weeks', sa.Integer(), nullable=False),
+    sa.Column('built_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['lot_id'], ['parking_lot.id'], ),
+    sa.PrimaryKeyConstraint('lot_id')
+    )
+
+
+def downgrade():
+    op.drop_table('lot_forecast_profile')
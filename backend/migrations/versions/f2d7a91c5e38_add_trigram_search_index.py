@@ -0,0 +1,44 @@
+"""add trigram search index
+
+Revision ID: f2d7a91c5e38
+Revises: e8c3b7a2d4f6
+Create Date: 2026-10-18 15:12:27.418306
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2d7a91c5e38'
+down_revision = 'e8c3b7a2d4f6'
+branch_labels = None
+depends_on = None
+
+# base table -> (search table, indexed columns), as in utils/search_index.py
+SEARCH_INDEXES = {
+    'user': ('user_search', ('full_name', 'email')),
+    'parking_lot': ('lot_search', ('name', 'address', 'pincode', 'location')),
+    'parking_spot': ('spot_search', ('spot_number',)),
+}
+
+
+def upgrade():
+    for base, (index, columns) in SEARCH_INDEXES.items():
+        cols = ', '.join(columns)
+        new = ', '.join(f'new.{c}' for c in columns)
+        old = ', '.join(f'old.{c}' for c in columns)
+        delete_old = f"INSERT INTO {index}({index}, rowid, {cols}) VALUES ('delete', old.id, {old});"
+        insert_new = f"INSERT INTO {index}(rowid, {cols}) VALUES (new.id, {new});"
+        op.execute(f"CREATE VIRTUAL TABLE {index} USING fts5("
+                   f"{cols}, content='{base}', content_rowid='id', tokenize='trigram')")
+        op.execute(f'CREATE TRIGGER {index}_ai AFTER INSERT ON "{base}" BEGIN {insert_new} END')
+        op.execute(f'CREATE TRIGGER {index}_ad AFTER DELETE ON "{base}" BEGIN {delete_old} END')
+        op.execute(f'CREATE TRIGGER {index}_au AFTER UPDATE OF {cols} ON "{base}" BEGIN {delete_old} {insert_new} END')
+        op.execute(f"INSERT INTO {index}({index}) VALUES ('rebuild')")
+
+
+def downgrade():
+    for base, (index, columns) in SEARCH_INDEXES.items():
+        for suffix in ('ai', 'ad', 'au'):
+            op.execute(f'DROP TRIGGER IF EXISTS {index}_{suffix}')
+        op.execute(f'DROP TABLE IF EXISTS {index}')
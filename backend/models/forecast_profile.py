@@ -0,0 +1,14 @@
+from extensions import db
+from datetime import datetime
+
+class LotForecastProfile(db.Model):
+    """
+    Mean arrivals and departures per 15-minute slot of the week (Monday 00:00
+    UTC first) for one lot, as float32 arrays, see utils/forecast.py
+    """
+    __tablename__ = 'lot_forecast_profile'
+    lot_id = db.Column(db.Integer, db.ForeignKey('parking_lot.id'), primary_key=True)
+    arrivals = db.Column(db.LargeBinary, nullable=False)
+    departures = db.Column(db.LargeBinary, nullable=False)
+    weeks = db.Column(db.Integer, nullable=False)
+    built_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,16 @@
+from extensions import db
+from datetime import datetime
+
+class MonthlyReport(db.Model):
+    """
+    A user's report for a closed month: the aggregates as JSON and the rendered
+    email HTML, see utils/monthly_reports.py. Rows are deleted when a session
+    in that month is added, edited or removed.
+    """
+    __tablename__ = 'monthly_report'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    year = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Integer, primary_key=True)
+    data = db.Column(db.Text, nullable=False)
+    html = db.Column(db.Text, nullable=False)
+    generated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
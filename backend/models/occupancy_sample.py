@@ -0,0 +1,19 @@
+from extensions import db
+
+class OccupancySample(db.Model):
+    """
+    Occupancy of a lot over [ts, ts + resolution seconds), see utils/occupancy.py.
+    Raw samples cover one sampling interval; older ones are merged into hourly
+    rows. Sums (not averages) are stored so merged rows stay exact.
+    """
+    __tablename__ = 'occupancy_sample'
+    lot_id = db.Column(db.Integer, db.ForeignKey('parking_lot.id'), primary_key=True)
+    ts = db.Column(db.DateTime, primary_key=True)
+    resolution = db.Column(db.Integer, primary_key=True)
+    samples = db.Column(db.Integer, nullable=False)
+    occupied_sum = db.Column(db.Integer, nullable=False)
+    occupied_min = db.Column(db.Integer, nullable=False)
+    occupied_max = db.Column(db.Integer, nullable=False)
+    capacity_sum = db.Column(db.Integer, nullable=False)
+
+    __table_args__ = (db.Index('ix_occupancy_sample_ts', 'ts'),)
@@ -14,4 +14,14 @@ class ParkingHistory(db.Model):
 
     user = db.relationship('User', backref='parking_history', lazy=True)
     vehicle = db.relationship('Vehicle', backref='parking_history', lazy=True)
-    lot = db.relationship('ParkingLot', backref='parking_history', lazy=True) 
\ No newline at end of file
+    lot = db.relationship('ParkingLot', backref='parking_history', lazy=True)
+
+    __table_args__ = (
+        # A user's history, newest first (history page, reminders, monthly reports)
+        db.Index('ix_parking_history_user_time', 'user_id', 'parking_time'),
+        # At most one active session per spot, see ParkingSpot.current_history_id
+        db.Index('uq_parking_history_active_spot', 'spot_id', unique=True, sqlite_where=db.text("status = 'active'")),
+        db.Index('ix_parking_history_open_user', 'user_id', sqlite_where=db.text('released_time IS NULL')),
+        # Completed sessions by release time (revenue summaries and rollup backfill)
+        db.Index('ix_parking_history_out_released', 'released_time', 'lot_id', sqlite_where=db.text("status = 'out'")),
+    ) 
\ No newline at end of file
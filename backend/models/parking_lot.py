@@ -8,4 +8,11 @@ class ParkingLot(db.Model):
     price_per_hour = db.Column(db.Float, nullable=False)
     max_spots = db.Column(db.Integer, nullable=False)
     location = db.Column(db.String(200), nullable=False)
+    # Inactive lots are hidden from reminder emails
+    is_active = db.Column(db.Boolean, nullable=False, default=True, server_default='1')
+    # Denormalized counters, kept in step with parking_spot by park/unpark and lot edits
+    total_spots = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    occupied_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Bumped on every spot change, see models/spot_change.py
+    state_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     spots = db.relationship('ParkingSpot', backref='lot', lazy=True) 
\ No newline at end of file
@@ -5,4 +5,11 @@ class ParkingSpot(db.Model):
     lot_id = db.Column(db.Integer, db.ForeignKey('parking_lot.id'), nullable=False)
     spot_number = db.Column(db.String(20), nullable=False)
     is_occupied = db.Column(db.Boolean, default=False)
-    vehicle = db.relationship('Vehicle', backref='spot', uselist=False) 
\ No newline at end of file
+    # The spot's active ParkingHistory row, set on park and cleared on unpark.
+    # use_alter: parking_history.spot_id points back here
+    current_history_id = db.Column(db.Integer, db.ForeignKey(
+        'parking_history.id', name='fk_parking_spot_current_history_id', ondelete='SET NULL', use_alter=True
+    ), nullable=True)
+    vehicle = db.relationship('Vehicle', backref='spot', uselist=False)
+
+    __table_args__ = (db.Index('ix_parking_spot_lot_occupied', 'lot_id', 'is_occupied'),) 
\ No newline at end of file
@@ -0,0 +1,10 @@
+from extensions import db
+
+class RevenueDaily(db.Model):
+    """Completed-session revenue per lot and release day (UTC), see utils/revenue.py"""
+    __tablename__ = 'revenue_daily'
+    lot_id = db.Column(db.Integer, db.ForeignKey('parking_lot.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+    sessions = db.Column(db.Integer, nullable=False, default=0)
+    hours = db.Column(db.Float, nullable=False, default=0.0)
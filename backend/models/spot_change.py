@@ -0,0 +1,13 @@
+from extensions import db
+
+class SpotChange(db.Model):
+    """Bounded per-lot log of spot changes, one row per ParkingLot.state_version"""
+    __tablename__ = 'spot_change'
+    id = db.Column(db.Integer, primary_key=True)
+    lot_id = db.Column(db.Integer, db.ForeignKey('parking_lot.id'), nullable=False)
+    version = db.Column(db.Integer, nullable=False)
+    spot_id = db.Column(db.Integer, nullable=False)
+    is_occupied = db.Column(db.Boolean, nullable=False)
+    vehicle_plate = db.Column(db.String(20), nullable=True)
+
+    __table_args__ = (db.UniqueConstraint('lot_id', 'version', name='uq_spot_change_lot_version'),)
@@ -4,4 +4,10 @@ class Vehicle(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     spot_id = db.Column(db.Integer, db.ForeignKey('parking_spot.id'))
-    license_plate = db.Column(db.String(20), unique=True, nullable=False) 
\ No newline at end of file
+    license_plate = db.Column(db.String(20), unique=True, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_vehicle_user_id', 'user_id'),
+        # Only parked vehicles, for the spot -> vehicle joins
+        db.Index('ix_vehicle_spot_id', 'spot_id', sqlite_where=db.text('spot_id IS NOT NULL')),
+    ) 
\ No newline at end of file
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Script to check and repair the per-lot occupancy counters
+
+Usage: python reconcile_lot_counters.py [--dry-run]
+"""
+import os
+import sys
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from utils.lot_counters import reconcile_lot_counters
+
+
+def main():
+    dry_run = '--dry-run' in sys.argv
+    with app.app_context():
+        changes = reconcile_lot_counters(dry_run=dry_run)
+        if not changes:
+            print("✅ All lot counters are in sync")
+            return
+        print(f"{'Would fix' if dry_run else 'Fixed'} {len(changes)} lot(s):")
+        for change in changes:
+            old_total, new_total = change['total_spots']
+            old_occupied, new_occupied = change['occupied_count']
+            print(f"   - {change['lot_name']} (ID: {change['lot_id']}): "
+                  f"total_spots {old_total} -> {new_total}, occupied_count {old_occupied} -> {new_occupied}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,23 +5,72 @@ from models.parking_lot import ParkingLot
 from models.parking_spot import ParkingSpot
 from models.vehicle import Vehicle
 from models.parking_history import ParkingHistory
-from extensions import db, cache
-from sqlalchemy import func, cast, Integer
+from extensions import db
+from sqlalchemy import func, cast, insert, Integer
 from datetime import datetime, timedelta
 import pytz
 import os
+import json
 from flask import send_from_directory
 from celery.result import AsyncResult
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models.base import AppConfig
+from utils import spot_allocator
+from utils.parking_ops import reset_spot_changes
+from utils.spot_payloads import lot_spot_rows, lot_spot_bitmap
+from utils.revenue import revenue_per_lot, revenue_series, PERIOD_FORMATS
+from utils.occupancy import occupancy_stats, occupancy_heatmap
+from utils.search_index import search_table, match_condition, matching_ids
+from utils.dashboard_stats import dashboard_stats, live_spot_stats
+from utils.csv_export import export_status, send_export
+from utils.cache_utils import cached_view, invalidate_tags, lot_tag, user_tag, LOTS_ALL, USERS_ALL
 # Do NOT import from tasks at the top level
 
 admin_bp = Blueprint('admin', __name__)
 
+USERS_PAGE_SIZE = 50
+USERS_PAGE_MAX = 500
+SEARCH_PAGE_SIZE = 50
+SEARCH_PAGE_MAX = 500
+USER_SORT_FIELDS = {
+    'id': User.id,
+    'full_name': User.full_name,
+    'email': User.email,
+    'phone': User.phone
+}
+
+def search_args():
+    """(query, limit, offset) from the request, for the search endpoints"""
+    query_str = request.args.get('query', '').strip().lower()
+    limit = min(max(request.args.get('limit', SEARCH_PAGE_SIZE, type=int), 1), SEARCH_PAGE_MAX)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    return query_str, limit, offset
+
+def search_cache_key(prefix):
+    query_str, limit, offset = search_args()
+    return f"{prefix}_{query_str}_{limit}_{offset}"
+
+def search_page(query, order_by, limit, offset):
+    """Run a search query for one page; returns (rows, has_more)"""
+    rows = query.order_by(order_by).offset(offset).limit(limit + 1).all()
+    return rows[:limit], len(rows) > limit
+
+def search_response(results, limit, offset, has_more):
+    return jsonify({'results': results, 'limit': limit, 'offset': offset, 'has_more': has_more}), 200
+
 def get_current_user():
     user_id = get_jwt_identity()
     return User.query.get(user_id)
 
+def date_range_args():
+    """Optional inclusive ?start=&end= dates (YYYY-MM-DD) as a [start, end) datetime range"""
+    start = request.args.get('start')
+    end = request.args.get('end')
+    return (
+        datetime.strptime(start, '%Y-%m-%d') if start else None,
+        datetime.strptime(end, '%Y-%m-%d') + timedelta(days=1) if end else None
+    )
+
 def admin_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -34,50 +83,55 @@ def admin_required(f):
 @admin_bp.route('/dashboard', methods=['GET'])
 @jwt_required()
 @admin_required
+@cached_view('admin_dashboard', tags=[LOTS_ALL, USERS_ALL], timeout=60, etag=True, cache_control='private, no-cache')
 def dashboard():
-    # Get statistics
-    total_users = User.query.count()
-    total_lots = ParkingLot.query.count()
-    total_spots = ParkingSpot.query.count()
-    occupied_spots = ParkingSpot.query.filter_by(is_occupied=True).count()
-    total_vehicles = Vehicle.query.count()
-    
-    return jsonify({
-        'stats': {
-            'total_users': total_users,
-            'total_lots': total_lots,
-            'total_spots': total_spots,
-            'occupied_spots': occupied_spots,
-            'available_spots': total_spots - occupied_spots,
-            'total_vehicles': total_vehicles
-        }
-    }), 200
+    # One statement over the lot counters, see utils/dashboard_stats.py
+    return jsonify({'stats': dashboard_stats()}), 200
+
+@admin_bp.route('/dashboard/live', methods=['GET'])
+@jwt_required()
+@admin_required
+@cached_view('admin_dashboard_live', tags=[LOTS_ALL], timeout=60, etag=True, cache_control='private, no-cache')
+def dashboard_live():
+    # Polled every second by open admin tabs; unchanged counters answer 304 from the cache
+    return jsonify({'stats': live_spot_stats()}), 200
 
 @admin_bp.route('/users', methods=['GET'])
 @jwt_required()
 @admin_required
 def get_users():
-    user = get_current_user()
-    if not user:
-        return jsonify({'error': 'Not logged in'}), 401
-    if user.role != 'admin':
-        return jsonify({'error': 'Access denied'}), 403
-    users = User.query.filter_by(role='user').all()
+    sort_column = USER_SORT_FIELDS.get(request.args.get('sort', 'id'))
+    if sort_column is None:
+        return jsonify({'error': f"sort must be one of: {', '.join(USER_SORT_FIELDS)}"}), 400
+    descending = request.args.get('order', 'asc').lower() == 'desc'
+    page = request.args.get('page', type=int)
+    per_page = min(max(request.args.get('per_page', USERS_PAGE_SIZE, type=int), 1), USERS_PAGE_MAX)
+
+    # Currently parked vehicles per user, aggregated to a JSON array in SQL
+    current_spots = db.session.query(func.json_group_array(func.json_object(
+        'lot_name', ParkingLot.name,
+        'spot_number', ParkingSpot.spot_number,
+        'license_plate', Vehicle.license_plate,
+        'vehicle_id', Vehicle.id,
+        'spot_id', ParkingSpot.id
+    ))).select_from(Vehicle).join(
+        ParkingSpot, ParkingSpot.id == Vehicle.spot_id
+    ).join(
+        ParkingLot, ParkingLot.id == ParkingSpot.lot_id
+    ).filter(Vehicle.user_id == User.id).correlate(User).scalar_subquery()
+
+    # One statement per page: the users, their spots and the total count
+    query = db.session.query(User, current_spots, func.count().over()).filter(User.role == 'user').order_by(
+        sort_column.desc() if descending else sort_column.asc(),
+        User.id.desc() if descending else User.id.asc()
+    )
+    if page:
+        query = query.offset((max(page, 1) - 1) * per_page).limit(per_page)
+    rows = query.all()
+    total = rows[0][2] if rows else User.query.filter_by(role='user').count()
+
     result = []
-    for user in users:
-        # Find all vehicles currently parked
-        current_spots = []
-        for vehicle in user.vehicles:
-            if vehicle.spot_id:
-                spot = vehicle.spot
-                lot = spot.lot if spot else None
-                current_spots.append({
-                    'lot_name': lot.name if lot else None,
-                    'spot_number': spot.spot_number if spot else None,
-                    'license_plate': vehicle.license_plate,
-                    'vehicle_id': vehicle.id,
-                    'spot_id': spot.id if spot else None
-                })
+    for user, spots_json, _ in rows:
         result.append({
             'id': user.id,
             'email': user.email,
@@ -86,9 +140,16 @@ def get_users():
             'phone': user.phone,
             'address': user.address if hasattr(user, 'address') else '',
             'pincode': user.pincode if hasattr(user, 'pincode') else '',
-            'current_spots': current_spots
+            'current_spots': json.loads(spots_json) if spots_json else []
         })
-    return jsonify({'users': result}), 200
+    response = jsonify({
+        'users': result,
+        'total': total,
+        'page': page,
+        'per_page': per_page if page else None
+    })
+    response.headers['X-Total-Count'] = str(total)
+    return response, 200
 
 @admin_bp.route('/users/<int:user_id>', methods=['PUT'])
 @jwt_required()
@@ -105,8 +166,7 @@ def update_user(user_id):
         user.phone = data['phone']
     
     db.session.commit()
-    cache.delete('admin_users')
-    cache.delete('admin_users_search_')
+    invalidate_tags(user_tag(user_id), USERS_ALL)
     return jsonify({'message': 'User updated successfully'}), 200
 
 @admin_bp.route('/users/<int:user_id>', methods=['DELETE'])
@@ -116,38 +176,38 @@ def delete_user(user_id):
     user = User.query.get_or_404(user_id)
     db.session.delete(user)
     db.session.commit()
-    cache.delete('admin_users')
-    cache.delete('admin_users_search_')
+    invalidate_tags(user_tag(user_id), USERS_ALL)
     return jsonify({'message': 'User deleted successfully'}), 200
 
 @admin_bp.route('/users/search', methods=['GET'])
 @jwt_required()
 @admin_required
-@cache.cached(timeout=30, key_prefix=lambda: f"admin_users_search_{request.args.get('query', '').lower()}")
+@cached_view(lambda: search_cache_key('admin_users_search'), tags=[USERS_ALL], timeout=30)
 def search_users():
-    query_str = request.args.get('query', '').lower()
-    users = User.query.all()
-    results = []
-    for user in users:
-        if (query_str in (user.full_name or '').lower() or
-            query_str in (user.email or '').lower() or
-            query_str in (getattr(user, 'address', '') or '').lower() or
-            query_str in (getattr(user, 'pincode', '') or '')):
-            results.append({
-                'id': user.id,
-                'email': user.email,
-                'full_name': user.full_name,
-                'role': user.role,
-                'phone': user.phone,
-                'address': getattr(user, 'address', ''),
-                'pincode': getattr(user, 'pincode', '')
-            })
-    return jsonify({'results': results}), 200
+    query_str, limit, offset = search_args()
+    query = User.query
+    order_by = User.id
+    if query_str:
+        # Driven by the trigram index, see utils/search_index.py
+        fts = search_table('user')
+        query = query.join(fts, fts.c.rowid == User.id).filter(match_condition('user', query_str))
+        order_by = fts.c.rowid
+    users, has_more = search_page(query, order_by, limit, offset)
+    results = [{
+        'id': user.id,
+        'email': user.email,
+        'full_name': user.full_name,
+        'role': user.role,
+        'phone': user.phone,
+        'address': getattr(user, 'address', ''),
+        'pincode': getattr(user, 'pincode', '')
+    } for user in users]
+    return search_response(results, limit, offset, has_more)
 
 @admin_bp.route('/parking-lots', methods=['GET'])
 @jwt_required()
 @admin_required
-@cache.cached(timeout=60, key_prefix='admin_parking_lots')
+@cached_view('admin_parking_lots', tags=[LOTS_ALL], timeout=60, etag=True, cache_control='private, no-cache')
 def get_parking_lots():
     lots = ParkingLot.query.all()
     return jsonify({
@@ -158,8 +218,8 @@ def get_parking_lots():
             'pincode': lot.pincode if hasattr(lot, 'pincode') else '',
             'price_per_hour': lot.price_per_hour if hasattr(lot, 'price_per_hour') else 0,
             'max_spots': lot.max_spots if hasattr(lot, 'max_spots') else 0,
-            'total_spots': len(lot.spots),
-            'occupied_spots': len([spot for spot in lot.spots if spot.is_occupied])
+            'total_spots': lot.total_spots,
+            'occupied_spots': lot.occupied_count
         } for lot in lots]
     }), 200
 
@@ -186,39 +246,32 @@ def create_parking_lot():
         pincode=pincode,
         price_per_hour=price_per_hour,
         max_spots=max_spots,
-        location=location
+        location=location,
+        total_spots=int(max_spots),
+        occupied_count=0
     )
     db.session.add(new_lot)
-    db.session.commit()
+    db.session.flush()
 
-    # Auto-create parking spots for this lot
-    spots = []
-    for i in range(1, int(max_spots) + 1):
-        spot = ParkingSpot(lot_id=new_lot.id, spot_number=str(i))
-        db.session.add(spot)
-        spots.append({'id': spot.id, 'spot_number': spot.spot_number})
+    # Auto-create parking spots for this lot (same transaction as the counters)
+    spots = [{'lot_id': new_lot.id, 'spot_number': str(i), 'is_occupied': False} for i in range(1, int(max_spots) + 1)]
+    db.session.execute(insert(ParkingSpot), spots)
     db.session.commit()
 
     # Invalidate relevant caches
-    cache.delete('admin_parking_lots')
-    cache.delete('admin_summary_revenue')
-    cache.delete('admin_summary_occupancy')
+    invalidate_tags(lot_tag(new_lot.id), LOTS_ALL)
     return jsonify({'message': 'Parking lot created successfully', 'id': new_lot.id, 'spots_created': len(spots)}), 201
 
 @admin_bp.route('/parking-lots/<int:lot_id>/spots', methods=['GET'])
 @jwt_required()
 @admin_required
-@cache.cached(timeout=60, key_prefix=lambda: f"admin_spots_lot_{request.view_args['lot_id']}")
+@cached_view(lambda: f"admin_spots_lot_{request.view_args['lot_id']}_{request.args.get('format', 'json')}", tags=['lot:{lot_id}'], timeout=60, etag=True, cache_control='private, no-cache')
 def get_parking_lot_spots(lot_id):
     lot = ParkingLot.query.get_or_404(lot_id)
-    spots = ParkingSpot.query.filter_by(lot_id=lot_id).order_by(cast(ParkingSpot.spot_number, Integer)).all()
+    if request.args.get('format') == 'bitmap':
+        return jsonify({'occupancy': lot_spot_bitmap(lot_id)}), 200
     return jsonify({
-        'spots': [{
-            'id': spot.id,
-            'spot_number': spot.spot_number,
-            'is_occupied': spot.is_occupied,
-            'vehicle_plate': spot.vehicle.license_plate if spot.vehicle else None
-        } for spot in spots]
+        'spots': lot_spot_rows(lot_id, numeric_order=True)
     }), 200 
 
 @admin_bp.route('/parking-lots/<int:lot_id>', methods=['PUT'])
@@ -249,14 +302,15 @@ def edit_parking_lot(lot_id):
         updated = True
 
         # Sync ParkingSpot records
-        spots = ParkingSpot.query.filter_by(lot_id=lot_id).order_by(ParkingSpot.spot_number).all()
+        spots = ParkingSpot.query.filter_by(lot_id=lot_id).order_by(cast(ParkingSpot.spot_number, Integer)).all()
         current_spot_count = len(spots)
 
         if new_max_spots > current_spot_count:
-            # Add new spots
-            for i in range(current_spot_count + 1, new_max_spots + 1):
-                new_spot = ParkingSpot(lot_id=lot_id, spot_number=str(i))
-                db.session.add(new_spot)
+            # Add new spots in one executemany
+            db.session.execute(insert(ParkingSpot), [
+                {'lot_id': lot_id, 'spot_number': str(i), 'is_occupied': False}
+                for i in range(current_spot_count + 1, new_max_spots + 1)
+            ])
         elif new_max_spots < current_spot_count:
             # Remove extra spots (only if not occupied)
             spots_to_remove = spots[new_max_spots:]
@@ -264,14 +318,14 @@ def edit_parking_lot(lot_id):
                 if spot.is_occupied:
                     return jsonify({'error': f'Cannot reduce max spots: spot {spot.spot_number} is occupied'}), 400
                 db.session.delete(spot)
+        lot.total_spots = new_max_spots
+        reset_spot_changes(lot_id)
 
     if updated:
         db.session.commit()
+        spot_allocator.invalidate(lot_id)
         # Invalidate relevant caches
-        cache.delete('admin_parking_lots')
-        cache.delete('admin_spots_lot_' + str(lot_id))
-        cache.delete('admin_summary_revenue')
-        cache.delete('admin_summary_occupancy')
+        invalidate_tags(lot_tag(lot_id), LOTS_ALL)
         return jsonify({'message': 'Parking lot updated successfully'}), 200
     else:
         return jsonify({'error': 'No valid fields to update'}), 400
@@ -289,17 +343,15 @@ def delete_parking_lot(lot_id):
         db.session.delete(spot)
     db.session.delete(lot)
     db.session.commit()
+    spot_allocator.invalidate(lot_id)
     # Invalidate relevant caches
-    cache.delete('admin_parking_lots')
-    cache.delete('admin_spots_lot_' + str(lot_id))
-    cache.delete('admin_summary_revenue')
-    cache.delete('admin_summary_occupancy')
+    invalidate_tags(lot_tag(lot_id), LOTS_ALL)
     return jsonify({'message': 'Parking lot deleted successfully'}), 200 
 
 @admin_bp.route('/parking-spots/<int:spot_id>/details', methods=['GET'])
 @jwt_required()
 @admin_required
-@cache.cached(timeout=30, key_prefix=lambda: f"admin_spot_details_{request.view_args['spot_id']}")
+@cached_view('admin_spot_details_{spot_id}', tags=[LOTS_ALL, USERS_ALL], timeout=30)
 def get_spot_details(spot_id):
     spot = ParkingSpot.query.get_or_404(spot_id)
     lot = spot.lot
@@ -323,64 +375,47 @@ def get_spot_details(spot_id):
             'email': user.email,
             'phone': user.phone
         }
-        # Add start_time and est_parking_cost
-        history = ParkingHistory.query.filter_by(vehicle_id=vehicle.id, lot_id=lot.id, spot_id=spot.id, status='active').order_by(ParkingHistory.parking_time.desc()).first()
-        if history:
+        # Add start_time and est_parking_cost from the spot's active session
+        history = db.session.get(ParkingHistory, spot.current_history_id) if spot.current_history_id else None
+        if history and history.spot_id == spot.id and history.status == 'active':
             result['start_time'] = history.parking_time.replace(tzinfo=pytz.UTC).astimezone(pytz.timezone('Asia/Kolkata')).strftime('%Y-%m-%d %I:%M %p')
             now = datetime.utcnow()
             duration_hours = (now - history.parking_time).total_seconds() / 3600
             result['est_parking_cost'] = round(duration_hours * lot.price_per_hour, 2)
         else:
-            # If no active history found, try to find any history for this vehicle and spot
-            history = ParkingHistory.query.filter_by(vehicle_id=vehicle.id, spot_id=spot.id).order_by(ParkingHistory.parking_time.desc()).first()
-            if history:
-                result['start_time'] = history.parking_time.replace(tzinfo=pytz.UTC).astimezone(pytz.timezone('Asia/Kolkata')).strftime('%Y-%m-%d %I:%M %p')
-                now = datetime.utcnow()
-                duration_hours = (now - history.parking_time).total_seconds() / 3600
-                result['est_parking_cost'] = round(duration_hours * lot.price_per_hour, 2)
-            else:
-                # If no history found at all, create a default entry or use current time
-                result['start_time'] = datetime.utcnow().replace(tzinfo=pytz.UTC).astimezone(pytz.timezone('Asia/Kolkata')).strftime('%Y-%m-%d %I:%M %p')
-                result['est_parking_cost'] = 0.0  # Default cost since we don't know when parking started
+            # Occupied without a session (seeded or hand-edited data): nothing to estimate from
+            result['start_time'] = None
+            result['est_parking_cost'] = None
     return jsonify(result), 200 
 
 @admin_bp.route('/summary/revenue', methods=['GET'])
 @jwt_required()
 @admin_required
-@cache.cached(timeout=30, key_prefix='admin_summary_revenue')
+@cached_view(lambda: f"admin_summary_revenue_{request.args.get('start', '')}_{request.args.get('end', '')}",
+             tags=[LOTS_ALL], timeout=30, etag=True, cache_control='private, max-age=30')
 def summary_revenue():
-    lots = ParkingLot.query.all()
-    result = []
-    for lot in lots:
-        # Only consider completed sessions (status == 'out')
-        histories = ParkingHistory.query.filter_by(lot_id=lot.id, status='out').order_by(ParkingHistory.vehicle_id, ParkingHistory.parking_time).all()
-        from collections import defaultdict
-        sessions = defaultdict(list)
-        for h in histories:
-            sessions[h.vehicle_id].append(h)
-        total_revenue = 0.0
-        for vehicle_id, actions in sessions.items():
-            for action in actions:
-                if action.parking_time and action.released_time:
-                    duration_hours = (action.released_time - action.parking_time).total_seconds() / 3600
-                    total_revenue += action.total_cost or (duration_hours * lot.price_per_hour)
-        result.append({
-            'lot_id': lot.id,
-            'lot_name': lot.name,
-            'revenue': round(total_revenue, 2)
-        })
+    try:
+        start, end = date_range_args()
+    except ValueError:
+        return jsonify({'error': 'start and end must be dates in YYYY-MM-DD format'}), 400
+
+    result = [{
+        'lot_id': lot_id,
+        'lot_name': lot_name,
+        'revenue': round(revenue, 2)
+    } for lot_id, lot_name, revenue in revenue_per_lot(start, end)]
     return jsonify({'revenue_per_lot': result}), 200
 
 @admin_bp.route('/summary/occupancy', methods=['GET'])
 @jwt_required()
 @admin_required
-@cache.cached(timeout=30, key_prefix='admin_summary_occupancy')
+@cached_view('admin_summary_occupancy', tags=[LOTS_ALL], timeout=30, etag=True, cache_control='private, max-age=10')
 def summary_occupancy():
     lots = ParkingLot.query.all()
     result = []
     for lot in lots:
-        total_spots = len(lot.spots)
-        occupied_spots = len([spot for spot in lot.spots if spot.is_occupied])
+        total_spots = lot.total_spots
+        occupied_spots = lot.occupied_count
         available_spots = total_spots - occupied_spots
         result.append({
             'lot_id': lot.id,
@@ -391,87 +426,103 @@ def summary_occupancy():
         })
     return jsonify({'occupancy_per_lot': result}), 200 
 
+@admin_bp.route('/summary/occupancy/history', methods=['GET'])
+@jwt_required()
+@admin_required
+@cached_view(lambda: 'admin_occupancy_history_' + '_'.join(request.args.get(k, '') for k in ('lot_id', 'start', 'end')),
+             tags=[LOTS_ALL], timeout=60, etag=True, cache_control='private, max-age=60')
+def occupancy_history():
+    lot_id = request.args.get('lot_id', type=int)
+    try:
+        start, end = date_range_args()
+    except ValueError:
+        return jsonify({'error': 'start and end must be dates in YYYY-MM-DD format'}), 400
+    # Defaults to the last 7 days; served from occupancy_sample, see utils/occupancy.py
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(days=7)
+    return jsonify({
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'lots': occupancy_stats(start, end, lot_id),
+        'heatmap': occupancy_heatmap(start, end, lot_id)
+    }), 200
+
 @admin_bp.route('/summary/revenue/timeseries', methods=['GET'])
 @jwt_required()
 @admin_required
+@cached_view(lambda: 'admin_revenue_timeseries_' + '_'.join(request.args.get(k, '') for k in ('period', 'lot_id', 'start', 'end')),
+             tags=[LOTS_ALL], timeout=60, etag=True, cache_control='private, max-age=30')
 def revenue_timeseries():
     period = request.args.get('period', 'daily')
+    if period not in PERIOD_FORMATS:
+        return jsonify({'error': f"period must be one of: {', '.join(PERIOD_FORMATS)}"}), 400
     lot_id = request.args.get('lot_id', type=int)
-    # Only consider completed sessions (status == 'out')
-    query = ParkingHistory.query.filter_by(status='out')
-    if lot_id:
-        query = query.filter_by(lot_id=lot_id)
-    # Group by period
-    if period == 'monthly':
-        group_expr = [func.strftime('%Y-%m', ParkingHistory.released_time)]
-    elif period == 'weekly':
-        group_expr = [func.strftime('%Y-%W', ParkingHistory.released_time)]
-    else:
-        group_expr = [func.strftime('%Y-%m-%d', ParkingHistory.released_time)]
-    results = {}
-    unpark_histories = query.order_by(ParkingHistory.vehicle_id, ParkingHistory.released_time).all()
-    for unpark in unpark_histories:
-        lot = unpark.lot
-        if unpark.parking_time and unpark.released_time:
-            duration_hours = (unpark.released_time - unpark.parking_time).total_seconds() / 3600
-            revenue = unpark.total_cost or (duration_hours * lot.price_per_hour)
-            key = unpark.released_time.strftime('%Y-%m-%d')
-            if period == 'monthly':
-                key = unpark.released_time.strftime('%Y-%m')
-            elif period == 'weekly':
-                key = unpark.released_time.strftime('%Y-%W')
-            if key not in results:
-                results[key] = 0.0
-            results[key] += revenue
-    timeseries = [{'period': k, 'revenue': round(v, 2)} for k, v in sorted(results.items())]
+    try:
+        start, end = date_range_args()
+    except ValueError:
+        return jsonify({'error': 'start and end must be dates in YYYY-MM-DD format'}), 400
+
+    # Served from the revenue_daily rollup, see utils/revenue.py
+    timeseries = [{
+        'period': key,
+        'revenue': round(revenue, 2),
+        'sessions': sessions,
+        'hours': round(hours, 2)
+    } for key, revenue, sessions, hours in revenue_series(period, lot_id, start, end)]
     return jsonify({'revenue_timeseries': timeseries}), 200
 
 @admin_bp.route('/parking-lots/search', methods=['GET'])
 @jwt_required()
 @admin_required
-@cache.cached(timeout=30, key_prefix=lambda: f"admin_lots_search_{request.args.get('query', '').lower()}")
+@cached_view(lambda: search_cache_key('admin_lots_search'), tags=[LOTS_ALL], timeout=30)
 def search_parking_lots():
-    query_str = request.args.get('query', '').lower()
-    lots = ParkingLot.query.all()
-    results = []
-    for lot in lots:
-        if (query_str in lot.name.lower() or
-            query_str in lot.address.lower() or
-            query_str in lot.pincode.lower() or
-            query_str in lot.location.lower()):
-            results.append({
-                'id': lot.id,
-                'name': lot.name,
-                'address': lot.address,
-                'pincode': lot.pincode,
-                'location': lot.location,
-                'price_per_hour': lot.price_per_hour,
-                'max_spots': lot.max_spots
-            })
-    return jsonify({'results': results}), 200
+    query_str, limit, offset = search_args()
+    query = ParkingLot.query
+    order_by = ParkingLot.id
+    if query_str:
+        fts = search_table('parking_lot')
+        query = query.join(fts, fts.c.rowid == ParkingLot.id).filter(match_condition('parking_lot', query_str))
+        order_by = fts.c.rowid
+    lots, has_more = search_page(query, order_by, limit, offset)
+    results = [{
+        'id': lot.id,
+        'name': lot.name,
+        'address': lot.address,
+        'pincode': lot.pincode,
+        'location': lot.location,
+        'price_per_hour': lot.price_per_hour,
+        'max_spots': lot.max_spots
+    } for lot in lots]
+    return search_response(results, limit, offset, has_more)
 
 @admin_bp.route('/parking-spots/search', methods=['GET'])
 @jwt_required()
 @admin_required
-@cache.cached(timeout=30, key_prefix=lambda: f"admin_spots_search_{request.args.get('query', '').lower()}")
+@cached_view(lambda: search_cache_key('admin_spots_search'), tags=[LOTS_ALL], timeout=30)
 def search_parking_spots():
-    query_str = request.args.get('query', '').lower()
-    spots = ParkingSpot.query.all()
-    results = []
-    for spot in spots:
-        lot = spot.lot
-        status = 'occupied' if spot.is_occupied else 'available'
-        if (query_str in lot.name.lower() or
-            query_str in spot.spot_number.lower() or
-            query_str in status):
-            results.append({
-                'id': spot.id,
-                'spot_number': spot.spot_number,
-                'status': status,
-                'lot_id': lot.id,
-                'lot_name': lot.name
-            })
-    return jsonify({'results': results}), 200 
+    query_str, limit, offset = search_args()
+    query = db.session.query(
+        ParkingSpot.id, ParkingSpot.spot_number, ParkingSpot.is_occupied, ParkingLot.id, ParkingLot.name
+    ).join(ParkingLot, ParkingLot.id == ParkingSpot.lot_id)
+    if query_str:
+        # A spot matches on its number, its lot's name or its status word
+        conditions = [
+            ParkingSpot.id.in_(matching_ids('parking_spot', query_str)),
+            ParkingSpot.lot_id.in_(matching_ids('parking_lot', query_str, columns=('name',)))
+        ]
+        statuses = [occupied for occupied, word in ((True, 'occupied'), (False, 'available')) if query_str in word]
+        if statuses:
+            conditions.append(ParkingSpot.is_occupied.in_(statuses))
+        query = query.filter(db.or_(*conditions))
+    spots, has_more = search_page(query, ParkingSpot.id, limit, offset)
+    results = [{
+        'id': spot_id,
+        'spot_number': spot_number,
+        'status': 'occupied' if is_occupied else 'available',
+        'lot_id': lot_id,
+        'lot_name': lot_name
+    } for spot_id, spot_number, is_occupied, lot_id, lot_name in spots]
+    return search_response(results, limit, offset, has_more)
 
 @admin_bp.route('/monthly-report/<int:user_id>', methods=['POST'])
 @jwt_required()
@@ -521,34 +572,12 @@ def export_csv():
 def export_csv_status(task_id):
     from celery.result import AsyncResult
     from tasks import celery  # Use the celery object with correct config
-    result = AsyncResult(task_id, app=celery)
-    if result.state == 'SUCCESS':
-        data = result.result
-        if data and data.get('success'):
-            return jsonify({
-                'ready': True,
-                'download_url': f'/api/admin/download-csv/{data.get("filename")}'
-            })
-        else:
-            return jsonify({'ready': False, 'error': data.get('error', 'Unknown error')})
-    elif result.state == 'FAILURE':
-        return jsonify({'ready': False, 'error': 'Export failed'})
-    else:
-        return jsonify({'ready': False})
+    return jsonify(export_status(AsyncResult(task_id, app=celery), '/api/admin/download-csv'))
 
 @admin_bp.route('/download-csv/<filename>', methods=['GET'])
 @jwt_required()
 def download_csv(filename):
-    expected_prefix = f'user_{get_current_user().id}_parking_history'
-    if not filename.startswith(expected_prefix):
-        return jsonify({'error': 'Access denied'}), 403
-    import os
-    from flask import send_from_directory
-    export_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../exports')
-    export_dir = os.path.abspath(export_dir)
-    if not os.path.exists(os.path.join(export_dir, filename)):
-        return jsonify({'error': 'File not found'}), 404
-    return send_from_directory(export_dir, filename, as_attachment=True) 
+    return send_export(get_current_user().id, filename)
 
 @admin_bp.route('/reminder-time', methods=['GET'])
 @jwt_required()
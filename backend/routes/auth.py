@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify, session
 from werkzeug.security import check_password_hash, generate_password_hash
 from models.user import User
 from extensions import db
+from utils.cache_utils import invalidate_tags, USERS_ALL
 from flask_jwt_extended import create_access_token, set_access_cookies, jwt_required, get_jwt_identity
 
 auth_bp = Blueprint('auth', __name__)
@@ -66,6 +67,7 @@ def register():
     
     db.session.add(new_user)
     db.session.commit()
+    invalidate_tags(USERS_ALL)
     
     return jsonify({'message': 'User registered successfully'}), 201
 
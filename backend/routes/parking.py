@@ -1,24 +1,74 @@
-from flask import Blueprint, request, jsonify, send_from_directory
+from flask import Blueprint, request, jsonify, Response, stream_with_context, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models.parking_lot import ParkingLot
 from models.parking_spot import ParkingSpot
 from models.vehicle import Vehicle
 from models.parking_history import ParkingHistory
+from models.spot_change import SpotChange
 from datetime import datetime
+import base64
+import binascii
+import json
 import pytz
-from extensions import db, cache
-from sqlalchemy import cast, Integer
+from extensions import db
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import joinedload
 from models.user import User
+from utils import spot_allocator
+from utils.spot_payloads import lot_spot_rows, lot_spot_bitmap
+from utils.spot_events import get_event_bus, publish_spot_change
+from utils.cache_utils import cached_view, invalidate_tags, lot_tag, user_tag, LOTS_ALL, USERS_ALL
+from utils.parking_ops import claim_spot, release_spot, claim_vehicle, release_vehicle, start_session
+from utils.revenue import record_completed_session
+from utils.forecast import forecast_free_spots
+from utils.monthly_reports import is_closed, monthly_reports, report_data
+from utils.csv_export import export_status, send_export
 
 parking_bp = Blueprint('parking', __name__)
 
+IST = pytz.timezone('Asia/Kolkata')
+HISTORY_PAGE_SIZE = 50
+HISTORY_PAGE_MAX = 200
+
 def get_current_user():
     user_id = get_jwt_identity()
     return User.query.get(user_id)
 
+def format_ist(dt):
+    return dt.replace(tzinfo=pytz.UTC).astimezone(IST).strftime('%Y-%m-%d %I:%M %p') if dt else ''
+
+def history_row(h, lot, plate):
+    parking_time = format_ist(h.parking_time)
+    return {
+        'id': h.id,
+        'location': lot.name if lot else '',
+        'address': lot.address if lot else '',
+        'pincode': lot.pincode if lot else '',
+        'vehicle_no': plate or '',
+        'spot_id': h.spot_id,
+        'parking_time': parking_time,
+        'released_time': format_ist(h.released_time),
+        'total_cost': h.total_cost,
+        'price_per_hour': lot.price_per_hour if lot else 0,
+        'status': h.status,
+        'timestamp': parking_time
+    }
+
+def encode_history_cursor(parking_time, history_id):
+    raw = f"{parking_time.isoformat()}|{history_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_history_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        parking_time, history_id = raw.split('|')
+        return datetime.fromisoformat(parking_time), int(history_id)
+    except (TypeError, UnicodeDecodeError, ValueError, binascii.Error):
+        raise ValueError('Invalid cursor')
+
 @parking_bp.route('/lots', methods=['GET'])
 @jwt_required()
-@cache.cached(timeout=60, key_prefix='available_lots')
+@cached_view('available_lots', tags=[LOTS_ALL], timeout=60, etag=True, cache_control='private, max-age=5')
 def get_available_lots():
     lots = ParkingLot.query.all()
     return jsonify({
@@ -27,37 +77,94 @@ def get_available_lots():
             'name': lot.name,
             'location': lot.location,
             'price_per_hour': lot.price_per_hour,
-            'total_spots': len(lot.spots),
-            'available_spots': len([spot for spot in lot.spots if not spot.is_occupied])
+            'total_spots': lot.total_spots,
+            'available_spots': lot.total_spots - lot.occupied_count
         } for lot in lots]
     }), 200
 
 @parking_bp.route('/lots/<int:lot_id>/spots', methods=['GET'])
 @jwt_required()
-@cache.cached(timeout=60, key_prefix=lambda: f"available_spots_lot_{request.view_args['lot_id']}")
+@cached_view(lambda: f"available_spots_lot_{request.view_args['lot_id']}_{request.args.get('format', 'json')}", tags=['lot:{lot_id}'], timeout=60, etag=True, cache_control='private, no-cache')
 def get_lot_spots(lot_id):
     lot = ParkingLot.query.get_or_404(lot_id)
-    spots = ParkingSpot.query.filter_by(lot_id=lot_id).all()
-    
-    return jsonify({
+    result = {
         'lot': {
             'id': lot.id,
             'name': lot.name,
             'location': lot.location
         },
-        'spots': [{
-            'id': spot.id,
-            'spot_number': spot.spot_number,
-            'is_occupied': spot.is_occupied,
-            'vehicle_plate': spot.vehicle.license_plate if spot.vehicle else None
-        } for spot in spots]
+        'version': lot.state_version
+    }
+    if request.args.get('format') == 'bitmap':
+        result['occupancy'] = lot_spot_bitmap(lot_id)
+    else:
+        result['spots'] = lot_spot_rows(lot_id)
+    return jsonify(result), 200
+
+@parking_bp.route('/lots/<int:lot_id>/spots/changes', methods=['GET'])
+@jwt_required()
+def get_lot_spot_changes(lot_id):
+    """Spot changes since the client's version, or a full snapshot if the log no longer covers it"""
+    since = request.args.get('since', type=int)
+    version = db.session.query(ParkingLot.state_version).filter(ParkingLot.id == lot_id).scalar()
+    if version is None:
+        return jsonify({'error': 'Parking lot not found'}), 404
+    
+    if since is not None and since <= version:
+        changes = SpotChange.query.filter(
+            SpotChange.lot_id == lot_id,
+            SpotChange.version > since
+        ).order_by(SpotChange.version).all()
+        if since == version or (changes and changes[0].version == since + 1):
+            # Only the latest state of each spot matters
+            latest = {}
+            for change in changes:
+                latest[change.spot_id] = change
+            return jsonify({
+                'version': changes[-1].version if changes else version,
+                'full': False,
+                'changes': [{
+                    'id': c.spot_id,
+                    'is_occupied': c.is_occupied,
+                    'vehicle_plate': c.vehicle_plate
+                } for c in latest.values()]
+            }), 200
+    
+    return jsonify({
+        'version': version,
+        'full': True,
+        'spots': lot_spot_rows(lot_id)
+    }), 200
+
+@parking_bp.route('/lots/<int:lot_id>/forecast', methods=['GET'])
+@jwt_required()
+@cached_view(lambda: f"lot_forecast_{request.view_args['lot_id']}_{request.args.get('hours', '')}",
+             tags=['lot:{lot_id}'], timeout=60)
+def get_lot_forecast(lot_id):
+    lot = ParkingLot.query.get_or_404(lot_id)
+    max_hours = current_app.config.get('FORECAST_MAX_HOURS', 24)
+    hours = min(max(request.args.get('hours', 4, type=int), 1), max_hours)
+    forecast = forecast_free_spots(lot, hours)
+    if forecast is None:
+        return jsonify({'error': 'No forecast available for this lot yet', 'code': 'no_forecast'}), 404
+    return jsonify({
+        'lot_id': lot.id,
+        'total_spots': lot.total_spots,
+        'available_now': lot.total_spots - lot.occupied_count,
+        'interval_minutes': 15,
+        'forecast': [{
+            'time': format_ist(moment),
+            'expected_free_spots': round(free, 1)
+        } for moment, free in forecast]
     }), 200
 
 @parking_bp.route('/vehicles', methods=['GET'])
 @jwt_required()
-@cache.cached(timeout=60, key_prefix=lambda: f"user_vehicles_{get_current_user().id}")
+@cached_view(lambda: f"user_vehicles_{get_jwt_identity()}", tags=lambda: [user_tag(get_jwt_identity())], timeout=60)
 def get_user_vehicles():
-    vehicles = Vehicle.query.filter_by(user_id=get_current_user().id).all()
+    vehicles = Vehicle.query.options(
+        joinedload(Vehicle.spot).joinedload(ParkingSpot.lot)
+    ).filter_by(user_id=get_current_user().id).all()
     return jsonify({
         'vehicles': [{
             'id': vehicle.id,
@@ -91,59 +198,61 @@ def add_vehicle():
     
     db.session.add(new_vehicle)
     db.session.commit()
-    # Invalidate vehicles cache
-    cache.delete(f"user_vehicles_{get_current_user().id}")
+    # Invalidate vehicles cache and the admin vehicle count
+    invalidate_tags(user_tag(get_current_user().id), USERS_ALL)
     return jsonify({'message': 'Vehicle added successfully', 'id': new_vehicle.id}), 201
 
 @parking_bp.route('/history', methods=['GET'])
 @jwt_required()
-@cache.cached(timeout=10, key_prefix=lambda: f"user_history_{get_current_user().id}")
+@cached_view(lambda: f"user_history_{get_jwt_identity()}_{request.args.get('limit', '')}_{request.args.get('cursor', '')}", tags=lambda: [user_tag(get_jwt_identity())], timeout=10)
 def get_parking_history():
-    # Get current month and year
-    current_month = datetime.now().month
-    current_year = datetime.now().year
-    
-    # First, try to get current month data (excluding test vehicles)
-    current_month_start = datetime(current_year, current_month, 1)
-    if current_month == 12:
-        current_month_end = datetime(current_year + 1, 1, 1)
-    else:
-        current_month_end = datetime(current_year, current_month + 1, 1)
+    user_id = get_jwt_identity()
+    # History rows with their lot and plate in one query, excluding test vehicles
+    query = db.session.query(ParkingHistory, ParkingLot, Vehicle.license_plate).join(
+        Vehicle, Vehicle.id == ParkingHistory.vehicle_id
+    ).outerjoin(
+        ParkingLot, ParkingLot.id == ParkingHistory.lot_id
+    ).filter(
+        ParkingHistory.user_id == user_id,
+        ~Vehicle.license_plate.like('TEST%')
+    )
     
-    # Get current month history excluding test vehicles
-    current_month_history = ParkingHistory.query.join(Vehicle).filter(
-        ParkingHistory.user_id == get_current_user().id,
-        ParkingHistory.parking_time >= current_month_start,
-        ParkingHistory.parking_time < current_month_end,
-        ~Vehicle.license_plate.like('TEST%')  # Exclude test vehicles
-    ).order_by(ParkingHistory.parking_time.desc()).all()
+    # Keyset pagination on (parking_time, id) when the client asks for pages
+    if 'limit' in request.args or 'cursor' in request.args:
+        limit = min(max(request.args.get('limit', HISTORY_PAGE_SIZE, type=int) or HISTORY_PAGE_SIZE, 1), HISTORY_PAGE_MAX)
+        cursor = request.args.get('cursor')
+        if cursor:
+            try:
+                after = decode_history_cursor(cursor)
+            except ValueError:
+                return jsonify({'error': 'Invalid cursor'}), 400
+            query = query.filter(tuple_(ParkingHistory.parking_time, ParkingHistory.id) < tuple_(*after))
+        rows = query.order_by(ParkingHistory.parking_time.desc(), ParkingHistory.id.desc()).limit(limit + 1).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1][0]
+            next_cursor = encode_history_cursor(last.parking_time, last.id)
+        return jsonify({
+            'history': [history_row(h, lot, plate) for h, lot, plate in rows],
+            'next_cursor': next_cursor
+        }), 200
     
-    # If no current month data, get all data excluding test vehicles
-    if not current_month_history:
-        history = ParkingHistory.query.join(Vehicle).filter(
-            ParkingHistory.user_id == get_current_user().id,
-            ~Vehicle.license_plate.like('TEST%')  # Exclude test vehicles
-        ).order_by(ParkingHistory.parking_time.desc()).all()
+    # Unpaginated: current month, or everything if the month is empty
+    now = datetime.now()
+    current_month_start = datetime(now.year, now.month, 1)
+    if now.month == 12:
+        current_month_end = datetime(now.year + 1, 1, 1)
     else:
-        history = current_month_history
-    
-    result = []
-    for h in history:
-        result.append({
-            'id': h.id,
-            'location': h.lot.name if h.lot else '',
-            'address': h.lot.address if h.lot else '',
-            'pincode': h.lot.pincode if h.lot else '',
-            'vehicle_no': h.vehicle.license_plate if h.vehicle else '',
-            'spot_id': h.spot_id,
-            'parking_time': h.parking_time.replace(tzinfo=pytz.UTC).astimezone(pytz.timezone('Asia/Kolkata')).strftime('%Y-%m-%d %I:%M %p') if h.parking_time else '',
-            'released_time': h.released_time.replace(tzinfo=pytz.UTC).astimezone(pytz.timezone('Asia/Kolkata')).strftime('%Y-%m-%d %I:%M %p') if h.released_time else '',
-            'total_cost': h.total_cost,
-            'price_per_hour': h.lot.price_per_hour if h.lot else 0,
-            'status': h.status,
-            'timestamp': h.parking_time.replace(tzinfo=pytz.UTC).astimezone(pytz.timezone('Asia/Kolkata')).strftime('%Y-%m-%d %I:%M %p') if h.parking_time else ''
-        })
-    return jsonify({'history': result}), 200
+        current_month_end = datetime(now.year, now.month + 1, 1)
+    ordered = query.order_by(ParkingHistory.parking_time.desc())
+    history = ordered.filter(
+        ParkingHistory.parking_time >= current_month_start,
+        ParkingHistory.parking_time < current_month_end
+    ).all()
+    if not history:
+        history = ordered.all()
+    return jsonify({'history': [history_row(h, lot, plate) for h, lot, plate in history]}), 200
 
 @parking_bp.route('/history/refresh', methods=['POST'])
 @jwt_required()
@@ -151,11 +260,48 @@ def refresh_parking_history():
     """Force refresh parking history cache"""
     try:
         # Invalidate the cache
-        cache.delete(f"user_history_{get_current_user().id}")
+        invalidate_tags(user_tag(get_current_user().id))
         return jsonify({'message': 'Cache refreshed successfully'}), 200
     except Exception as e:
         return jsonify({'error': 'Failed to refresh cache'}), 500
 
+@parking_bp.route('/reports', methods=['GET'])
+@jwt_required()
+def get_monthly_reports():
+    """Closed months in which the user parked, newest first"""
+    now = datetime.now()
+    period = func.strftime('%Y-%m', ParkingHistory.parking_time)
+    months = db.session.query(period, func.count(ParkingHistory.id)).filter(
+        ParkingHistory.user_id == get_jwt_identity(),
+        ParkingHistory.parking_time < datetime(now.year, now.month, 1)
+    ).group_by(period).order_by(period.desc()).all()
+    return jsonify({'reports': [{
+        'year': int(value[:4]),
+        'month': int(value[5:]),
+        'total_bookings': bookings,
+        'url': f'/api/parking/reports/{value[:4]}/{int(value[5:])}'
+    } for value, bookings in months]}), 200
+
+@parking_bp.route('/reports/<int:year>/<int:month>', methods=['GET'])
+@jwt_required()
+def get_monthly_report(year, month):
+    """A closed month's report from the report store, or built on the fly (not stored) if it isn't there"""
+    if not 1 <= month <= 12 or year < 1:
+        return jsonify({'error': 'Invalid month'}), 400
+    if not is_closed(month, year):
+        return jsonify({'error': 'Reports are available once the month has ended', 'code': 'month_not_closed'}), 400
+    user = get_current_user()
+    report = monthly_reports([{'id': user.id, 'full_name': user.full_name, 'email': user.email}], month, year,
+                             store=False)[user.id]
+    if request.args.get('format') == 'html':
+        return Response(report.html, mimetype='text/html')
+    return jsonify({
+        'year': year,
+        'month': month,
+        'generated_at': format_ist(report.generated_at),
+        'report': report_data(report)
+    }), 200
+
 @parking_bp.route('/park', methods=['POST'])
 @jwt_required()
 def park_vehicle():
@@ -177,23 +323,23 @@ def park_vehicle():
     if not spot:
         return jsonify({'error': 'Parking spot not found'}), 404
     
-    if spot.is_occupied:
-        return jsonify({'error': 'Parking spot is already occupied'}), 400
-    
-    # Park the vehicle
-    vehicle.spot_id = spot_id
-    spot.is_occupied = True
+    # Claim the spot and the vehicle with conditional updates so concurrent
+    # requests can't double-book; the loser gets a 409 straight away
+    if not claim_spot(spot.id, spot.lot_id, vehicle.license_plate):
+        db.session.rollback()
+        return jsonify({'error': 'Parking spot is already occupied', 'code': 'spot_taken'}), 409
+    if not claim_vehicle(vehicle.id, spot.id):
+        db.session.rollback()
+        return jsonify({'error': 'Vehicle is already parked', 'code': 'vehicle_parked'}), 409
     
     # Log history (single entry per session)
-    history = ParkingHistory(user_id=get_current_user().id, vehicle_id=vehicle.id, lot_id=spot.lot_id, spot_id=spot.id, parking_time=datetime.utcnow(), status='active')
-    db.session.add(history)
+    start_session(get_current_user().id, vehicle.id, spot)
     db.session.commit()
+    spot_allocator.mark_occupied(spot.lot_id, spot.spot_number)
+    publish_spot_change(spot, True, vehicle.license_plate)
     
     # Invalidate relevant caches
-    cache.delete('available_lots')
-    cache.delete(f"available_spots_lot_{spot.lot_id}")
-    cache.delete(f"user_history_{get_current_user().id}")
-    cache.delete(f"user_vehicles_{get_current_user().id}")
+    invalidate_tags(lot_tag(spot.lot_id), LOTS_ALL, user_tag(get_current_user().id))
     return jsonify({
         'message': 'Vehicle parked successfully',
         'spot_number': spot.spot_number,
@@ -216,37 +362,34 @@ def unpark_vehicle():
     if not vehicle.spot_id:
         return jsonify({'error': 'Vehicle is not parked'}), 400
     
-    # Unpark the vehicle
     spot = vehicle.spot
-    spot.is_occupied = False
-    vehicle.spot_id = None
     
-    # Find the latest active history for this vehicle and spot
-    history = ParkingHistory.query.filter_by(
-        user_id=get_current_user().id,
-        vehicle_id=vehicle.id,
-        lot_id=spot.lot_id,
-        spot_id=spot.id,
-        status='active'
-    ).order_by(ParkingHistory.parking_time.desc()).first()
+    # The spot points at its active session
+    history = db.session.get(ParkingHistory, spot.current_history_id) if spot.current_history_id else None
     
-    if not history:
+    if not history or history.vehicle_id != vehicle.id:
         return jsonify({'error': 'Active parking history not found'}), 404
     
+    # Unpark the vehicle; only one of several concurrent unparks gets through
+    if not release_vehicle(vehicle.id, spot.id):
+        db.session.rollback()
+        return jsonify({'error': 'Vehicle is not parked', 'code': 'vehicle_not_parked'}), 409
+    release_spot(spot.id, spot.lot_id)
+    
     # Update history
     history.released_time = datetime.utcnow()
     history.status = 'out'
     lot = spot.lot
     duration_hours = max(1, int((history.released_time - history.parking_time).total_seconds() // 3600))
     history.total_cost = duration_hours * lot.price_per_hour
+    record_completed_session(lot.id, history.parking_time, history.released_time, history.total_cost)
     
     db.session.commit()
+    spot_allocator.release(spot.lot_id, spot.spot_number)
+    publish_spot_change(spot, False)
     
     # Invalidate relevant caches
-    cache.delete('available_lots')
-    cache.delete(f"available_spots_lot_{spot.lot_id}")
-    cache.delete(f"user_history_{get_current_user().id}")
-    cache.delete(f"user_vehicles_{get_current_user().id}")
+    invalidate_tags(lot_tag(spot.lot_id), LOTS_ALL, user_tag(get_current_user().id))
     return jsonify({
         'message': 'Vehicle unparked successfully',
         'spot_number': spot.spot_number,
@@ -267,20 +410,51 @@ def auto_park_vehicle():
     if not vehicle:
         return jsonify({'error': 'Vehicle not found'}), 404
 
-    # Find the first available spot in the lot
-    spot = ParkingSpot.query.filter_by(lot_id=lot_id, is_occupied=False).order_by(cast(ParkingSpot.spot_number, Integer)).first()
-    if not spot:
-        return jsonify({'error': 'No available spots in this lot'}), 400
+    if vehicle.spot_id:
+        return jsonify({'error': 'Vehicle is already parked'}), 400
+
+    # Take the lowest free spot from the lot's allocator and claim it in the DB;
+    # a failed claim means the bitmap is stale (another worker parked), so
+    # reload it and try again
+    spot_id = None
+    for _ in range(3):
+        candidate = spot_allocator.reserve(lot_id)
+        if candidate is None:
+            break
+        if claim_spot(candidate, lot_id, vehicle.license_plate):
+            spot_id = candidate
+            break
+        spot_allocator.invalidate(lot_id)
+    if spot_id is None:
+        # The bitmap is empty or keeps losing races: ask the DB, which also sees
+        # spots freed by other workers. Each lost claim means another request
+        # took that spot, so this ends once the lot is really full
+        spot_allocator.invalidate(lot_id)
+        while spot_id is None:
+            candidate = spot_allocator.lowest_free_spot(lot_id)
+            if candidate is None:
+                return jsonify({'error': 'No available spots in this lot'}), 400
+            if claim_spot(candidate, lot_id, vehicle.license_plate):
+                spot_id = candidate
+    spot = ParkingSpot.query.get(spot_id)
 
-    # Park the vehicle
-    vehicle.spot_id = spot.id
-    spot.is_occupied = True
+    if not claim_vehicle(vehicle.id, spot.id):
+        db.session.rollback()
+        spot_allocator.release(spot.lot_id, spot.spot_number)
+        return jsonify({'error': 'Vehicle is already parked', 'code': 'vehicle_parked'}), 409
 
-    # Log history
-    history = ParkingHistory(user_id=get_current_user().id, vehicle_id=vehicle.id, lot_id=lot_id, action='park', timestamp=datetime.utcnow())
-    db.session.add(history)
-    db.session.commit()
+    # Log history (single entry per session)
+    start_session(get_current_user().id, vehicle.id, spot)
+    try:
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        spot_allocator.release(spot.lot_id, spot.spot_number)
+        raise
+    publish_spot_change(spot, True, vehicle.license_plate)
 
+    # Invalidate relevant caches
+    invalidate_tags(lot_tag(spot.lot_id), LOTS_ALL, user_tag(get_current_user().id))
     return jsonify({
         'message': 'Vehicle auto-parked successfully',
         'spot_id': spot.id,
@@ -288,6 +462,52 @@ def auto_park_vehicle():
         'lot_name': spot.lot.name
     }), 200 
 
+@parking_bp.route('/events', methods=['GET'])
+@parking_bp.route('/lots/<int:lot_id>/events', methods=['GET'])
+@jwt_required()
+def stream_spot_events(lot_id=None):
+    """Server-Sent Events feed of spot changes, for one lot or all lots"""
+    bus = get_event_bus()
+    heartbeat = current_app.config.get('SPOT_EVENTS_HEARTBEAT', 15)
+    cursor = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+
+    # Resume from the client's last event if we still have everything after it,
+    # otherwise tell it to refetch the spot list and follow from now
+    reset = False
+    if cursor is not None:
+        try:
+            reset = not bus.is_retained(cursor)
+        except ValueError:
+            reset = True
+    if cursor is None or reset:
+        cursor = bus.last_id()
+
+    def generate(cursor):
+        yield 'retry: 3000\n\n'
+        if reset:
+            yield f'id: {cursor}\nevent: reset\ndata: {{}}\n\n'
+        while True:
+            events = bus.read(cursor, heartbeat)
+            if not events:
+                yield ': keep-alive\n\n'
+                continue
+            skipped = False
+            for event_id, event in events:
+                cursor = event_id
+                if lot_id is not None and event['lot_id'] != lot_id:
+                    skipped = True
+                    continue
+                skipped = False
+                yield f'id: {event_id}\nevent: spot\ndata: {json.dumps(event, separators=(",", ":"))}\n\n'
+            if skipped:
+                # Id-only block: moves the client's Last-Event-ID past other lots' events
+                yield f'id: {cursor}\n\n'
+
+    return Response(stream_with_context(generate(cursor)), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @parking_bp.route('/export-csv', methods=['POST'])
 @jwt_required()
 def export_csv():
@@ -301,33 +521,12 @@ def export_csv():
 def export_csv_status(task_id):
     from celery.result import AsyncResult
     from tasks import celery  # Use the celery object with correct config
-    result = AsyncResult(task_id, app=celery)
-    if result.state == 'SUCCESS':
-        data = result.result
-        if data and data.get('success'):
-            return jsonify({
-                'ready': True,
-                'download_url': f'/api/parking/download-csv/{data.get("filename")}'
-            })
-        else:
-            return jsonify({'ready': False, 'error': data.get('error', 'Unknown error')})
-    elif result.state == 'FAILURE':
-        return jsonify({'ready': False, 'error': 'Export failed'})
-    else:
-        return jsonify({'ready': False})
+    return jsonify(export_status(AsyncResult(task_id, app=celery), '/api/parking/download-csv'))
 
 @parking_bp.route('/download-csv/<filename>', methods=['GET'])
 @jwt_required()
 def download_csv(filename):
-    expected_prefix = f'user_{get_current_user().id}_parking_history'
-    if not filename.startswith(expected_prefix):
-        return jsonify({'error': 'Access denied'}), 403
-    import os
-    export_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../exports')
-    export_dir = os.path.abspath(export_dir)
-    if not os.path.exists(os.path.join(export_dir, filename)):
-        return jsonify({'error': 'File not found'}), 404
-    return send_from_directory(export_dir, filename, as_attachment=True) 
+    return send_export(get_current_user().id, filename)
 
 @parking_bp.route('/me', methods=['GET'])
 @jwt_required()
@@ -368,6 +567,7 @@ def update_current_user_parking():
         updated = True
     if updated:
         db.session.commit()
+        invalidate_tags(user_tag(user.id), USERS_ALL)
         return jsonify({'message': 'User updated successfully'}), 200
     else:
         return jsonify({'message': 'No changes made'}), 200 
\ No newline at end of file
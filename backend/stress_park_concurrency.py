@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Concurrency stress test for park/unpark
+
+Spawns several worker processes that fire park requests (and some unparks) at
+random spots of one small lot through the real /api/parking routes, all
+sharing one SQLite file. Afterwards it checks that no spot was double-booked
+and prints the throughput and the outcome mix.
+
+Usage: python stress_park_concurrency.py [workers] [requests_per_worker] [spots]
+"""
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+
+from bench_harness import make_app, seed_lot, make_user, auth_headers
+from extensions import db
+from models.user import User
+from models.parking_spot import ParkingSpot
+from models.vehicle import Vehicle
+from models.parking_history import ParkingHistory
+from utils.lot_counters import find_counter_drift
+
+VEHICLES_PER_WORKER = 20
+
+
+def make_stress_app(db_path):
+    return make_app(
+        f'sqlite:///{db_path}',
+        SQLALCHEMY_ENGINE_OPTIONS={'connect_args': {'timeout': 60}}
+    )
+
+
+def setup(db_path, workers, num_spots):
+    app = make_stress_app(db_path)
+    with app.app_context():
+        lot = seed_lot(num_spots, name='Stress Lot')
+        spot_ids = [s.id for s in ParkingSpot.query.filter_by(lot_id=lot.id).all()]
+        owners = []
+        for w in range(workers):
+            user = make_user(f'stress{w}@example.com')
+            for v in range(VEHICLES_PER_WORKER):
+                db.session.add(Vehicle(user_id=user.id, license_plate=f'ST{w:02d}V{v:03d}'))
+            owners.append(user.id)
+        db.session.commit()
+    return spot_ids, owners
+
+
+def worker(db_path, user_id, spot_ids, num_requests, seed, results):
+    random.seed(seed)
+    app = make_stress_app(db_path)
+    client = app.test_client()
+    outcomes = Counter()
+    with app.app_context():
+        headers = auth_headers(db.session.get(User, user_id))
+        vehicles = [(v.id, v.license_plate) for v in Vehicle.query.filter_by(user_id=user_id).all()]
+    for _ in range(num_requests):
+        vehicle_id, plate = random.choice(vehicles)
+        if random.random() < 0.3:
+            resp = client.post('/api/parking/unpark', json={'vehicle_id': vehicle_id}, headers=headers)
+            outcomes[f'unpark {resp.status_code}'] += 1
+        else:
+            resp = client.post('/api/parking/park', json={'vehicle_no': plate, 'spot_id': random.choice(spot_ids)}, headers=headers)
+            code = (resp.get_json() or {}).get('code', '')
+            outcomes[f'park {resp.status_code} {code}'.strip()] += 1
+    results.put(dict(outcomes))
+
+
+def check_invariants(db_path):
+    app = make_stress_app(db_path)
+    errors = []
+    with app.app_context():
+        spots = {s.id: s.is_occupied for s in ParkingSpot.query.all()}
+        parked = Counter(v.spot_id for v in Vehicle.query.filter(Vehicle.spot_id.isnot(None)).all())
+        active = Counter(h.spot_id for h in ParkingHistory.query.filter_by(status='active').all())
+        for spot_id, is_occupied in spots.items():
+            if parked[spot_id] > 1:
+                errors.append(f'spot {spot_id} holds {parked[spot_id]} vehicles')
+            if active[spot_id] > 1:
+                errors.append(f'spot {spot_id} has {active[spot_id]} active sessions')
+            if bool(is_occupied) != (parked[spot_id] == 1):
+                errors.append(f'spot {spot_id} is_occupied={is_occupied} but holds {parked[spot_id]} vehicles')
+        for lot, total, occupied in find_counter_drift():
+            errors.append(f'lot {lot.id} counters say {lot.occupied_count}/{lot.total_spots}, spots say {occupied}/{total}')
+        return errors, sum(1 for v in spots.values() if v)
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    per_worker = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    num_spots = int(sys.argv[3]) if len(sys.argv) > 3 else 25
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='park_stress_'), 'stress.db')
+    spot_ids, owners = setup(db_path, workers, num_spots)
+
+    ctx = multiprocessing.get_context('spawn')
+    results = ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(db_path, owners[w], spot_ids, per_worker, w, results))
+             for w in range(workers)]
+    start = time.perf_counter()
+    for p in procs:
+        p.start()
+    totals = Counter()
+    for _ in procs:
+        totals.update(results.get())
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - start
+
+    total_requests = sum(totals.values())
+    print(f"{workers} workers x {per_worker} requests against {num_spots} spots")
+    print(f"Throughput: {total_requests / elapsed:.0f} req/s ({total_requests} requests in {elapsed:.2f}s)")
+    for outcome, count in sorted(totals.items()):
+        print(f"   {outcome}: {count}")
+
+    errors, occupied = check_invariants(db_path)
+    print(f"Occupied spots at end: {occupied}")
+    if errors:
+        print(f"❌ {len(errors)} double-occupancy violations")
+        for error in errors[:20]:
+            print(f"   - {error}")
+        sys.exit(1)
+    print("✅ No double occupancy")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,22 @@
 import os
 import requests
-import pytz
 from datetime import datetime, timedelta
 from celery_app import make_celery
-from flask import render_template, current_app
-from flask_mail import Message
-from sqlalchemy import func, and_
-from extensions import db, mail
+from flask import current_app
+from extensions import db
 from models.user import User
 from models.parking_history import ParkingHistory
 from models.parking_lot import ParkingLot
 from models.base import AppConfig
+from utils.occupancy import sample_occupancy, compact_occupancy
+from utils.forecast import refresh_forecast_profiles
+from utils.reminders import reminder_recipients, reminder_messages
+from utils.mail_dispatch import send_messages
+from utils.csv_export import export_filename, remove_old_exports, write_history_csv
+from utils.monthly_reports import (monthly_report_messages, monthly_reports, previous_month, report_data,
+                                   report_recipients)
 from celery_app import make_celery
 from celery.schedules import crontab
-import csv
 
 # Delay import of app to avoid circular import
 
@@ -50,20 +53,24 @@ def send_daily_email_reminders():
             print("No parking lots found. Skipping reminders.")
             return
         
-        # Get all users (excluding admins)
-        users = User.query.filter_by(role='user').all()
-        
-        for user in users:
-            # Check if user has parked today
-            has_parked_today = ParkingHistory.query.filter(
-                ParkingHistory.user_id == user.id,
-                ParkingHistory.parking_time >= datetime.combine(today, datetime.min.time()),
-                ParkingHistory.parking_time < datetime.combine(today + timedelta(days=1), datetime.min.time())
-            ).first() is not None
-            
-            if not has_parked_today:
-                # Send email reminder
-                send_reminder_email.delay(user.id)
+        # Users who haven't parked today, one anti-join query per chunk;
+        # each chunk goes out as one batch task (see utils/reminders.py)
+        batches = recipients = 0
+        for chunk in reminder_recipients(today):
+            send_reminder_batch.delay(chunk)
+            batches += 1
+            recipients += len(chunk)
+        return {"batches": batches, "recipients": recipients}
+
+@celery.task
+def send_reminder_batch(recipients):
+    """
+    Render and send reminder emails for a chunk of recipients from reminder_recipients()
+    """
+    with current_app.app_context():
+        result = send_messages(reminder_messages(recipients), 'reminder')
+        print(f"Reminder batch: {result['sent']}/{len(recipients)} emails sent")
+        return {"sent": result['sent'], "failed": result['failed']}
 
 @celery.task
 def send_reminder_email(user_id):
@@ -75,41 +82,23 @@ def send_reminder_email(user_id):
         if not user or not user.email:
             return {"error": "User not found or no email address"}
         
-        # Get available parking lots
-        available_lots = ParkingLot.query.filter_by(is_active=True).all()
-        
         # Check if user has any active parking sessions
         active_session = ParkingHistory.query.filter(
             ParkingHistory.user_id == user_id,
             ParkingHistory.released_time.is_(None)
         ).first()
         
-        # Prepare email content
-        subject = "Daily Parking Reminder - Book Your Spot!"
-        
-        # Create HTML email content
-        with current_app.test_request_context():
-            html_content = render_template(
-                'daily_reminder.html',
-                user=user,
-                available_lots=available_lots,
-                has_active_session=active_session is not None,
-                current_time=datetime.now().strftime("%I:%M %p"),
-                current_date=datetime.now().strftime("%B %d, %Y")
-            )
-        
-        try:
-            msg = Message(
-                subject=subject,
-                recipients=[user.email],
-                html=html_content
-            )
-            mail.send(msg)
+        msg, = reminder_messages([{
+            'id': user.id,
+            'full_name': user.full_name,
+            'email': user.email,
+            'has_active_session': active_session is not None
+        }])
+        if send_messages([msg], 'reminder')['sent']:
             print(f"Reminder email sent to {user.email}")
             return {"success": True, "email": user.email}
-        except Exception as e:
-            print(f"Failed to send reminder email to {user.email}: {str(e)}")
-            return {"error": str(e)}
+        print(f"Failed to send reminder email to {user.email}")
+        return {"error": "Email could not be delivered"}
 
 @celery.task
 def generate_monthly_report(user_id, month=None, year=None):
@@ -122,95 +111,35 @@ def generate_monthly_report(user_id, month=None, year=None):
         if year is None:
             year = datetime.now().year
         
-        # Calculate date range for the month
-        start_date = datetime(year, month, 1)
-        if month == 12:
-            end_date = datetime(year + 1, 1, 1)
-        else:
-            end_date = datetime(year, month + 1, 1)
-        
         # Get user
         user = User.query.get(user_id)
         if not user:
             return {"error": "User not found"}
         
-        # Get parking history for the month
-        parking_records = ParkingHistory.query.filter(
-            and_(
-                ParkingHistory.user_id == user_id,
-                ParkingHistory.parking_time >= start_date,
-                ParkingHistory.parking_time < end_date
-            )
-        ).all()
-        
-        if not parking_records:
+        # Closed months come from the report store
+        report = monthly_reports([{
+            'id': user.id,
+            'full_name': user.full_name,
+            'email': user.email
+        }], month, year)[user.id]
+        data = report_data(report)
+        if not data['total_bookings']:
             return {"message": "No parking activity found for this month"}
         
-        # Calculate statistics
-        total_bookings = len(parking_records)
-        total_hours = 0
-        total_spent = 0
-        parking_lot_usage = {}
-        cost_breakdown = {}
-        
-        for record in parking_records:
-            # Calculate hours
-            if record.released_time:
-                duration = (record.released_time - record.parking_time).total_seconds() / 3600
-                total_hours += duration
-            else:
-                # For active bookings, calculate until now
-                duration = (datetime.now() - record.parking_time).total_seconds() / 3600
-                total_hours += duration
-            
-            # Calculate cost
-            cost = record.total_cost or 0
-            total_spent += cost
-            
-            # Track parking lot usage
-            lot_name = record.lot.name
-            if lot_name not in parking_lot_usage:
-                parking_lot_usage[lot_name] = 0
-            parking_lot_usage[lot_name] += 1
-            
-            # Track cost breakdown by parking lot
-            if lot_name not in cost_breakdown:
-                cost_breakdown[lot_name] = 0
-            cost_breakdown[lot_name] += cost
-        
-        # Convert to lists for template
-        parking_lot_usage_list = [{"name": name, "count": count} for name, count in parking_lot_usage.items()]
-        parking_lot_usage_list.sort(key=lambda x: x["count"], reverse=True)
-        
-        cost_breakdown_list = [{"name": name, "cost": cost} for name, cost in cost_breakdown.items()]
-        cost_breakdown_list.sort(key=lambda x: x["cost"], reverse=True)
-        
-        # Calculate average duration
-        avg_duration = total_hours / total_bookings if total_bookings > 0 else 0
-        
-        # Get recent bookings (last 5)
-        recent_bookings = ParkingHistory.query.filter(
-            and_(
-                ParkingHistory.user_id == user_id,
-                ParkingHistory.parking_time >= start_date,
-                ParkingHistory.parking_time < end_date
-            )
-        ).order_by(ParkingHistory.parking_time.desc()).limit(5).all()
-        
         # Generate savings tip
-        savings_tip = generate_savings_tip(parking_lot_usage_list, cost_breakdown_list, total_spent)
+        savings_tip = generate_savings_tip(data['parking_lot_usage'], data['cost_breakdown'], data['total_spent'])
         
         # Prepare template data
         template_data = {
-            "report_period": f"{start_date.strftime('%B %Y')}",
-            "generated_date": datetime.now().strftime("%B %d, %Y at %I:%M %p"),
-            "total_bookings": total_bookings,
-            "total_hours": total_hours,
-            "total_spent": total_spent,
-            "avg_duration": avg_duration,
-            "parking_lot_usage": parking_lot_usage_list,
-            "cost_breakdown": cost_breakdown_list,
-            "recent_bookings": recent_bookings,
+            "report_period": f"{datetime(year, month, 1).strftime('%B %Y')}",
+            "generated_date": report.generated_at.strftime("%B %d, %Y at %I:%M %p"),
+            "total_bookings": data['total_bookings'],
+            "total_hours": data['total_hours'],
+            "total_spent": data['total_spent'],
+            "avg_duration": data['avg_duration'],
+            "parking_lot_usage": data['parking_lot_usage'],
+            "cost_breakdown": data['cost_breakdown'],
+            "recent_bookings": data['recent_bookings'],
             "savings_tip": savings_tip
         }
         
@@ -237,91 +166,46 @@ def send_monthly_report_email(user_id, month=None, year=None):
         else:
             year = datetime.now().year
 
-        # Create proper date range for the month
-        start_date = datetime(year, month, 1)
-        if month == 12:
-            end_date = datetime(year + 1, 1, 1)
-        else:
-            end_date = datetime(year, month + 1, 1)
-        
         user = User.query.get(user_id)
         if not user:
             return {"error": "User not found"}
-        
-        # Get parking records for the month
-        records = ParkingHistory.query.filter(
-            ParkingHistory.user_id == user_id,
-            ParkingHistory.parking_time >= start_date,
-            ParkingHistory.parking_time < end_date
-        ).order_by(ParkingHistory.parking_time.desc()).all()
-        
-        # Calculate statistics
-        total_bookings = len(records)
-        total_spent = sum(r.total_cost or 0 for r in records)
-        
-        # Calculate parking lot usage
-        lot_usage = {}
-        for r in records:
-            lot_name = r.lot.name if r.lot else "Unknown"
-            lot_usage[lot_name] = lot_usage.get(lot_name, 0) + 1
-        
-        most_used_lot = max(lot_usage, key=lot_usage.get) if lot_usage else "N/A"
-        
-        # Calculate average session duration
-        total_hours = 0
-        completed_sessions = 0
-        for r in records:
-            if r.parking_time and r.released_time:
-                duration = (r.released_time - r.parking_time).total_seconds() / 3600
-                total_hours += duration
-                completed_sessions += 1
-            elif r.parking_time:
-                # For active sessions, calculate until now
-                duration = (datetime.now() - r.parking_time).total_seconds() / 3600
-                total_hours += duration
-                completed_sessions += 1
-        
-        avg_duration = total_hours / completed_sessions if completed_sessions > 0 else 0
-        
-        # Get current time in IST
-        ist = pytz.timezone('Asia/Kolkata')
-        current_time_ist = datetime.now(ist)
-        
-        html = render_template(
-            'monthly_report.html',
-            user=user,
-            total_bookings=total_bookings,
-            total_spent=total_spent,
-            most_used_lot=most_used_lot,
-            records=records,
-            month=start_date.strftime('%B'),
-            year=year,
-            current_time=current_time_ist.strftime('%I:%M %p'),
-            generated_date=current_time_ist.strftime('%B %d, %Y at %I:%M %p'),
-            avg_duration=avg_duration,
-            total_hours=total_hours,
-            completed_sessions=completed_sessions,
-            pytz=pytz,
-            datetime=datetime
-        )
-        
-        subject_str = f"Your {start_date.strftime('%B %Y')} Parking Activity Report"
-        
-        msg = Message(
-            subject=subject_str,
-            recipients=[user.email],
-            html=html
-        )
-        mail.send(msg)
+
+        msg, = monthly_report_messages([{
+            'id': user.id,
+            'full_name': user.full_name,
+            'email': user.email
+        }], month, year)
+        if not send_messages([msg], 'monthly_report')['sent']:
+            return {"error": "Email could not be delivered"}
         return {"success": True}
 
 @celery.task
-def send_all_monthly_reports():
+def send_all_monthly_reports(month=None, year=None):
+    """
+    Queue one report batch per chunk of users; defaults to the month that just ended
+    """
+    from app import app
+    with app.app_context():
+        if month is None or year is None:
+            month, year = previous_month()
+        batches = 0
+        users = 0
+        for chunk in report_recipients():
+            send_monthly_report_batch.delay(chunk, int(month), int(year))
+            batches += 1
+            users += len(chunk)
+        return {"batches": batches, "users": users}
+
+@celery.task
+def send_monthly_report_batch(users, month, year):
+    """
+    Aggregate, render and send the monthly reports for a chunk of users from report_recipients()
+    """
     from app import app
     with app.app_context():
-        users = User.query.filter_by(role='user').all()
-        for user in users:
-            send_monthly_report_email.delay(user.id)
+        result = send_messages(monthly_report_messages(users, month, year), 'monthly_report')
+        print(f"Monthly report batch: {result['sent']}/{len(users)} emails sent")
+        return {"sent": result['sent'], "failed": result['failed']}
 
 @celery.on_after_configure.connect
 def setup_periodic_tasks(sender, **kwargs):
@@ -332,33 +216,49 @@ def setup_periodic_tasks(sender, **kwargs):
     )
 
 @celery.task
-def export_user_parking_history_csv(user_id):
+def sample_lot_occupancy():
+    """Record every lot's current occupancy for the admin occupancy history"""
+    from app import app
+    with app.app_context():
+        return sample_occupancy()
+
+@celery.task
+def compact_occupancy_samples():
+    """Downsample old occupancy samples to hourly rows and apply retention"""
+    from app import app
+    with app.app_context():
+        return compact_occupancy()
+
+@celery.task
+def build_forecast_profiles():
+    """Rebuild the per-lot arrival/departure profiles behind the forecasts"""
+    from app import app
+    with app.app_context():
+        return refresh_forecast_profiles()
+
+@celery.task(bind=True)
+def export_user_parking_history_csv(self, user_id):
     from app import app
     with app.app_context():
         user = User.query.get(user_id)
         if not user:
             return {"error": "User not found"}
-        records = ParkingHistory.query.filter_by(user_id=user_id).order_by(ParkingHistory.parking_time.desc()).all()
-        if not records:
+        # One file per task, so concurrent exports for a user don't overwrite each other
+        filename = export_filename(user_id, self.request.id)
+        rows = write_history_csv(
+            user_id, filename,
+            progress=lambda written, total: self.update_state(state='PROGRESS', meta={'rows': written, 'total': total})
+        )
+        if not rows:
             return {"error": "No parking history found"}
-        export_dir = os.path.join(current_app.root_path, 'exports')
-        os.makedirs(export_dir, exist_ok=True)
-        filename = f'user_{user_id}_parking_history.csv'
-        filepath = os.path.join(export_dir, filename)
-        with open(filepath, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow(['slot_id', 'spot_id', 'lot_name', 'parking_time', 'released_time', 'cost', 'remarks'])
-            for r in records:
-                writer.writerow([
-                    r.id,
-                    r.spot_id,
-                    r.lot.name if r.lot else '',
-                    r.parking_time.replace(tzinfo=pytz.UTC).astimezone(pytz.timezone('Asia/Kolkata')).strftime('%Y-%m-%d %I:%M %p') if r.parking_time else '',
-                    r.released_time.replace(tzinfo=pytz.UTC).astimezone(pytz.timezone('Asia/Kolkata')).strftime('%Y-%m-%d %I:%M %p') if r.released_time else '',
-                    r.total_cost or 0,
-                    r.status or ''
-                ])
-        return {"success": True, "filename": filename}
+        return {"success": True, "filename": filename, "rows": rows}
+
+@celery.task
+def remove_expired_exports():
+    """Delete every user's CSV exports older than EXPORT_RETENTION"""
+    from app import app
+    with app.app_context():
+        return {"removed": remove_old_exports()}
 
 def generate_savings_tip(parking_lot_usage, cost_breakdown, total_spent):
     """
@@ -404,4 +304,24 @@ def setup_periodic_tasks(sender, **kwargs):
         crontab(day_of_month=1, hour=9, minute=0),
         send_all_monthly_reports.s(),
         name='send-monthly-reports'
+    )
+    sender.add_periodic_task(
+        float(sender.conf.get('OCCUPANCY_SAMPLE_INTERVAL', 60)),
+        sample_lot_occupancy.s(),
+        name='sample-lot-occupancy'
+    )
+    sender.add_periodic_task(
+        crontab(minute=7),
+        compact_occupancy_samples.s(),
+        name='compact-occupancy-samples'
+    )
+    sender.add_periodic_task(
+        crontab(hour=2, minute=30),
+        build_forecast_profiles.s(),
+        name='build-forecast-profiles'
+    )
+    sender.add_periodic_task(
+        crontab(minute=40),
+        remove_expired_exports.s(),
+        name='remove-expired-exports'
     ) 
\ No newline at end of file
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Test script for the spot -> active session pointer
+
+Checks park sets ParkingSpot.current_history_id and unpark clears it, that
+unpark and the admin spot details read the session by primary key only, that
+the database refuses a second active session on the same spot, and that the
+pointer is a foreign key the spot details don't follow to another spot's or a
+closed session.
+"""
+import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from bench_harness import make_parking_app
+from extensions import db
+from models.parking_history import ParkingHistory
+from models.parking_spot import ParkingSpot
+from models.vehicle import Vehicle
+
+
+def setup_app():
+    app, ctx = make_parking_app(num_spots=3, lot_name='Pointer Lot', plates=['MH12PT0001'])
+    return app, app.test_client(), ctx
+
+
+def history_selects(app, action):
+    """Run action() and return the SELECTs it issued against parking_history"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('SELECT') and 'FROM parking_history' in statement:
+            statements.append(' '.join(statement.split()))
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        action()
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    return statements
+
+
+def test_pointer_follows_park_and_unpark():
+    app, client, ctx = setup_app()
+    resp = client.post('/api/parking/auto-park', json={'vehicle_id': ctx['vehicle_id'], 'lot_id': ctx['lot_id']}, headers=ctx['user'])
+    assert resp.status_code == 200
+    spot_id = resp.get_json()['spot_id']
+    with app.app_context():
+        spot = db.session.get(ParkingSpot, spot_id)
+        history = db.session.get(ParkingHistory, spot.current_history_id)
+        assert (history.spot_id, history.vehicle_id, history.status) == (spot_id, ctx['vehicle_id'], 'active')
+
+    details = []
+    selects = history_selects(app, lambda: details.append(
+        client.get(f'/api/admin/parking-spots/{spot_id}/details', headers=ctx['admin']).get_json()))
+    assert details[0]['start_time'] and details[0]['est_parking_cost'] is not None
+    assert len(selects) == 1 and selects[0].endswith('WHERE parking_history.id = ?')
+
+    selects = history_selects(app, lambda: client.post('/api/parking/unpark', json={'vehicle_id': ctx['vehicle_id']}, headers=ctx['user']))
+    assert len(selects) == 1 and selects[0].endswith('WHERE parking_history.id = ?')
+    with app.app_context():
+        assert db.session.get(ParkingSpot, spot_id).current_history_id is None
+        assert db.session.get(ParkingHistory, history.id).status == 'out'
+
+    # Parking on the same spot again starts a new session
+    resp = client.post('/api/parking/park', json={'vehicle_no': 'MH12PT0001', 'spot_id': spot_id}, headers=ctx['user'])
+    assert resp.status_code == 200
+    with app.app_context():
+        assert db.session.get(ParkingSpot, spot_id).current_history_id not in (None, history.id)
+
+
+def test_spot_without_session_has_no_start_time():
+    app, client, ctx = setup_app()
+    with app.app_context():
+        spot = ParkingSpot.query.filter_by(lot_id=ctx['lot_id']).first()
+        spot.is_occupied = True
+        db.session.get(Vehicle, ctx['vehicle_id']).spot_id = spot.id
+        db.session.commit()
+        spot_id = spot.id
+    details = client.get(f'/api/admin/parking-spots/{spot_id}/details', headers=ctx['admin']).get_json()
+    assert details['vehicle']['license_plate'] == 'MH12PT0001'
+    assert (details['start_time'], details['est_parking_cost']) == (None, None)
+    resp = client.post('/api/parking/unpark', json={'vehicle_id': ctx['vehicle_id']}, headers=ctx['user'])
+    assert resp.status_code == 404
+
+
+def test_one_active_session_per_spot():
+    app, client, ctx = setup_app()
+    resp = client.post('/api/parking/auto-park', json={'vehicle_id': ctx['vehicle_id'], 'lot_id': ctx['lot_id']}, headers=ctx['user'])
+    spot_id = resp.get_json()['spot_id']
+    with app.app_context():
+        db.session.add(ParkingHistory(user_id=ctx['user_id'], vehicle_id=ctx['vehicle_id'], lot_id=ctx['lot_id'],
+                                      spot_id=spot_id, status='active'))
+        with pytest.raises(IntegrityError):
+            db.session.commit()
+        db.session.rollback()
+        # Closed sessions on the spot are fine
+        db.session.add(ParkingHistory(user_id=ctx['user_id'], vehicle_id=ctx['vehicle_id'], lot_id=ctx['lot_id'],
+                                      spot_id=spot_id, status='out'))
+        db.session.commit()
+
+
+def test_pointer_is_checked():
+    app, client, ctx = setup_app()
+    resp = client.post('/api/parking/auto-park', json={'vehicle_id': ctx['vehicle_id'], 'lot_id': ctx['lot_id']}, headers=ctx['user'])
+    spot_id = resp.get_json()['spot_id']
+    with app.app_context():
+        with db.engine.connect() as conn:
+            conn.exec_driver_sql('PRAGMA foreign_keys = ON')
+            with pytest.raises(IntegrityError):
+                conn.exec_driver_sql('UPDATE parking_spot SET current_history_id = 999 WHERE id = ?', (spot_id,))
+            conn.rollback()
+        # Point the spot at a closed session of another spot
+        other = ParkingSpot.query.filter(ParkingSpot.lot_id == ctx['lot_id'], ParkingSpot.id != spot_id).first()
+        closed = ParkingHistory(user_id=ctx['user_id'], vehicle_id=ctx['vehicle_id'], lot_id=ctx['lot_id'],
+                                spot_id=other.id, status='out')
+        db.session.add(closed)
+        db.session.flush()
+        db.session.get(ParkingSpot, spot_id).current_history_id = closed.id
+        db.session.commit()
+    details = client.get(f'/api/admin/parking-spots/{spot_id}/details', headers=ctx['admin']).get_json()
+    assert (details['start_time'], details['est_parking_cost']) == (None, None)
+
+
+if __name__ == "__main__":
+    test_pointer_follows_park_and_unpark()
+    test_spot_without_session_has_no_start_time()
+    test_one_active_session_per_spot()
+    test_pointer_is_checked()
+    print("✅ Active session pointer tests passed")
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Test script for the admin user listing's SQL statement budget
+
+Counts the statements issued by GET /api/admin/users per page and checks the
+number stays the same as users and parked vehicles grow (no N+1), along with
+pagination, sorting and the X-Total-Count header.
+"""
+from contextlib import contextmanager
+from sqlalchemy import event
+from bench_harness import make_app, seed_lot, make_user, auth_headers
+from extensions import db
+from models.parking_spot import ParkingSpot
+from models.user import User
+from models.vehicle import Vehicle
+
+# The admin lookup in admin_required plus the single listing query
+STATEMENTS_PER_PAGE = 2
+
+
+def setup_app(num_users):
+    app = make_app()
+    with app.app_context():
+        lot = seed_lot(num_users, name='Query Lot')
+        admin = make_user('admin@example.com', role='admin')
+        db.session.execute(User.__table__.insert(), [
+            {'email': f'user{i:05d}@example.com', 'password_hash': 'x', 'full_name': f'User {i:05d}', 'role': 'user'}
+            for i in range(num_users)
+        ])
+        user_ids = [u.id for u in User.query.filter_by(role='user').order_by(User.id)]
+        spot_ids = [s.id for s in ParkingSpot.query.filter_by(lot_id=lot.id).order_by(ParkingSpot.id)]
+        # Every other user has a parked vehicle, every user an unparked one
+        db.session.execute(Vehicle.__table__.insert(), [
+            row for i, user_id in enumerate(user_ids) for row in (
+                {'user_id': user_id, 'spot_id': spot_ids[i] if i % 2 == 0 else None, 'license_plate': f'DL{i:06d}A'},
+                {'user_id': user_id, 'spot_id': None, 'license_plate': f'DL{i:06d}B'},
+            )
+        ])
+        db.session.execute(ParkingSpot.__table__.update().where(
+            ParkingSpot.id.in_(spot_ids[::2])).values(is_occupied=True))
+        db.session.commit()
+        headers = auth_headers(admin)
+    return app, headers
+
+
+@contextmanager
+def count_statements(app):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def test_statements_per_page_do_not_grow():
+    for num_users in (10, 200):
+        app, headers = setup_app(num_users)
+        client = app.test_client()
+        for url in ['/api/admin/users', '/api/admin/users?page=1&per_page=50', '/api/admin/users?page=2&per_page=5']:
+            with count_statements(app) as statements:
+                resp = client.get(url, headers=headers)
+            assert resp.status_code == 200, url
+            assert len(statements) == STATEMENTS_PER_PAGE, (url, num_users, statements)
+            assert resp.headers['X-Total-Count'] == str(num_users)
+        print(f"{num_users} users: {STATEMENTS_PER_PAGE} statements per page")
+
+
+def test_pagination_sorting_and_current_spots():
+    app, headers = setup_app(12)
+    client = app.test_client()
+
+    everyone = client.get('/api/admin/users', headers=headers).get_json()
+    assert everyone['total'] == 12 and len(everyone['users']) == 12
+    assert all(u['role'] == 'user' for u in everyone['users'])
+
+    page = client.get('/api/admin/users?page=2&per_page=5&sort=full_name&order=desc', headers=headers).get_json()
+    names = [u['full_name'] for u in page['users']]
+    assert names == [f'User {i:05d}' for i in range(6, 1, -1)]
+    assert (page['page'], page['per_page'], page['total']) == (2, 5, 12)
+
+    last = client.get('/api/admin/users?page=3&per_page=5', headers=headers)
+    assert len(last.get_json()['users']) == 2 and last.headers['X-Total-Count'] == '12'
+    past_end = client.get('/api/admin/users?page=9&per_page=5', headers=headers)
+    assert past_end.get_json()['users'] == [] and past_end.headers['X-Total-Count'] == '12'
+
+    by_name = {u['full_name']: u for u in everyone['users']}
+    parked = by_name['User 00000']['current_spots']
+    assert [(s['lot_name'], s['license_plate']) for s in parked] == [('Query Lot', 'DL000000A')]
+    assert by_name['User 00001']['current_spots'] == []
+
+    assert client.get('/api/admin/users?sort=password_hash', headers=headers).status_code == 400
+
+
+if __name__ == "__main__":
+    test_statements_per_page_do_not_grow()
+    test_pagination_sorting_and_current_spots()
+    print("✅ Admin user listing query tests passed")
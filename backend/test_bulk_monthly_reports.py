@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test script for the bulk monthly report engine
+
+Checks the grouped per-user aggregates (bookings, spend, hours with open
+sessions counted up to now, most used lot, per-lot breakdown) against the
+sessions they come from, that a chunk of users costs two queries however many
+sessions it has, that every recipient gets a rendered report, and the
+recipient chunks and month helpers.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from bench_harness import make_app, seed_lot, make_user
+from extensions import db
+from models.parking_history import ParkingHistory
+from models.vehicle import Vehicle
+from utils.monthly_reports import (month_range, monthly_report_messages, monthly_summaries, previous_month,
+                                   report_recipients)
+
+NOW = datetime(2026, 6, 20, 12)
+
+
+def setup_app():
+    app = make_app()
+    with app.app_context():
+        north = seed_lot(4, name='North Lot')
+        south = seed_lot(4, name='South Lot')
+        users = {name: make_user(f'{name}@example.com', full_name=name.title()) for name in ('busy', 'single', 'idle')}
+        make_user('admin@example.com', role='admin')
+
+        def session(name, lot, start, hours=None, cost=None):
+            vehicle = Vehicle(user_id=users[name].id, license_plate=f'TN{users[name].id:04d}{start.day:02d}')
+            db.session.add(vehicle)
+            db.session.flush()
+            db.session.add(ParkingHistory(
+                user_id=users[name].id, vehicle_id=vehicle.id, lot_id=lot.id, spot_id=lot.spots[0].id,
+                parking_time=start, released_time=start + timedelta(hours=hours) if hours else None,
+                total_cost=cost, status='out' if hours else 'active'
+            ))
+
+        session('busy', north, datetime(2026, 6, 2, 9), 2, 40.0)
+        session('busy', south, datetime(2026, 6, 3, 9), 1, 20.0)
+        session('busy', south, datetime(2026, 6, 4, 9), 3, 60.0)
+        session('busy', north, datetime(2026, 5, 30, 9), 5, 100.0)
+        session('single', north, datetime(2026, 6, 20, 10))
+        db.session.commit()
+        ids = {name: user.id for name, user in users.items()}
+    return app, ids
+
+
+def test_summaries_aggregate_each_users_month():
+    app, ids = setup_app()
+    with app.app_context():
+        summaries = monthly_summaries(list(ids.values()), 6, 2026, now=NOW)
+    assert set(summaries) == {ids['busy'], ids['single']}
+    busy = summaries[ids['busy']]
+    assert busy['total_bookings'] == 3
+    assert busy['total_spent'] == 120.0
+    assert round(busy['total_hours'], 6) == 6
+    assert round(busy['avg_duration'], 6) == 2
+    assert busy['most_used_lot'] == 'South Lot'
+    assert busy['parking_lot_usage'] == [{'name': 'South Lot', 'count': 2}, {'name': 'North Lot', 'count': 1}]
+    assert busy['cost_breakdown'] == [{'name': 'South Lot', 'cost': 80.0}, {'name': 'North Lot', 'cost': 40.0}]
+    # The open session counts up to now
+    single = summaries[ids['single']]
+    assert (single['total_bookings'], single['total_spent'], round(single['total_hours'], 6)) == (1, 0, 2)
+
+
+def test_chunk_costs_two_queries_and_reaches_everyone():
+    app, ids = setup_app()
+    with app.app_context():
+        users, = list(report_recipients(chunk_size=10))
+        assert [user['id'] for user in users] == sorted(ids.values())
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            messages = monthly_report_messages(users, 6, 2026, now=NOW)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        assert len(statements) == 2
+    assert [msg.recipients for msg in messages] == [[user['email']] for user in users]
+    assert messages[0].subject == 'Your June 2026 Parking Activity Report'
+    busy_html = messages[[user['id'] for user in users].index(ids['busy'])].html
+    assert 'South Lot' in busy_html and '₹120.00' in busy_html
+    idle_html = messages[[user['id'] for user in users].index(ids['idle'])].html
+    assert 'Hello <strong>Idle</strong>' in idle_html
+
+
+def test_recipient_chunks_and_months():
+    app, ids = setup_app()
+    with app.app_context():
+        chunks = list(report_recipients(chunk_size=2))
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    assert previous_month(datetime(2026, 1, 1, 9)) == (12, 2025)
+    assert previous_month(datetime(2026, 7, 1, 9)) == (6, 2026)
+    assert month_range(12, 2025) == (datetime(2025, 12, 1), datetime(2026, 1, 1))
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Test script for tag-based cache invalidation
+
+Warms every cached view, performs a mutation through the API and checks the
+next read reflects it (no stale reads). Runs against a throwaway SQLite app:
+python test_cache_invalidation.py  (or python -m pytest test_cache_invalidation.py)
+"""
+from bench_harness import make_parking_app
+
+
+def setup_app():
+    app, ctx = make_parking_app(lot_name='Cache Lot', full_name='Driver One')
+    return app.test_client(), ctx
+
+
+def occupied_plates(spots):
+    return {s['spot_number']: s['vehicle_plate'] for s in spots if s['is_occupied']}
+
+
+def test_park_and_unpark_refresh_lot_views():
+    client, ctx = setup_app()
+    lot_id = ctx['lot_id']
+    views = {
+        'lots': lambda: client.get('/api/parking/lots', headers=ctx['user']).get_json()['lots'][0]['available_spots'],
+        'spots': lambda: occupied_plates(client.get(f'/api/parking/lots/{lot_id}/spots', headers=ctx['user']).get_json()['spots']),
+        'admin_spots': lambda: occupied_plates(client.get(f'/api/admin/parking-lots/{lot_id}/spots', headers=ctx['admin']).get_json()['spots']),
+        'admin_lots': lambda: client.get('/api/admin/parking-lots', headers=ctx['admin']).get_json()['lots'][0]['occupied_spots'],
+        'occupancy': lambda: client.get('/api/admin/summary/occupancy', headers=ctx['admin']).get_json()['occupancy_per_lot'][0]['occupied_spots'],
+        'vehicles': lambda: client.get('/api/parking/vehicles', headers=ctx['user']).get_json()['vehicles'][0]['is_parked'],
+        'history': lambda: len(client.get('/api/parking/history', headers=ctx['user']).get_json()['history']),
+        'spot_search': lambda: len(client.get('/api/admin/parking-spots/search?query=occupied', headers=ctx['admin']).get_json()['results']),
+    }
+    before = {name: read() for name, read in views.items()}
+
+    resp = client.post('/api/parking/auto-park', json={'vehicle_id': ctx['vehicle_id'], 'lot_id': lot_id}, headers=ctx['user'])
+    assert resp.status_code == 200
+    parked = {name: read() for name, read in views.items()}
+    assert parked == {
+        'lots': before['lots'] - 1,
+        'spots': {'1': 'TN01AB1234'},
+        'admin_spots': {'1': 'TN01AB1234'},
+        'admin_lots': 1,
+        'occupancy': 1,
+        'vehicles': True,
+        'history': 1,
+        'spot_search': 1,
+    }
+
+    resp = client.post('/api/parking/unpark', json={'vehicle_id': ctx['vehicle_id']}, headers=ctx['user'])
+    assert resp.status_code == 200
+    released = {name: read() for name, read in views.items()}
+    assert released == dict(before, history=1)
+    revenue = client.get('/api/admin/summary/revenue', headers=ctx['admin']).get_json()['revenue_per_lot'][0]['revenue']
+    assert revenue > 0
+
+
+def test_user_updates_refresh_search_results():
+    client, ctx = setup_app()
+
+    def search(query):
+        resp = client.get(f'/api/admin/users/search?query={query}', headers=ctx['admin'])
+        return [u['full_name'] for u in resp.get_json()['results']]
+
+    assert search('driver') == ['Driver One']
+    assert search('renamed') == []
+
+    resp = client.put(f"/api/admin/users/{ctx['user_id']}", json={'full_name': 'Renamed Driver'}, headers=ctx['admin'])
+    assert resp.status_code == 200
+    assert search('driver') == ['Renamed Driver']
+    assert search('renamed') == ['Renamed Driver']
+
+    resp = client.post('/api/auth/register', json={'email': 'new@example.com', 'password': 'pw', 'full_name': 'New Driver'})
+    assert resp.status_code == 201
+    assert sorted(search('driver')) == ['New Driver', 'Renamed Driver']
+
+
+def test_vehicle_add_refreshes_vehicle_list():
+    client, ctx = setup_app()
+    assert len(client.get('/api/parking/vehicles', headers=ctx['user']).get_json()['vehicles']) == 1
+    resp = client.post('/api/parking/vehicles', json={'license_plate': 'TN02CD5678'}, headers=ctx['user'])
+    assert resp.status_code == 201
+    assert len(client.get('/api/parking/vehicles', headers=ctx['user']).get_json()['vehicles']) == 2
+
+
+def test_lot_edits_refresh_admin_views():
+    client, ctx = setup_app()
+    lot_id = ctx['lot_id']
+
+    def admin_lot():
+        return client.get('/api/admin/parking-lots', headers=ctx['admin']).get_json()['lots'][0]
+
+    def spot_count():
+        return len(client.get(f'/api/admin/parking-lots/{lot_id}/spots', headers=ctx['admin']).get_json()['spots'])
+
+    def lot_search(query):
+        return len(client.get(f'/api/admin/parking-lots/search?query={query}', headers=ctx['admin']).get_json()['results'])
+
+    assert (admin_lot()['name'], admin_lot()['total_spots'], spot_count(), lot_search('harbour')) == ('Cache Lot', 4, 4, 0)
+
+    resp = client.put(f'/api/admin/parking-lots/{lot_id}', json={'name': 'Harbour Lot', 'max_spots': 6}, headers=ctx['admin'])
+    assert resp.status_code == 200
+    assert (admin_lot()['name'], admin_lot()['total_spots'], spot_count(), lot_search('harbour')) == ('Harbour Lot', 6, 6, 1)
+    assert client.get('/api/parking/lots', headers=ctx['user']).get_json()['lots'][0]['name'] == 'Harbour Lot'
+
+    resp = client.post('/api/admin/parking-lots', json={
+        'name': 'Second Lot', 'address': 'Road 2', 'pincode': '600002', 'price_per_hour': 10, 'max_spots': 3
+    }, headers=ctx['admin'])
+    assert resp.status_code == 201
+    assert len(client.get('/api/parking/lots', headers=ctx['user']).get_json()['lots']) == 2
+
+    resp = client.delete(f"/api/admin/parking-lots/{resp.get_json()['id']}", headers=ctx['admin'])
+    assert resp.status_code == 200
+    assert len(client.get('/api/admin/summary/occupancy', headers=ctx['admin']).get_json()['occupancy_per_lot']) == 1
+
+
+def main():
+    tests = [
+        test_park_and_unpark_refresh_lot_views,
+        test_user_updates_refresh_search_results,
+        test_vehicle_add_refreshes_vehicle_list,
+        test_lot_edits_refresh_admin_views,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Test script for the streamed gzip CSV export
+
+Checks the exported rows (newest first, lot name, IST times as before),
+progress reporting per chunk, one file per task with no partial file left
+behind, removal of expired exports, the export status payloads and resumable
+downloads (Range requests answered with 206) limited to the user's own files.
+"""
+import csv
+import gzip
+import io
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import pytz
+from bench_harness import make_parking_app, make_user
+from extensions import db
+from models.parking_history import ParkingHistory
+from utils.csv_export import HEADER, export_filename, export_status, remove_old_exports, write_history_csv
+
+START = datetime(2026, 3, 1, 8)
+
+
+def setup_app(directory, sessions=25):
+    app, ctx = make_parking_app(lot_name='Harbour Lot', EXPORT_DIR=directory, EXPORT_CHUNK_SIZE=10)
+    with app.app_context():
+        ctx['other_id'] = make_user('other@example.com').id
+        db.session.add_all([ParkingHistory(
+            user_id=ctx['user_id'], vehicle_id=ctx['vehicle_id'], lot_id=ctx['lot_id'], spot_id=1 + i % 4,
+            parking_time=START + timedelta(hours=i * 5), released_time=START + timedelta(hours=i * 5 + 2),
+            total_cost=40.0, status='out'
+        ) for i in range(sessions)])
+        db.session.commit()
+    return app, ctx
+
+
+def read_export(directory, filename):
+    with gzip.open(os.path.join(directory, filename), 'rt', newline='', encoding='utf-8') as f:
+        return list(csv.reader(f))
+
+
+def test_export_streams_every_row_with_progress():
+    with tempfile.TemporaryDirectory() as directory:
+        app, ctx = setup_app(directory)
+        progress = []
+        with app.app_context():
+            rows = write_history_csv(ctx['user_id'], export_filename(ctx['user_id'], 'task-a'),
+                                     progress=lambda written, total: progress.append((written, total)))
+        assert rows == 25
+        assert progress == [(10, 25), (20, 25), (25, 25)]
+        content = read_export(directory, export_filename(ctx['user_id'], 'task-a'))
+        assert content[0] == HEADER
+        assert len(content) == 26
+        ist = lambda dt: pytz.UTC.localize(dt).astimezone(pytz.timezone('Asia/Kolkata')).strftime('%Y-%m-%d %I:%M %p')
+        newest = START + timedelta(hours=24 * 5)
+        assert content[1][2:5] == ['Harbour Lot', ist(newest), ist(newest + timedelta(hours=2))]
+        assert content[1][5:] == ['40.0', 'out']
+        assert os.listdir(directory) == [export_filename(ctx['user_id'], 'task-a')]
+
+
+def test_each_task_gets_its_own_file_and_empty_history_writes_none():
+    with tempfile.TemporaryDirectory() as directory:
+        app, ctx = setup_app(directory)
+        with app.app_context():
+            write_history_csv(ctx['user_id'], export_filename(ctx['user_id'], 'task-a'))
+            write_history_csv(ctx['user_id'], export_filename(ctx['user_id'], 'task-b'))
+            assert write_history_csv(ctx['other_id'], export_filename(ctx['other_id'], 'task-c')) == 0
+        assert sorted(os.listdir(directory)) == [export_filename(ctx['user_id'], 'task-a'),
+                                                 export_filename(ctx['user_id'], 'task-b')]
+
+
+def test_expired_exports_are_removed():
+    with tempfile.TemporaryDirectory() as directory:
+        app, ctx = setup_app(directory)
+        user, other = ctx['user_id'], ctx['other_id']
+        old = time.time() - 2 * 24 * 3600
+        files = {
+            'user_old': export_filename(user, 'old'),
+            'user_part': export_filename(user, 'crashed') + '.part',
+            'user_recent': export_filename(user, 'recent'),
+            'other_old': export_filename(other, 'old'),
+            'unrelated': 'notes.txt',
+        }
+        for key, filename in files.items():
+            path = os.path.join(directory, filename)
+            open(path, 'wb').close()
+            if key != 'user_recent':
+                os.utime(path, (old, old))
+
+        # Starting an export clears the user's own expired files only
+        with app.app_context():
+            write_history_csv(user, export_filename(user, 'new'))
+        assert sorted(os.listdir(directory)) == sorted([
+            files['user_recent'], files['other_old'], files['unrelated'], export_filename(user, 'new')])
+
+        # The beat task's sweep covers every user
+        with app.app_context():
+            assert remove_old_exports() == 1
+            assert remove_old_exports(now=time.time() + 2 * 24 * 3600) == 2
+        assert os.listdir(directory) == ['notes.txt']
+
+
+def test_status_payloads():
+    assert export_status(SimpleNamespace(state='PROGRESS', info={'rows': 10, 'total': 25}), '/dl') == {
+        'ready': False, 'progress': {'rows': 10, 'total': 25}}
+    assert export_status(SimpleNamespace(state='SUCCESS', result={'success': True, 'filename': 'f.csv.gz', 'rows': 3}),
+                         '/dl') == {'ready': True, 'rows': 3, 'download_url': '/dl/f.csv.gz'}
+    assert export_status(SimpleNamespace(state='PENDING'), '/dl') == {'ready': False}
+
+
+def test_download_supports_range_and_own_files_only():
+    with tempfile.TemporaryDirectory() as directory:
+        app, ctx = setup_app(directory, sessions=500)
+        filename = export_filename(ctx['user_id'], 'task-a')
+        with app.app_context():
+            write_history_csv(ctx['user_id'], filename)
+        with open(os.path.join(directory, filename), 'rb') as f:
+            data = f.read()
+        client = app.test_client()
+        for base in ('/api/parking/download-csv/', '/api/admin/download-csv/'):
+            full = client.get(base + filename, headers=ctx['user'])
+            assert full.status_code == 200 and full.data == data
+            assert full.mimetype == 'application/gzip'
+            assert full.headers['Accept-Ranges'] == 'bytes'
+            # Resume after the first 1,000 bytes
+            rest = client.get(base + filename, headers=dict(ctx['user'], Range='bytes=1000-'))
+            assert rest.status_code == 206
+            assert rest.headers['Content-Range'] == f'bytes 1000-{len(data) - 1}/{len(data)}'
+            assert gzip.GzipFile(fileobj=io.BytesIO(data[:1000] + rest.data)).read() == gzip.decompress(data)
+
+            denied = client.get(base + export_filename(ctx['other_id'], 'task-a'), headers=ctx['user'])
+            assert denied.status_code == 403
+            assert client.get(base + filename + '.part', headers=ctx['user']).status_code == 404
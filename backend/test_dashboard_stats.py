@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Test script for the admin dashboard counters
+
+Checks the single-statement stats against direct counts, that both dashboard
+views are cached and answer a matching If-None-Match with 304, and that
+registering, adding a vehicle, parking and lot edits show up on the next read.
+"""
+from bench_harness import make_parking_app, seed_lot
+from models.parking_spot import ParkingSpot
+from models.user import User
+from models.vehicle import Vehicle
+
+
+def setup_app():
+    app, ctx = make_parking_app(num_spots=5, occupied=2, lot_name='Dash Lot', plates=['DL01DS0001'])
+    with app.app_context():
+        seed_lot(3, name='Side Lot')
+    return app, app.test_client(), ctx
+
+
+def test_stats_match_counts_in_one_statement():
+    app, client, ctx = setup_app()
+    resp = client.get('/api/admin/dashboard', headers=ctx['admin'])
+    # The admin check plus the stats statement
+    assert resp.headers['X-DB-Query-Count'] == '2'
+    with app.app_context():
+        assert resp.get_json()['stats'] == {
+            'total_users': User.query.count(),
+            'total_lots': 2,
+            'total_spots': ParkingSpot.query.count(),
+            'occupied_spots': ParkingSpot.query.filter_by(is_occupied=True).count(),
+            'available_spots': 6,
+            'total_vehicles': Vehicle.query.count()
+        }
+
+
+def test_live_stats_revalidate_and_follow_parking():
+    _, client, ctx = setup_app()
+    resp = client.get('/api/admin/dashboard/live', headers=ctx['admin'])
+    assert resp.get_json()['stats'] == {'total_spots': 8, 'occupied_spots': 2, 'available_spots': 6}
+    etag = resp.headers['ETag']
+
+    # Unchanged: 304 straight from the cache, only the admin lookup hits the DB
+    again = client.get('/api/admin/dashboard/live', headers={**ctx['admin'], 'If-None-Match': etag})
+    assert again.status_code == 304 and again.headers['X-DB-Query-Count'] == '1'
+
+    resp = client.post('/api/parking/auto-park', json={'vehicle_id': ctx['vehicle_id'], 'lot_id': ctx['lot_id']}, headers=ctx['user'])
+    assert resp.status_code == 200
+    changed = client.get('/api/admin/dashboard/live', headers={**ctx['admin'], 'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.get_json()['stats']['occupied_spots'] == 3
+    assert client.get('/api/admin/dashboard', headers=ctx['admin']).get_json()['stats']['occupied_spots'] == 3
+
+
+def test_writes_refresh_dashboard():
+    _, client, ctx = setup_app()
+
+    def stats():
+        return client.get('/api/admin/dashboard', headers=ctx['admin']).get_json()['stats']
+
+    before = stats()
+    assert client.post('/api/auth/register', json={
+        'full_name': 'New Driver', 'email': 'new@example.com', 'password': 'secret123', 'phone': '9999999999'
+    }).status_code == 201
+    assert client.post('/api/parking/vehicles', json={'license_plate': 'DL01DS0002'}, headers=ctx['user']).status_code == 201
+    resp = client.post('/api/admin/parking-lots', json={
+        'name': 'New Lot', 'address': 'New Street', 'pincode': '600002', 'price_per_hour': 10,
+        'max_spots': 4, 'location': 'New Street'
+    }, headers=ctx['admin'])
+    assert resp.status_code == 201
+    after = stats()
+    assert (after['total_users'], after['total_vehicles'], after['total_lots'], after['total_spots']) == (
+        before['total_users'] + 1, before['total_vehicles'] + 1, before['total_lots'] + 1, before['total_spots'] + 4
+    )
+
+
+if __name__ == "__main__":
+    test_stats_match_counts_in_one_statement()
+    test_live_stats_revalidate_and_follow_parking()
+    test_writes_refresh_dashboard()
+    print("✅ Dashboard stats tests passed")
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Test script for ETag / If-None-Match on the polled read endpoints
+
+Simulates a gate display polling a lot's spot list with If-None-Match while
+cars occasionally park, checks that unchanged polls get a bodiless 304 and
+changed ones a fresh 200, and reports the response bytes saved.
+"""
+from bench_harness import make_parking_app
+
+POLLS = 100
+PARK_EVERY = 10
+
+
+def setup_app(num_spots=500):
+    app, ctx = make_parking_app(num_spots=num_spots, lot_name='Polled Lot',
+                                plates=[f'KA05MX{i:04d}' for i in range(POLLS // PARK_EVERY)])
+    return app.test_client(), ctx
+
+
+def poll_loop(client, ctx, url, headers):
+    """Poll `url` like a client honouring ETags; returns (bytes_sent, bytes_without_etags, statuses)"""
+    etag = None
+    sent = full = 0
+    statuses = []
+    parked = 0
+    for i in range(POLLS):
+        if i and i % PARK_EVERY == 0:
+            client.post('/api/parking/auto-park', json={
+                'vehicle_id': ctx['vehicle_ids'][parked], 'lot_id': ctx['lot_id']
+            }, headers=ctx['user'])
+            parked += 1
+        request_headers = dict(headers)
+        if etag:
+            request_headers['If-None-Match'] = etag
+        resp = client.get(url, headers=request_headers)
+        statuses.append(resp.status_code)
+        sent += len(resp.get_data())
+        if resp.status_code == 200:
+            etag = resp.headers['ETag']
+            last_body_size = len(resp.get_data())
+        full += last_body_size
+    return sent, full, statuses
+
+
+def test_lot_spots_polling_saves_bytes():
+    client, ctx = setup_app()
+    url = f"/api/parking/lots/{ctx['lot_id']}/spots"
+    sent, full, statuses = poll_loop(client, ctx, url, ctx['user'])
+
+    # One 200 for the first poll and one after each park, 304 otherwise
+    assert statuses.count(200) == 1 + (POLLS - 1) // PARK_EVERY
+    assert statuses.count(304) == POLLS - statuses.count(200)
+    assert sent < full * 0.15
+    print(f"{url}: {sent} bytes sent vs {full} without ETags ({100 * (1 - sent / full):.1f}% saved)")
+
+
+def test_admin_endpoints_honour_if_none_match():
+    client, ctx = setup_app(num_spots=20)
+    for url in ['/api/admin/parking-lots', f"/api/admin/parking-lots/{ctx['lot_id']}/spots",
+                '/api/admin/summary/occupancy', '/api/admin/summary/revenue', '/api/parking/lots']:
+        headers = ctx['user'] if url.startswith('/api/parking') else ctx['admin']
+        first = client.get(url, headers=headers)
+        assert first.status_code == 200 and first.headers.get('ETag'), url
+        assert first.headers.get('Cache-Control', '').startswith('private'), url
+        again = client.get(url, headers={**headers, 'If-None-Match': first.headers['ETag']})
+        assert again.status_code == 304 and again.get_data() == b'', url
+
+    # A park changes the lot, so the old ETag no longer matches
+    url = f"/api/admin/parking-lots/{ctx['lot_id']}/spots"
+    etag = client.get(url, headers=ctx['admin']).headers['ETag']
+    client.post('/api/parking/auto-park', json={'vehicle_id': ctx['vehicle_ids'][0], 'lot_id': ctx['lot_id']}, headers=ctx['user'])
+    assert client.get(url, headers={**ctx['admin'], 'If-None-Match': etag}).status_code == 200
+
+
+if __name__ == "__main__":
+    test_lot_spots_polling_saves_bytes()
+    test_admin_endpoints_honour_if_none_match()
+    print("✅ ETag tests passed")
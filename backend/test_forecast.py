@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test script for the free-spot forecast
+
+Builds profiles from a small, regular history (every Monday four cars arrive
+between 09:00 and 09:15 and leave between 11:00 and 11:15) and checks the
+binning, the forecast stepping from the current occupancy, and the endpoint.
+"""
+from datetime import datetime, timedelta
+import numpy as np
+from bench_harness import make_parking_app
+from extensions import db
+from models.parking_history import ParkingHistory
+from models.parking_lot import ParkingLot
+from utils.forecast import SLOTS_PER_WEEK, forecast_free_spots, refresh_forecast_profiles, slot_of_week, to_epoch
+
+# Monday 2026-06-29 00:00 UTC, four weeks of history before it
+NOW = datetime(2026, 6, 29)
+WEEKS = 4
+
+
+def setup_app():
+    app, ctx = make_parking_app(num_spots=10, lot_name='Forecast Lot', FORECAST_HISTORY_WEEKS=WEEKS)
+    with app.app_context():
+        for week in range(1, WEEKS + 1):
+            monday = NOW - timedelta(weeks=week)
+            for car in range(4):
+                db.session.add(ParkingHistory(
+                    user_id=ctx['user_id'], vehicle_id=ctx['vehicle_id'], lot_id=ctx['lot_id'], spot_id=1,
+                    parking_time=monday + timedelta(hours=9, minutes=3 * car),
+                    released_time=monday + timedelta(hours=11, minutes=3 * car),
+                    total_cost=40.0, status='out'
+                ))
+        db.session.commit()
+    return app, ctx
+
+
+def test_slot_of_week_starts_on_monday():
+    assert slot_of_week(to_epoch(datetime(2026, 6, 29))) == 0
+    assert slot_of_week(to_epoch(datetime(2026, 6, 29, 9, 14))) == 36
+    assert slot_of_week(to_epoch(datetime(2026, 7, 5, 23, 59))) == SLOTS_PER_WEEK - 1
+
+
+def test_forecast_follows_weekly_profile():
+    app, ctx = setup_app()
+    with app.app_context():
+        lot = db.session.get(ParkingLot, ctx['lot_id'])
+        assert forecast_free_spots(lot, 4) is None
+        assert refresh_forecast_profiles(now=NOW) == 1
+
+        forecast = forecast_free_spots(lot, 4, now=NOW + timedelta(hours=8))
+        free = dict((moment.strftime('%H:%M'), round(value, 3)) for moment, value in forecast)
+        assert len(forecast) == 16
+        assert free['09:00'] == 10 and free['09:15'] == 6
+        assert free['11:00'] == 6 and free['11:15'] == 10
+
+        # Starting from a nearly full lot the arrivals are clamped at capacity,
+        # so the departures afterwards free 4 spots rather than 2
+        lot.occupied_count = 8
+        forecast = forecast_free_spots(lot, 3, now=NOW + timedelta(hours=8, minutes=30))
+        assert min(value for _, value in forecast) == 0
+        assert np.isclose(forecast[-1][1], 4)
+
+
+def test_forecast_endpoint():
+    app, ctx = setup_app()
+    client = app.test_client()
+    url = f"/api/parking/lots/{ctx['lot_id']}/forecast?hours=3"
+    resp = client.get(url, headers=ctx['user'])
+    assert resp.status_code == 404 and resp.get_json()['code'] == 'no_forecast'
+
+    with app.app_context():
+        refresh_forecast_profiles(now=NOW)
+    resp = client.get(f"/api/parking/lots/{ctx['lot_id']}/forecast?hours=99", headers=ctx['user'])
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert (body['total_spots'], body['available_now'], body['interval_minutes']) == (10, 10, 15)
+    assert len(body['forecast']) == 24 * 4
+    assert all(0 <= point['expected_free_spots'] <= 10 for point in body['forecast'])
+    assert client.get('/api/parking/lots/999/forecast', headers=ctx['user']).status_code == 404
+
+
+if __name__ == "__main__":
+    test_slot_of_week_starts_on_monday()
+    test_forecast_follows_weekly_profile()
+    test_forecast_endpoint()
+    print("✅ Forecast tests passed")
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Test script for keyset pagination of /api/parking/history
+
+Pages through 23 sessions, most of them sharing a parking_time, by following
+next_cursor and checks every session comes back exactly once, newest first
+with ties broken by id, and that malformed cursors are answered with 400.
+"""
+import base64
+from datetime import datetime, timedelta
+from bench_harness import make_parking_app
+from extensions import db
+from models.parking_history import ParkingHistory
+
+START = datetime(2026, 3, 1, 8)
+
+
+def setup_app():
+    app, ctx = make_parking_app(lot_name='Page Lot')
+    with app.app_context():
+        # Three parking times shared by 8, 8 and 7 sessions
+        sessions = [ParkingHistory(
+            user_id=ctx['user_id'], vehicle_id=ctx['vehicle_id'], lot_id=ctx['lot_id'], spot_id=1,
+            parking_time=START + timedelta(hours=i // 8), released_time=START + timedelta(hours=i // 8 + 1),
+            total_cost=20.0, status='out'
+        ) for i in range(23)]
+        db.session.add_all(sessions)
+        db.session.commit()
+        expected = [h.id for h in sorted(sessions, key=lambda h: (h.parking_time, h.id), reverse=True)]
+    return app.test_client(), ctx['user'], expected
+
+
+def test_pages_cover_tied_rows_exactly_once():
+    client, headers, expected = setup_app()
+    seen, pages, cursor = [], 0, None
+    while True:
+        url = '/api/parking/history?limit=5' + (f'&cursor={cursor}' if cursor else '')
+        resp = client.get(url, headers=headers)
+        assert resp.status_code == 200
+        data = resp.get_json()
+        seen += [row['id'] for row in data['history']]
+        pages += 1
+        cursor = data['next_cursor']
+        if cursor is None:
+            break
+    assert pages == 5
+    assert seen == expected
+
+
+def test_invalid_cursor_is_rejected():
+    client, headers, _ = setup_app()
+    for cursor in ('not-a-cursor', base64.urlsafe_b64encode(b'2026-03-01T08:00:00|abc').decode(),
+                   base64.urlsafe_b64encode(b'yesterday|12').decode(), base64.urlsafe_b64encode(b'\xff\xfe').decode()):
+        resp = client.get(f'/api/parking/history?limit=5&cursor={cursor}', headers=headers)
+        assert resp.status_code == 400, cursor
+        assert resp.get_json() == {'error': 'Invalid cursor'}
+
+
+def main():
+    tests = [
+        test_pages_cover_tied_rows_exactly_once,
+        test_invalid_cursor_is_rejected,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Test script for the denormalized lot counters (total_spots / occupied_count)
+
+Drives park, auto-park, a conflicting park, unpark and the admin lot create,
+resize and delete through the API and checks after every step that the counters
+match a COUNT over parking_spot. Then corrupts them and checks the reconcile
+only reports the drift on a dry run and repairs it on a real one.
+"""
+from sqlalchemy import func, case
+from bench_harness import make_parking_app, seed_lot
+from extensions import db
+from models.parking_lot import ParkingLot
+from models.parking_spot import ParkingSpot
+from utils.lot_counters import find_counter_drift, reconcile_lot_counters
+
+
+def setup_app():
+    app, ctx = make_parking_app(num_spots=6, lot_name='Counter Lot', plates=[f'TN01AB000{i}' for i in range(1, 4)])
+    with app.app_context():
+        ctx['other_lot_id'] = seed_lot(3, name='Other Lot').id
+    return app, ctx
+
+
+def counted(lot_id):
+    """(total, occupied) counted over parking_spot"""
+    total, occupied = db.session.query(
+        func.count(ParkingSpot.id), func.coalesce(func.sum(case((ParkingSpot.is_occupied.is_(True), 1), else_=0)), 0)
+    ).filter(ParkingSpot.lot_id == lot_id).one()
+    return total, occupied
+
+
+def assert_counters_match(app, expected):
+    """Every lot's counters equal the COUNT over its spots, which are `expected` {lot_id: (total, occupied)}"""
+    with app.app_context():
+        db.session.expire_all()
+        for lot in ParkingLot.query.all():
+            assert (lot.total_spots, lot.occupied_count) == counted(lot.id), lot.name
+        assert {lot.id: counted(lot.id) for lot in ParkingLot.query.all()} == expected
+        assert find_counter_drift() == []
+
+
+def test_counters_follow_park_unpark_and_lot_edits():
+    app, ctx = setup_app()
+    client = app.test_client()
+    lot_id, other_id, spots = ctx['lot_id'], ctx['other_lot_id'], ctx['spots']
+    assert_counters_match(app, {lot_id: (6, 0), other_id: (3, 0)})
+
+    resp = client.post('/api/parking/park', json={'vehicle_no': ctx['plates'][0], 'spot_id': spots[2]},
+                       headers=ctx['user'])
+    assert resp.status_code == 200
+    resp = client.post('/api/parking/auto-park', json={'vehicle_id': ctx['vehicle_ids'][1], 'lot_id': lot_id},
+                       headers=ctx['user'])
+    assert resp.status_code == 200 and resp.get_json()['spot_number'] == '1'
+    assert_counters_match(app, {lot_id: (6, 2), other_id: (3, 0)})
+
+    # A lost race for a taken spot rolls back without moving the counter
+    resp = client.post('/api/parking/park', json={'vehicle_no': ctx['plates'][2], 'spot_id': spots[2]},
+                       headers=ctx['user'])
+    assert resp.status_code == 409
+    assert_counters_match(app, {lot_id: (6, 2), other_id: (3, 0)})
+
+    resp = client.post('/api/parking/unpark', json={'vehicle_id': ctx['vehicle_ids'][0]}, headers=ctx['user'])
+    assert resp.status_code == 200
+    assert_counters_match(app, {lot_id: (6, 1), other_id: (3, 0)})
+
+    # Grow and shrink the lot; shrinking below an occupied spot is refused
+    resp = client.put(f'/api/admin/parking-lots/{lot_id}', json={'max_spots': 9}, headers=ctx['admin'])
+    assert resp.status_code == 200
+    assert_counters_match(app, {lot_id: (9, 1), other_id: (3, 0)})
+    resp = client.put(f'/api/admin/parking-lots/{lot_id}', json={'max_spots': 4}, headers=ctx['admin'])
+    assert resp.status_code == 200
+    assert_counters_match(app, {lot_id: (4, 1), other_id: (3, 0)})
+    resp = client.post('/api/parking/auto-park', json={'vehicle_id': ctx['vehicle_ids'][2], 'lot_id': other_id},
+                       headers=ctx['user'])
+    assert resp.status_code == 200
+    resp = client.put(f'/api/admin/parking-lots/{other_id}', json={'max_spots': 0}, headers=ctx['admin'])
+    assert resp.status_code == 400
+    assert_counters_match(app, {lot_id: (4, 1), other_id: (3, 1)})
+
+    resp = client.post('/api/parking/unpark', json={'vehicle_id': ctx['vehicle_ids'][2]}, headers=ctx['user'])
+    assert resp.status_code == 200
+    assert_counters_match(app, {lot_id: (4, 1), other_id: (3, 0)})
+
+    resp = client.post('/api/admin/parking-lots', json={
+        'name': 'New Lot', 'address': 'New Street', 'pincode': '600002', 'price_per_hour': 30, 'max_spots': 5
+    }, headers=ctx['admin'])
+    assert resp.status_code == 201
+    new_id = resp.get_json()['id']
+    assert_counters_match(app, {lot_id: (4, 1), other_id: (3, 0), new_id: (5, 0)})
+    resp = client.delete(f'/api/admin/parking-lots/{new_id}', headers=ctx['admin'])
+    assert resp.status_code == 200
+    assert_counters_match(app, {lot_id: (4, 1), other_id: (3, 0)})
+
+
+def test_reconcile_repairs_corrupted_counters():
+    app, ctx = setup_app()
+    lot_id, other_id = ctx['lot_id'], ctx['other_lot_id']
+    resp = app.test_client().post('/api/parking/park', json={'vehicle_no': ctx['plates'][0], 'spot_id': ctx['spots'][5]},
+                                  headers=ctx['user'])
+    assert resp.status_code == 200
+    with app.app_context():
+        db.session.get(ParkingLot, lot_id).occupied_count = 4
+        db.session.get(ParkingLot, other_id).total_spots = 10
+        db.session.commit()
+
+        expected = [
+            {'lot_id': lot_id, 'lot_name': 'Counter Lot', 'total_spots': (6, 6), 'occupied_count': (4, 1)},
+            {'lot_id': other_id, 'lot_name': 'Other Lot', 'total_spots': (10, 3), 'occupied_count': (0, 0)},
+        ]
+        # A dry run reports the drift and leaves the counters alone
+        assert reconcile_lot_counters(dry_run=True) == expected
+        db.session.expire_all()
+        assert len(find_counter_drift()) == 2
+        assert db.session.get(ParkingLot, lot_id).occupied_count == 4
+
+        assert reconcile_lot_counters() == expected
+        assert reconcile_lot_counters() == []
+    assert_counters_match(app, {lot_id: (6, 1), other_id: (3, 0)})
+
+
+def main():
+    tests = [
+        test_counters_follow_park_unpark_and_lot_edits,
+        test_reconcile_repairs_corrupted_counters,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Test script for pooled email sending (utils/mail_dispatch.py)
+
+Runs a minimal SMTP sink on a local port (the same role MailHog plays on
+MAIL_PORT in development) and checks that batches share one connection each,
+that sending is rate limited, that temporary refusals and dropped connections
+are retried while permanent ones are not, and that the batches are counted in
+/metrics. Run directly to print throughput against the sink, per-email
+connections vs pooled batches.
+"""
+import socketserver
+import sys
+import threading
+import time
+from flask_mail import Message
+from bench_harness import make_app
+from extensions import mail
+from utils import metrics
+from utils.mail_dispatch import send_messages
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """
+    Accepts everything except: addresses containing 'bounce' (550), 'busy'
+    (450 the first `busy_times` times they are seen) and 'drop' (the first time,
+    the connection is closed instead of answering)
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, busy_times=1):
+        super().__init__(('127.0.0.1', 0), SMTPHandler)
+        self.busy_times = busy_times
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.delivered = []
+        self.seen = {}
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def count(self, address):
+        """How many times `address` has been offered, this time included"""
+        with self.lock:
+            self.seen[address] = self.seen.get(address, 0) + 1
+            return self.seen[address]
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        sink = self.server
+        with sink.lock:
+            sink.connections += 1
+        self.reply('220 sink ready')
+        recipients = []
+        while True:
+            line = self.rfile.readline().decode().strip()
+            command = line[:4].upper()
+            if not line or command == 'QUIT':
+                self.reply('221 bye')
+                return
+            if command in ('EHLO', 'HELO'):
+                self.reply('250 sink')
+            elif command == 'MAIL':
+                recipients = []
+                self.reply('250 ok')
+            elif command == 'RCPT':
+                address = line.split(':', 1)[1].strip('<> ')
+                attempt = sink.count(address)
+                if 'drop' in address and attempt == 1:
+                    return
+                if 'bounce' in address:
+                    self.reply('550 no such user')
+                elif 'busy' in address and attempt <= sink.busy_times:
+                    self.reply('450 mailbox busy')
+                else:
+                    recipients.append(address)
+                    self.reply('250 ok')
+            elif command == 'DATA':
+                self.reply('354 go ahead')
+                while self.rfile.readline() not in (b'.\r\n', b''):
+                    pass
+                with sink.lock:
+                    sink.delivered.extend(recipients)
+                self.reply('250 queued')
+            else:
+                self.reply('250 ok')
+
+
+def start_sink(**kwargs):
+    sink = SMTPSink(**kwargs)
+    threading.Thread(target=sink.serve_forever, daemon=True).start()
+    return sink
+
+
+def make_mail_app(sink, **overrides):
+    settings = dict(MAIL_PORT=sink.port, MAIL_SUPPRESS_SEND=False, MAIL_BATCH_SIZE=10, MAIL_RATE_LIMIT=0,
+                    MAIL_MAX_RETRIES=3, MAIL_RETRY_BACKOFF=0.01)
+    settings.update(overrides)
+    return make_app(**settings)
+
+
+def messages(addresses):
+    return [Message(subject='Hello', recipients=[address], body='Hi') for address in addresses]
+
+
+def test_batches_share_a_connection():
+    sink = start_sink()
+    app = make_mail_app(sink)
+    try:
+        with app.app_context():
+            result = send_messages(messages([f'user{i}@example.com' for i in range(25)]))
+        assert result == {'sent': 25, 'failed': 0, 'batches': 3, 'failed_recipients': []}
+        assert sink.connections == 3
+        assert sorted(sink.delivered) == sorted(f'user{i}@example.com' for i in range(25))
+    finally:
+        sink.shutdown()
+
+
+def test_rate_limit_spaces_sends():
+    sink = start_sink()
+    app = make_mail_app(sink, MAIL_RATE_LIMIT=100)
+    try:
+        with app.app_context():
+            start = time.perf_counter()
+            send_messages(messages([f'user{i}@example.com' for i in range(21)]))
+            elapsed = time.perf_counter() - start
+        # 21 sends at 100/s need at least 20 intervals of 10 ms
+        assert elapsed >= 0.2
+        assert len(sink.delivered) == 21
+    finally:
+        sink.shutdown()
+
+
+def test_temporary_failures_are_retried_and_permanent_ones_are_not():
+    sink = start_sink()
+    app = make_mail_app(sink)
+    try:
+        with app.app_context():
+            result = send_messages(messages([
+                'ok@example.com', 'busy@example.com', 'bounce@example.com', 'drop@example.com', 'after@example.com'
+            ]))
+        assert result['sent'] == 4
+        assert result['failed_recipients'] == ['bounce@example.com']
+        # First round, then one retry batch for the busy address and the rest of the dropped connection
+        assert result['batches'] == 2
+        assert sorted(sink.delivered) == ['after@example.com', 'busy@example.com', 'drop@example.com', 'ok@example.com']
+        assert sink.seen['bounce@example.com'] == 1
+    finally:
+        sink.shutdown()
+
+
+def test_gives_up_after_max_retries():
+    sink = start_sink(busy_times=10)
+    app = make_mail_app(sink, MAIL_MAX_RETRIES=2)
+    try:
+        with app.app_context():
+            result = send_messages(messages(['busy@example.com', 'ok@example.com']), 'reminder')
+        assert result['sent'] == 1
+        assert result['failed_recipients'] == ['busy@example.com']
+        assert sink.seen['busy@example.com'] == 3
+        exposition = metrics.exposition()
+        assert 'mail_messages_total{kind="reminder",outcome="retried"}' in exposition
+        assert 'mail_batch_duration_seconds_count{kind="reminder"}' in exposition
+    finally:
+        sink.shutdown()
+
+
+def benchmark(count):
+    sink = start_sink()
+    app = make_mail_app(sink, MAIL_BATCH_SIZE=200)
+    with app.app_context():
+        start = time.perf_counter()
+        for msg in messages([f'single{i}@example.com' for i in range(count)]):
+            mail.send(msg)
+        single = time.perf_counter() - start
+        single_connections = sink.connections
+        start = time.perf_counter()
+        result = send_messages(messages([f'pooled{i}@example.com' for i in range(count)]))
+        pooled = time.perf_counter() - start
+    sink.shutdown()
+    print(f"{count:,} emails to a local SMTP sink")
+    print(f"  mail.send per email: {single_connections:>5,} connections, {count / single:8.0f} emails/s")
+    print(f"  pooled batches:      {result['batches']:>5,} connections, {count / pooled:8.0f} emails/s")
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Test script for the /metrics endpoint
+
+Drives a few requests through the harness app and checks the scraped text
+exposition: per-endpoint latency histograms, cache hit/miss counters, DB
+statement counters, Celery task metrics (via the task signals), the merge of
+other worker processes' snapshots from METRICS_DIR, and that snapshots of
+exited or long-silent workers stop being counted.
+"""
+import json
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+import time
+from celery import Celery
+from celery.signals import task_prerun, task_postrun, worker_process_shutdown
+from bench_harness import make_app, seed_lot, make_user, auth_headers
+from utils import metrics
+
+
+def scrape(client):
+    resp = client.get('/metrics')
+    assert resp.status_code == 200
+    assert resp.mimetype == 'text/plain'
+    values = {}
+    for line in resp.get_data(as_text=True).splitlines():
+        if line and not line.startswith('#'):
+            series, value = line.rsplit(' ', 1)
+            values[series] = float(value)
+    return values
+
+
+def sample(values, name, **labels):
+    """Sum of the series called `name` whose labels include `labels`"""
+    total = 0
+    for series, value in values.items():
+        match = re.fullmatch(r'(\w+)(?:\{(.*)\})?', series)
+        if match.group(1) != name:
+            continue
+        series_labels = dict(re.findall(r'(\w+)="([^"]*)"', match.group(2) or ''))
+        if all(series_labels.get(k) == str(v) for k, v in labels.items()):
+            total += value
+    return total
+
+
+def test_request_cache_and_db_metrics():
+    app = make_app()
+    client = app.test_client()
+    with app.app_context():
+        seed_lot(10, name='Metrics Lot')
+        headers = auth_headers(make_user('metrics@example.com'))
+
+    before = scrape(client)
+    for _ in range(3):
+        assert client.get('/api/parking/lots', headers=headers).status_code == 200
+    assert client.get('/api/parking/history?cursor=bogus', headers=headers).status_code == 400
+    after = scrape(client)
+
+    def delta(name, **labels):
+        return sample(after, name, **labels) - sample(before, name, **labels)
+
+    endpoint = {'blueprint': 'parking', 'endpoint': 'parking.get_available_lots', 'method': 'GET'}
+    assert delta('http_request_duration_seconds_count', **endpoint) == 3
+    assert delta('http_request_duration_seconds_bucket', le='+Inf', **endpoint) == 3
+    assert delta('http_request_duration_seconds_sum', **endpoint) > 0
+    assert delta('http_requests_total', status='200', **endpoint) == 3
+    assert delta('http_requests_total', endpoint='parking.get_parking_history', status='400') == 1
+    # First call fills the cache, the next two are hits
+    assert delta('cache_requests_total', view='parking.get_available_lots', result='miss') == 1
+    assert delta('cache_requests_total', view='parking.get_available_lots', result='hit') == 2
+    assert delta('db_queries_total', endpoint='parking.get_available_lots') >= 1
+    assert delta('db_query_seconds_total', endpoint='parking.get_available_lots') > 0
+    # The scrape itself is not timed
+    assert sample(after, 'http_requests_total', endpoint='metrics') == 0
+
+
+def test_celery_task_metrics():
+    celery = Celery('metrics-test')
+    metrics.init_celery_metrics(celery, {'METRICS_DIR': None})
+    task = type('Task', (), {'name': 'tasks.export_user_parking_history_csv'})()
+
+    before = metrics.snapshot()[0]
+    for task_id, state in [('t1', 'SUCCESS'), ('t2', 'SUCCESS'), ('t3', 'FAILURE')]:
+        task_prerun.send(sender=task, task_id=task_id, task=task)
+        task_postrun.send(sender=task, task_id=task_id, task=task, state=state)
+    counters, histograms = metrics.snapshot()
+
+    labels = (('task', task.name), ('outcome', 'SUCCESS'))
+    assert counters[('celery_tasks_total', labels)] - before.get(('celery_tasks_total', labels), 0) == 2
+    hist = histograms[('celery_task_duration_seconds', (('task', task.name),), metrics.TASK_BUCKETS)]
+    assert sum(hist[:-1]) >= 3
+
+
+def test_finished_threads_are_folded_into_the_base():
+    labels = (('view', 'short-lived'), ('result', 'hit'))
+    before = metrics.snapshot()[0].get(('cache_requests_total', labels), 0)
+    for _ in range(500):
+        thread = threading.Thread(target=metrics.inc, args=('cache_requests_total', labels))
+        thread.start()
+        thread.join()
+    counters = metrics.snapshot()[0]
+    assert counters[('cache_requests_total', labels)] - before == 500
+    # Only shards of live threads remain
+    assert len(metrics._shards) <= threading.active_count()
+
+
+def _worker_process(directory):
+    metrics._settings['dir'] = directory
+    metrics.inc('celery_tasks_total', (('task', 'tasks.send_daily_email_reminders'), ('outcome', 'SUCCESS')), 5)
+    metrics.flush()
+
+
+def test_scrape_merges_other_worker_snapshots():
+    with tempfile.TemporaryDirectory() as directory:
+        ctx = multiprocessing.get_context('spawn')
+        worker = ctx.Process(target=_worker_process, args=(directory,))
+        worker.start()
+        worker.join()
+        assert worker.exitcode == 0
+
+        app = make_app(METRICS_DIR=directory)
+        try:
+            values = scrape(app.test_client())
+        finally:
+            metrics._settings['dir'] = None
+    assert sample(values, 'celery_tasks_total', task='tasks.send_daily_email_reminders', outcome='SUCCESS') >= 5
+
+
+def test_stale_snapshots_are_dropped():
+    labels = (('task', 'tasks.generate_monthly_reports'), ('outcome', 'SUCCESS'))
+    with tempfile.TemporaryDirectory() as directory:
+        for pid, value, age in ((1001, 2, 0), (1002, 7, 3600)):
+            path = os.path.join(directory, f'{pid}.json')
+            with open(path, 'w') as f:
+                json.dump(metrics._to_json({('celery_tasks_total', labels): value}, {}), f)
+            os.utime(path, (time.time() - age, time.time() - age))
+        metrics._configure({'METRICS_DIR': directory, 'METRICS_MAX_AGE': 60})
+        try:
+            counters = metrics.collect()[0]
+        finally:
+            metrics._configure({'METRICS_DIR': None})
+        # Only the fresh worker counts; the silent one's file is deleted
+        assert counters[('celery_tasks_total', labels)] == 2
+        assert os.listdir(directory) == ['1001.json']
+
+
+def test_worker_shutdown_removes_its_snapshot():
+    with tempfile.TemporaryDirectory() as directory:
+        metrics.init_celery_metrics(Celery('metrics-test'), {'METRICS_DIR': directory})
+        try:
+            metrics.inc('celery_tasks_total', (('task', 'tasks.send_daily_email_reminders'), ('outcome', 'SUCCESS')))
+            metrics.flush()
+            assert os.listdir(directory) == [f'{os.getpid()}.json']
+            worker_process_shutdown.send(sender=None, pid=os.getpid(), exitcode=0)
+            assert os.listdir(directory) == []
+        finally:
+            metrics._configure({'METRICS_DIR': None})
+
+
+if __name__ == "__main__":
+    test_request_cache_and_db_metrics()
+    test_celery_task_metrics()
+    test_finished_threads_are_folded_into_the_base()
+    test_scrape_merges_other_worker_snapshots()
+    test_stale_snapshots_are_dropped()
+    test_worker_shutdown_removes_its_snapshot()
+    print("✅ Metrics tests passed")
@@ -59,7 +59,7 @@ def create_test_data_for_all_users():
                 db.session.commit()
             
             # Get or create a parking spot
-            spot = ParkingSpot.query.filter_by(lot_id=parking_lot.id).first()
+            spot = ParkingSpot.query.filter_by(lot_id=parking_lot.id).order_by(ParkingSpot.id).offset(i).first()
             if not spot:
                 spot = ParkingSpot(
                     lot_id=parking_lot.id,
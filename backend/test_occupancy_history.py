@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test script for the occupancy sampler and the admin occupancy history
+
+Samples two lots over a simulated week, compacts old samples into hourly
+rows and checks the stats and hour-of-week heatmap are unchanged by the
+compaction, that repeated samples within one interval are ignored and that
+retention drops expired rows.
+"""
+from datetime import datetime, timedelta
+from bench_harness import make_app, seed_lot, make_user, auth_headers
+from extensions import db
+from models.occupancy_sample import OccupancySample
+from models.parking_lot import ParkingLot
+from utils.cache_utils import invalidate_tags, LOTS_ALL
+from utils.occupancy import sample_occupancy, compact_occupancy
+
+# Monday 2026-06-01 00:00 UTC
+WEEK_START = datetime(2026, 6, 1)
+
+
+def setup_app():
+    app = make_app(OCCUPANCY_SAMPLE_INTERVAL=600, OCCUPANCY_UTC_OFFSET_MINUTES=0,
+                   OCCUPANCY_RAW_RETENTION_DAYS=2, OCCUPANCY_HOURLY_RETENTION_DAYS=30)
+    with app.app_context():
+        busy = seed_lot(10, name='Busy Lot')
+        quiet = seed_lot(10, name='Quiet Lot')
+        lot_ids = (busy.id, quiet.id)
+        # Busy: 8 of 10 taken from 09:00 to 18:00, 2 otherwise; quiet: always 1
+        moment = WEEK_START
+        while moment < WEEK_START + timedelta(days=7):
+            db.session.get(ParkingLot, busy.id).occupied_count = 8 if 9 <= moment.hour < 18 else 2
+            db.session.get(ParkingLot, quiet.id).occupied_count = 1
+            db.session.commit()
+            sample_occupancy(moment)
+            moment += timedelta(minutes=10)
+        headers = auth_headers(make_user('admin@example.com', role='admin'))
+    return app, headers, lot_ids
+
+
+def history(client, headers, query):
+    resp = client.get(f'/api/admin/summary/occupancy/history{query}', headers=headers)
+    assert resp.status_code == 200, resp.get_json()
+    return resp.get_json()
+
+
+def test_stats_and_heatmap_survive_compaction():
+    app, headers, (busy_id, quiet_id) = setup_app()
+    client = app.test_client()
+    week = '?start=2026-06-01&end=2026-06-07'
+
+    before = history(client, headers, week)
+    busy = before['lots'][0]
+    assert (busy['lot_name'], busy['min_occupied'], busy['max_occupied'], busy['samples']) == ('Busy Lot', 2, 8, 7 * 144)
+    assert busy['avg_occupied'] == round((9 * 8 + 15 * 2) / 24, 2)
+    assert before['lots'][1]['avg_occupancy_rate'] == 0.1
+
+    rates = before['heatmap']['rates']
+    monday, sunday = 1, 0
+    assert rates[monday][10] == round((0.8 + 0.1) / 2, 4)
+    assert rates[sunday][3] == round((0.2 + 0.1) / 2, 4)
+    assert history(client, headers, week + f'&lot_id={busy_id}')['heatmap']['rates'][monday][10] == 0.8
+
+    with app.app_context():
+        raw_rows = OccupancySample.query.count()
+        result = compact_occupancy(now=WEEK_START + timedelta(days=7))
+        # Everything older than two days is now one row per lot and hour
+        assert result['raw_removed'] == 2 * 5 * 144
+        assert result['hourly_rows'] == 2 * 5 * 24
+        assert OccupancySample.query.count() == raw_rows - result['raw_removed'] + result['hourly_rows']
+
+    # Same answers from the mixed raw + hourly rows (bypass the cached response)
+    with app.app_context():
+        invalidate_tags(LOTS_ALL)
+    after = history(client, headers, week)
+    assert after['lots'] == before['lots']
+    assert after['heatmap'] == before['heatmap']
+
+
+def test_sampling_is_idempotent_and_retention_expires_rows():
+    app, _, _ = setup_app()
+    with app.app_context():
+        count = OccupancySample.query.count()
+        # A second beat run inside the same 10 minute interval adds nothing
+        assert sample_occupancy(WEEK_START + timedelta(minutes=3)) == 0
+        assert OccupancySample.query.count() == count
+
+        compact_occupancy(now=WEEK_START + timedelta(days=7))
+        compact_occupancy(now=WEEK_START + timedelta(days=35))
+        remaining = db.session.query(db.func.min(OccupancySample.ts)).scalar()
+        assert remaining >= WEEK_START + timedelta(days=5)
+        assert OccupancySample.query.filter(OccupancySample.resolution < 3600).count() == 0
+
+
+if __name__ == "__main__":
+    test_stats_and_heatmap_survive_compaction()
+    test_sampling_is_idempotent_and_retention_expires_rows()
+    print("✅ Occupancy history tests passed")
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test script for per-request SQL budgets and the N+1 detector
+
+Runs the hot endpoints against a populated lot set with strict budgets on (the
+harness default), so any endpoint that exceeds its SQL_QUERY_BUDGETS entry or
+repeats one statement shape SQL_REPEAT_THRESHOLD times fails the test. Also
+checks the detector itself catches a deliberate lazy-loading loop.
+"""
+import pytest
+from flask import jsonify
+from bench_harness import make_parking_app, seed_lot
+from models.parking_lot import ParkingLot
+from utils.query_stats import QueryBudgetExceeded, statement_shape
+
+NUM_LOTS = 12
+SPOTS_PER_LOT = 40
+NUM_VEHICLES = 30
+
+
+def setup_app(**overrides):
+    app, ctx = make_parking_app(num_spots=SPOTS_PER_LOT, lot_name='Lot 0',
+                                plates=[f'GJ01QB{i:04d}' for i in range(NUM_VEHICLES)], **overrides)
+
+    # A deliberately N+1 view, one lazy load of lot.spots per lot
+    @app.route('/lazy-lots')
+    def lazy_lots():
+        return jsonify([len(lot.spots) for lot in ParkingLot.query.all()])
+
+    with app.app_context():
+        ctx['lot_ids'] = [ctx['lot_id']] + [seed_lot(SPOTS_PER_LOT, name=f'Lot {i}').id for i in range(1, NUM_LOTS)]
+    return app.test_client(), ctx
+
+
+def test_hot_endpoints_stay_within_budget():
+    client, ctx = setup_app()
+    # Park every vehicle across the lots, then unpark a third so history has both kinds
+    for i, vehicle_id in enumerate(ctx['vehicle_ids']):
+        resp = client.post('/api/parking/auto-park', json={
+            'vehicle_id': vehicle_id, 'lot_id': ctx['lot_ids'][i % NUM_LOTS]
+        }, headers=ctx['user'])
+        assert resp.status_code == 200
+    for vehicle_id in ctx['vehicle_ids'][::3]:
+        assert client.post('/api/parking/unpark', json={'vehicle_id': vehicle_id}, headers=ctx['user']).status_code == 200
+
+    lot_id = ctx['lot_ids'][0]
+    urls = {
+        'user': ['/api/parking/lots', f'/api/parking/lots/{lot_id}/spots', f'/api/parking/lots/{lot_id}/spots/changes?since=0',
+                 '/api/parking/vehicles', '/api/parking/history', '/api/parking/history?limit=10'],
+        'admin': ['/api/admin/dashboard', '/api/admin/users', '/api/admin/parking-lots',
+                  f'/api/admin/parking-lots/{lot_id}/spots', '/api/admin/summary/occupancy',
+                  '/api/admin/parking-spots/search?query=occupied'],
+    }
+    for who, paths in urls.items():
+        for url in paths:
+            resp = client.get(url, headers=ctx[who])
+            assert resp.status_code == 200, url
+            print(f"{url}: {resp.headers['X-DB-Query-Count']} statements, {resp.headers['X-DB-Time-ms']} ms")
+
+
+def test_repeated_statement_is_flagged():
+    client, _ = setup_app()
+    with pytest.raises(QueryBudgetExceeded, match='likely N\\+1'):
+        client.get('/lazy-lots')
+
+
+def test_budget_is_enforced_and_reported():
+    client, _ = setup_app(SQL_QUERY_BUDGETS={'lazy_lots': 5}, SQL_REPEAT_THRESHOLD=1000)
+    with pytest.raises(QueryBudgetExceeded, match=f'ran {NUM_LOTS + 1} SQL statements, budget is 5'):
+        client.get('/lazy-lots')
+
+    # Outside strict mode the request succeeds and the headers still report the work
+    client, _ = setup_app(SQL_QUERY_BUDGET_STRICT=False)
+    resp = client.get('/lazy-lots')
+    assert resp.status_code == 200
+    assert resp.headers['X-DB-Query-Count'] == str(NUM_LOTS + 1)
+    assert float(resp.headers['X-DB-Time-ms']) >= 0
+
+
+def test_statement_shape_collapses_literals_and_in_lists():
+    assert statement_shape("SELECT * FROM spot WHERE id IN (?, ?, ?) AND lot_id = 7") == \
+        statement_shape("SELECT * FROM spot\n WHERE id IN (?, ?) AND lot_id = 12")
+    assert statement_shape("SELECT anon_1.id FROM t WHERE name = 'a''b'") == "SELECT anon_1.id FROM t WHERE name = ?"
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main(['-q', __file__]))
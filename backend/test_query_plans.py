@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test script for the hot-path indexes
+
+Records every statement the hot endpoints run (plus the queries the Celery
+tasks in tasks.py build through utils/, called directly since tasks.py needs
+Redis to import) and runs EXPLAIN QUERY PLAN on each with its real parameters. Any
+full scan of parking_history, parking_spot or vehicle fails the test. The
+plans come from the schema alone (no ANALYZE), so they are the ones a fresh
+migration gets, whatever the table sizes.
+"""
+import re
+from datetime import date
+from sqlalchemy import event
+from bench_harness import make_parking_app
+from extensions import db
+from models.parking_history import ParkingHistory
+from models.vehicle import Vehicle
+from utils.csv_export import history_rows
+from utils.monthly_reports import monthly_records, monthly_summaries
+from utils.reminders import reminder_recipients
+
+HOT_TABLES = ('parking_history', 'parking_spot', 'vehicle')
+# "SCAN t" without an index; "SCAN t USING [COVERING] INDEX" still reads every row
+FULL_SCAN = re.compile(r'^SCAN (%s)\b' % '|'.join(HOT_TABLES))
+
+
+def setup_app():
+    app, ctx = make_parking_app(num_spots=6, lot_name='Plan Lot', plates=[f'KA01PL{i:04d}' for i in range(3)],
+                                CACHE_TYPE='NullCache')
+    return app, app.test_client(), ctx
+
+
+class StatementRecorder:
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE')):
+            self.statements.append((statement, parameters))
+
+
+def full_scans(statements):
+    """[(statement, plan line)] for every full scan of a hot table"""
+    found = []
+    with db.engine.connect() as conn:
+        for statement, parameters in statements:
+            for row in conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters):
+                if FULL_SCAN.match(row[3]):
+                    found.append((' '.join(statement.split()), row[3]))
+    return found
+
+
+def test_hot_endpoints_use_indexes():
+    app, client, ctx = setup_app()
+    lot_id, vehicle_ids = ctx['lot_id'], ctx['vehicle_ids']
+    requests = [
+        ('user', 'post', '/api/parking/auto-park', {'vehicle_id': vehicle_ids[0], 'lot_id': lot_id}),
+        ('user', 'post', '/api/parking/auto-park', {'vehicle_id': vehicle_ids[1], 'lot_id': lot_id}),
+        ('user', 'post', '/api/parking/unpark', {'vehicle_id': vehicle_ids[0]}),
+        ('user', 'get', '/api/parking/vehicles', None),
+        ('user', 'get', '/api/parking/history', None),
+        ('user', 'get', '/api/parking/history?limit=10', None),
+        ('user', 'get', f'/api/parking/lots/{lot_id}/spots', None),
+        ('admin', 'get', f'/api/admin/parking-lots/{lot_id}/spots', None),
+        ('admin', 'get', '/api/admin/users?page=1', None),
+        ('admin', 'get', '/api/admin/parking-spots/search?query=plan', None),
+        ('admin', 'get', '/api/admin/summary/revenue?start=2026-01-01&end=2026-12-31', None),
+    ]
+    with app.app_context(), StatementRecorder(db.engine) as recorder:
+        for who, method, url, body in requests:
+            resp = getattr(client, method)(url, json=body, headers=ctx[who])
+            assert resp.status_code == 200, (url, resp.get_json())
+        spot_id = db.session.get(Vehicle, vehicle_ids[1]).spot_id
+        assert client.get(f'/api/admin/parking-spots/{spot_id}/details', headers=ctx['admin']).status_code == 200
+        assert len(recorder.statements) > 20
+        assert full_scans(recorder.statements) == []
+
+
+def test_task_queries_use_indexes():
+    app, _, ctx = setup_app()
+    user_id = ctx['user_id']
+    with app.app_context(), StatementRecorder(db.engine) as recorder:
+        # send_daily_reminders: users who haven't parked today, with any open session
+        assert [user['id'] for chunk in reminder_recipients(date(2026, 6, 15)) for user in chunk] == [user_id]
+        # monthly reports: aggregates and the month's sessions for a chunk of users
+        monthly_summaries([user_id], 6, 2026)
+        monthly_records([user_id], 6, 2026)
+        # CSV export
+        list(history_rows(user_id))
+        assert len(recorder.statements) == 4
+        assert full_scans(recorder.statements) == []
+
+
+def test_unindexed_query_is_reported():
+    app, _, _ = setup_app()
+    with app.app_context(), StatementRecorder(db.engine) as recorder:
+        ParkingHistory.query.filter(ParkingHistory.total_cost > 10).all()
+        assert [plan for _, plan in full_scans(recorder.statements)] == ['SCAN parking_history']
+
+
+if __name__ == "__main__":
+    test_hot_endpoints_use_indexes()
+    test_task_queries_use_indexes()
+    test_unindexed_query_is_reported()
+    print("✅ Query plan tests passed")
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test script for the set-based daily reminder selection
+
+Checks who gets a reminder (users without a session started today, open
+sessions flagged, admins skipped), that chunks cover every recipient once
+with one query each, and that a batch renders every email from one lot query
+listing only active lots.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from bench_harness import make_app, seed_lot, make_user
+from extensions import db
+from models.parking_history import ParkingHistory
+from models.parking_lot import ParkingLot
+from models.vehicle import Vehicle
+from utils.reminders import reminder_recipients, reminder_messages
+
+TODAY = datetime(2026, 6, 10, 12)
+
+
+def setup_app():
+    app = make_app()
+    with app.app_context():
+        lot = seed_lot(4, name='Open Lot')
+        closed = seed_lot(2, name='Closed Lot')
+        closed.is_active = False
+        users = {name: make_user(f'{name}@example.com', full_name=name.title()) for name in
+                 ('parked', 'yesterday', 'open', 'idle', 'late')}
+        make_user('admin@example.com', role='admin')
+
+        def session(name, start, end=None, spot=0):
+            vehicle = Vehicle(user_id=users[name].id, license_plate=f'TN{users[name].id:04d}')
+            db.session.add(vehicle)
+            db.session.flush()
+            db.session.add(ParkingHistory(
+                user_id=users[name].id, vehicle_id=vehicle.id, lot_id=lot.id, spot_id=spot + 1,
+                parking_time=start, released_time=end, status='active' if end is None else 'out'
+            ))
+
+        session('parked', TODAY.replace(hour=8), TODAY.replace(hour=9))
+        session('yesterday', TODAY - timedelta(days=1), TODAY - timedelta(days=1, hours=-2))
+        session('open', TODAY - timedelta(days=1), spot=1)
+        session('late', TODAY + timedelta(days=1), TODAY + timedelta(days=1, hours=1))
+        db.session.commit()
+    return app
+
+
+def test_selects_users_without_a_session_today():
+    app = setup_app()
+    with app.app_context():
+        chunks = list(reminder_recipients(TODAY.date(), chunk_size=10))
+        assert len(chunks) == 1
+        assert [(r['full_name'], r['has_active_session']) for r in chunks[0]] == [
+            ('Yesterday', False), ('Open', True), ('Idle', False), ('Late', False)
+        ]
+
+
+def test_chunks_are_one_query_each():
+    app = setup_app()
+    statements = []
+    with app.app_context():
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            chunks = list(reminder_recipients(TODAY.date(), chunk_size=2))
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+    assert [len(c) for c in chunks] == [2, 2]
+    assert len({r['id'] for c in chunks for r in c}) == 4
+    # Two full chunks, then an empty one that ends the scan
+    assert len(statements) == 3
+
+
+def test_batch_renders_with_active_lots_only():
+    app = setup_app()
+    with app.app_context():
+        recipients = next(reminder_recipients(TODAY.date()))
+        messages = reminder_messages(recipients, now=TODAY)
+    assert [m.recipients for m in messages] == [[r['email']] for r in recipients]
+    open_message = messages[1]
+    assert 'Hello <strong>Open</strong>' in open_message.html
+    assert 'Open Lot' in open_message.html and 'Closed Lot' not in open_message.html
+    assert 'June 10, 2026' in open_message.html
+
+
+if __name__ == "__main__":
+    test_selects_users_without_a_session_today()
+    test_chunks_are_one_query_each()
+    test_batch_renders_with_active_lots_only()
+    print("✅ Reminder tests passed")
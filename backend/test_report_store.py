@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Test script for the monthly report store
+
+Checks that a closed month's report is built once and then served from
+monthly_report, that editing, adding or deleting a session in that month drops
+it (and changes to the current month don't touch the store), that reports with
+a session still open are not stored, and that the user report endpoints only
+read the store.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from bench_harness import make_parking_app
+from extensions import db
+from models.monthly_report import MonthlyReport
+from models.parking_history import ParkingHistory
+from utils.monthly_reports import monthly_report_messages
+
+now = datetime.now()
+THIS_MONTH = datetime(now.year, now.month, 1)
+LAST_MONTH = (THIS_MONTH - timedelta(days=1)).replace(day=1)
+
+
+def setup_app():
+    app, ctx = make_parking_app(lot_name='Harbour Lot', full_name='Driver')
+    with app.app_context():
+        for day, hours in ((3, 2), (5, 1)):
+            start = LAST_MONTH + timedelta(days=day, hours=9)
+            db.session.add(ParkingHistory(
+                user_id=ctx['user_id'], vehicle_id=ctx['vehicle_id'], lot_id=ctx['lot_id'], spot_id=1,
+                parking_time=start, released_time=start + timedelta(hours=hours), total_cost=20.0 * hours, status='out'
+            ))
+        db.session.commit()
+        ctx['recipient'] = {'id': ctx['user_id'], 'full_name': 'Driver', 'email': 'driver@example.com'}
+    return app, ctx
+
+
+def count_statements(fn):
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        result = fn()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    return result, statements
+
+
+def stored_months():
+    return [(r.year, r.month) for r in MonthlyReport.query.all()]
+
+
+def test_closed_month_is_built_once_then_served_from_the_store():
+    app, ctx = setup_app()
+    with app.app_context():
+        first, statements = count_statements(lambda: monthly_report_messages([ctx['recipient']], LAST_MONTH.month, LAST_MONTH.year))
+        assert len(statements) == 4
+        assert stored_months() == [(LAST_MONTH.year, LAST_MONTH.month)]
+        again, statements = count_statements(lambda: monthly_report_messages([ctx['recipient']], LAST_MONTH.month, LAST_MONTH.year))
+        assert len(statements) == 1
+        assert again[0].html == first[0].html
+
+
+def test_history_edits_invalidate_only_their_month():
+    app, ctx = setup_app()
+    with app.app_context():
+        monthly_report_messages([ctx['recipient']], LAST_MONTH.month, LAST_MONTH.year)
+        # A session in the current month leaves last month's report alone
+        _, statements = count_statements(lambda: (db.session.add(ParkingHistory(
+            user_id=ctx['user_id'], vehicle_id=ctx['vehicle_id'], lot_id=ctx['lot_id'], spot_id=2,
+            parking_time=THIS_MONTH, released_time=THIS_MONTH + timedelta(hours=1), status='out'
+        )), db.session.commit()))
+        assert not any('monthly_report' in s for s in statements)
+        assert stored_months() == [(LAST_MONTH.year, LAST_MONTH.month)]
+
+        session = ParkingHistory.query.filter(ParkingHistory.parking_time < THIS_MONTH).first()
+        session.total_cost = 99.0
+        db.session.commit()
+        assert stored_months() == []
+
+        monthly_report_messages([ctx['recipient']], LAST_MONTH.month, LAST_MONTH.year)
+        db.session.delete(session)
+        db.session.commit()
+        assert stored_months() == []
+
+        monthly_report_messages([ctx['recipient']], LAST_MONTH.month, LAST_MONTH.year)
+        # Moving a session out of the month drops the report it left
+        other = ParkingHistory.query.filter(ParkingHistory.parking_time < THIS_MONTH).first()
+        other.parking_time = THIS_MONTH + timedelta(hours=2)
+        db.session.commit()
+        assert stored_months() == []
+
+
+def test_reports_with_open_sessions_are_not_stored():
+    app, ctx = setup_app()
+    with app.app_context():
+        db.session.add(ParkingHistory(
+            user_id=ctx['user_id'], vehicle_id=ctx['vehicle_id'], lot_id=ctx['lot_id'], spot_id=3,
+            parking_time=LAST_MONTH + timedelta(days=20), status='active'
+        ))
+        db.session.commit()
+        monthly_report_messages([ctx['recipient']], LAST_MONTH.month, LAST_MONTH.year)
+        assert stored_months() == []
+
+
+def test_report_endpoints():
+    app, ctx = setup_app()
+    client = app.test_client()
+    resp = client.get('/api/parking/reports', headers=ctx['user'])
+    assert resp.status_code == 200
+    assert resp.get_json()['reports'] == [{
+        'year': LAST_MONTH.year, 'month': LAST_MONTH.month, 'total_bookings': 2,
+        'url': f'/api/parking/reports/{LAST_MONTH.year}/{LAST_MONTH.month}'
+    }]
+
+    url = f'/api/parking/reports/{LAST_MONTH.year}/{LAST_MONTH.month}'
+    resp = client.get(url, headers=ctx['user'])
+    assert resp.status_code == 200
+    report = resp.get_json()['report']
+    assert (report['total_bookings'], report['total_spent'], report['most_used_lot']) == (2, 60.0, 'Harbour Lot')
+    assert [booking['total_cost'] for booking in report['recent_bookings']] == [20.0, 40.0]
+    # Built on the fly: a GET never writes to the store
+    with app.app_context():
+        assert stored_months() == []
+        monthly_report_messages([ctx['recipient']], LAST_MONTH.month, LAST_MONTH.year)
+    # Served from the store once the report task has filled it
+    resp = client.get(url + '?format=html', headers=ctx['user'])
+    assert resp.mimetype == 'text/html' and 'Harbour Lot' in resp.get_data(as_text=True)
+    assert resp.headers['X-DB-Query-Count'] == '2'
+    with app.app_context():
+        assert stored_months() == [(LAST_MONTH.year, LAST_MONTH.month)]
+
+    assert client.get(f'/api/parking/reports/{now.year}/{now.month}', headers=ctx['user']).status_code == 400
+    assert client.get(f'/api/parking/reports/{now.year}/13', headers=ctx['user']).status_code == 400
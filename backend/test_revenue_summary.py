@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Test script for the admin revenue summary
+
+Checks the SQL aggregation against hand-computed totals: recorded costs,
+the duration x price fallback for sessions without a cost, active sessions
+ignored, lots without sessions at 0, and the optional start/end range. Also
+checks the revenue_daily rollup behind the time series, both backfilled and
+updated by unpark.
+"""
+from datetime import datetime
+from bench_harness import make_parking_app, seed_lot
+from extensions import db
+from models.parking_history import ParkingHistory
+from models.revenue_daily import RevenueDaily
+from utils.revenue import backfill_revenue_daily
+
+
+def setup_app():
+    app, ctx = make_parking_app(num_spots=2, lot_name='Busy Lot', price_per_hour=40.0, plates=['KL07AA0001'])
+    with app.app_context():
+        seed_lot(2, name='Empty Lot')
+        spot_id, parked_spot_id = ctx['spots'][1], ctx['spots'][2]
+
+        def session(parked, released, cost, status='out'):
+            db.session.add(ParkingHistory(
+                user_id=ctx['user_id'], vehicle_id=ctx['vehicle_id'], lot_id=ctx['lot_id'],
+                spot_id=parked_spot_id if status == 'active' else spot_id,
+                parking_time=parked, released_time=released, total_cost=cost, status=status
+            ))
+
+        session(datetime(2026, 5, 1, 9), datetime(2026, 5, 1, 11), 75.0)       # recorded cost
+        session(datetime(2026, 5, 2, 9), datetime(2026, 5, 2, 10, 30), None)   # 1.5h x 40 = 60
+        session(datetime(2026, 6, 3, 9), datetime(2026, 6, 3, 9, 45), 0)       # 0.75h x 40 = 30
+        session(datetime(2026, 6, 4, 9), None, None, status='active')          # not completed
+        db.session.commit()
+        backfill_revenue_daily()
+    return app.test_client(), ctx['admin'], ctx
+
+
+def revenue(client, headers, query=''):
+    resp = client.get(f'/api/admin/summary/revenue{query}', headers=headers)
+    assert resp.status_code == 200, resp.get_json()
+    return {row['lot_name']: row['revenue'] for row in resp.get_json()['revenue_per_lot']}
+
+
+def test_revenue_per_lot_uses_cost_then_duration_fallback():
+    client, headers, _ = setup_app()
+    assert revenue(client, headers) == {'Busy Lot': 165.0, 'Empty Lot': 0.0}
+
+
+def test_revenue_date_range_is_inclusive():
+    client, headers, _ = setup_app()
+    assert revenue(client, headers, '?start=2026-05-01&end=2026-05-01') == {'Busy Lot': 75.0, 'Empty Lot': 0.0}
+    assert revenue(client, headers, '?start=2026-05-02') == {'Busy Lot': 90.0, 'Empty Lot': 0.0}
+    assert revenue(client, headers, '?end=2026-05-31') == {'Busy Lot': 135.0, 'Empty Lot': 0.0}
+    assert client.get('/api/admin/summary/revenue?start=May', headers=headers).status_code == 400
+
+
+def timeseries(client, headers, query=''):
+    resp = client.get(f'/api/admin/summary/revenue/timeseries{query}', headers=headers)
+    assert resp.status_code == 200, resp.get_json()
+    return [(row['period'], row['revenue'], row['sessions']) for row in resp.get_json()['revenue_timeseries']]
+
+
+def test_timeseries_from_backfilled_rollup():
+    client, headers, _ = setup_app()
+    assert timeseries(client, headers) == [('2026-05-01', 75.0, 1), ('2026-05-02', 60.0, 1), ('2026-06-03', 30.0, 1)]
+    assert timeseries(client, headers, '?period=monthly') == [('2026-05', 135.0, 2), ('2026-06', 30.0, 1)]
+    assert timeseries(client, headers, '?period=weekly') == [('2026-17', 135.0, 2), ('2026-22', 30.0, 1)]
+    assert timeseries(client, headers, '?start=2026-05-02&end=2026-06-30') == [('2026-05-02', 60.0, 1), ('2026-06-03', 30.0, 1)]
+    assert timeseries(client, headers, '?lot_id=999') == []
+    assert client.get('/api/admin/summary/revenue/timeseries?period=hourly', headers=headers).status_code == 400
+
+    # Rebuilding is idempotent
+    with client.application.app_context():
+        backfill_revenue_daily()
+        assert RevenueDaily.query.count() == 3
+
+
+def test_unpark_updates_rollup():
+    client, headers, ctx = setup_app()
+    today = datetime.utcnow().strftime('%Y-%m-%d')
+    assert timeseries(client, headers, f'?start={today}') == []
+
+    for _ in range(2):
+        client.post('/api/parking/auto-park', json={'vehicle_id': ctx['vehicle_id'], 'lot_id': ctx['lot_id']}, headers=ctx['user'])
+        resp = client.post('/api/parking/unpark', json={'vehicle_id': ctx['vehicle_id']}, headers=ctx['user'])
+        assert resp.status_code == 200
+    # Each session is billed at least one hour at 40/h
+    assert timeseries(client, headers, f'?start={today}') == [(today, 80.0, 2)]
+
+    # The incrementally maintained rollup matches a rebuild from history
+    with client.application.app_context():
+        incremental = [(r.lot_id, str(r.day), r.revenue, r.sessions) for r in RevenueDaily.query.order_by(RevenueDaily.day)]
+        backfill_revenue_daily()
+        rebuilt = [(r.lot_id, str(r.day), r.revenue, r.sessions) for r in RevenueDaily.query.order_by(RevenueDaily.day)]
+    assert incremental == rebuilt
+
+
+if __name__ == "__main__":
+    test_revenue_per_lot_uses_cost_then_duration_fallback()
+    test_revenue_date_range_is_inclusive()
+    test_timeseries_from_backfilled_rollup()
+    test_unpark_updates_rollup()
+    print("✅ Revenue summary tests passed")
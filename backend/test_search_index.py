@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Test script for the trigram search index behind the admin searches
+
+Checks the FTS5 tables follow inserts, updates and deletes through their
+triggers, substring and short-query matching, limit/offset paging, the spot
+search's number/lot/status matching, that a user search is answered from the
+index rather than by scanning the user table, and that Alembic autogenerate
+leaves the search tables alone.
+"""
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy import text
+from bench_harness import make_app, seed_lot, make_user, auth_headers
+from extensions import db
+from models.parking_lot import ParkingLot
+from models.parking_spot import ParkingSpot
+from models.user import User
+from utils.search_index import include_in_migrations, matching_ids
+
+
+def setup_app():
+    app = make_app(CACHE_TYPE='NullCache')
+    with app.app_context():
+        harbour_id = seed_lot(3, occupied=1, name='Harbour View').id
+        seed_lot(2, name='Market Square')
+        for name in ('Anita Rao', 'Ravi Kumar', 'Priya "PK" Nair', 'Arjun Rao'):
+            make_user(f"{name.split()[0].lower()}@example.com", full_name=name)
+        headers = auth_headers(make_user('admin@parkease.com', role='admin', full_name='Super Admin'))
+    return app, app.test_client(), headers, harbour_id
+
+
+def search(client, headers, kind, query, **params):
+    args = ''.join(f'&{key}={value}' for key, value in params.items())
+    resp = client.get(f'/api/admin/{kind}/search?query={query}{args}', headers=headers)
+    assert resp.status_code == 200, resp.get_json()
+    return resp.get_json()
+
+
+def names(body, key='full_name'):
+    return [row[key] for row in body['results']]
+
+
+def test_user_search_matches_substrings_and_follows_writes():
+    app, client, headers, _ = setup_app()
+    assert names(search(client, headers, 'users', 'RAO')) == ['Anita Rao', 'Arjun Rao']
+    assert names(search(client, headers, 'users', 'vi ku')) == ['Ravi Kumar']
+    # Short queries fall back to LIKE, quotes are matched literally
+    assert names(search(client, headers, 'users', 'ra')) == ['Anita Rao', 'Ravi Kumar', 'Arjun Rao']
+    assert names(search(client, headers, 'users', '"pk"')) == ['Priya "PK" Nair']
+    assert names(search(client, headers, 'users', '%')) == []
+    assert len(names(search(client, headers, 'users', ''))) == 5
+
+    with app.app_context():
+        user = User.query.filter_by(full_name='Ravi Kumar').one()
+        user.full_name = 'Ravi Raomani'
+        db.session.delete(User.query.filter_by(full_name='Anita Rao').one())
+        db.session.commit()
+    assert names(search(client, headers, 'users', 'rao')) == ['Ravi Raomani', 'Arjun Rao']
+    assert names(search(client, headers, 'users', 'kumar')) == []
+    assert names(search(client, headers, 'users', 'anita')) == []
+
+
+def test_paging():
+    _, client, headers, _ = setup_app()
+    first = search(client, headers, 'users', 'example', limit=2)
+    second = search(client, headers, 'users', 'example', limit=2, offset=2)
+    assert (len(first['results']), first['has_more']) == (2, True)
+    assert (len(second['results']), second['has_more']) == (2, False)
+    assert not set(names(first)) & set(names(second))
+    assert search(client, headers, 'users', 'example', limit=10000)['limit'] == 500
+
+
+def test_lot_and_spot_search():
+    app, client, headers, harbour_id = setup_app()
+    assert names(search(client, headers, 'parking-lots', 'square'), 'name') == ['Market Square']
+    assert names(search(client, headers, 'parking-lots', 'street'), 'name') == ['Harbour View', 'Market Square']
+
+    spots = search(client, headers, 'parking-spots', 'harbour')['results']
+    assert [(s['lot_id'], s['spot_number'], s['status']) for s in spots] == [
+        (harbour_id, '1', 'occupied'), (harbour_id, '2', 'available'), (harbour_id, '3', 'available')
+    ]
+    assert [s['lot_name'] for s in search(client, headers, 'parking-spots', 'occupied')['results']] == ['Harbour View']
+    assert len(search(client, headers, 'parking-spots', 'available')['results']) == 4
+    assert len(search(client, headers, 'parking-spots', '2')['results']) == 2
+
+    with app.app_context():
+        db.session.get(ParkingLot, harbour_id).name = 'Dockside'
+        db.session.add(ParkingSpot(lot_id=harbour_id, spot_number='VIP-1'))
+        db.session.commit()
+    assert search(client, headers, 'parking-spots', 'harbour')['results'] == []
+    assert names(search(client, headers, 'parking-spots', 'vip'), 'spot_number') == ['VIP-1']
+
+
+def test_user_search_uses_the_index():
+    app, _, _, _ = setup_app()
+    with app.app_context():
+        query = db.session.query(User).filter(User.id.in_(matching_ids('user', 'rao')))
+        sql = str(query.statement.compile(compile_kwargs={'literal_binds': True}))
+        plan = ' | '.join(row[3] for row in db.session.execute(text('EXPLAIN QUERY PLAN ' + sql)))
+        assert 'VIRTUAL TABLE INDEX' in plan and 'SCAN user ' not in plan + ' ', plan
+
+
+def test_autogenerate_keeps_the_search_tables():
+    app, _, _, _ = setup_app()
+    with app.app_context(), db.engine.connect() as conn:
+        # Without the hook every search table and FTS5 shadow table would be dropped
+        unfiltered = compare_metadata(MigrationContext.configure(conn), db.metadata)
+        assert {diff[0] for diff in unfiltered} == {'remove_table'}
+        assert len(unfiltered) == 15
+        context = MigrationContext.configure(conn, opts={'include_object': include_in_migrations})
+        assert compare_metadata(context, db.metadata) == []
+
+
+if __name__ == "__main__":
+    test_user_search_matches_substrings_and_follows_writes()
+    test_paging()
+    test_lot_and_spot_search()
+    test_user_search_uses_the_index()
+    test_autogenerate_keeps_the_search_tables()
+    print("✅ Search index tests passed")
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Test script for the auto-park spot allocator
+
+Checks lowest-free picking and the bitmap updates, that apps sharing a process
+keep separate bitmaps, and that auto-park recovers from a stale bitmap: spots
+taken behind its back are skipped after a reload, and spots freed behind its
+back are found through the database instead of answering "no spots".
+"""
+from sqlalchemy import update
+from bench_harness import make_parking_app
+from extensions import db
+from models.parking_spot import ParkingSpot
+from utils import spot_allocator
+
+
+def spot_id(lot_id, number):
+    return ParkingSpot.query.filter_by(lot_id=lot_id, spot_number=str(number)).one().id
+
+
+def set_occupied(lot_id, numbers, occupied):
+    """Change spots in the DB without telling the allocator (another worker did it)"""
+    db.session.execute(update(ParkingSpot).where(
+        ParkingSpot.lot_id == lot_id, ParkingSpot.spot_number.in_([str(n) for n in numbers])
+    ).values(is_occupied=occupied))
+    db.session.commit()
+
+
+def auto_park(app, ctx):
+    return app.test_client().post('/api/parking/auto-park', headers=ctx['user'],
+                                  json={'vehicle_id': ctx['vehicle_id'], 'lot_id': ctx['lot_id']})
+
+
+def test_reserve_takes_the_lowest_free_spot():
+    app, ctx = make_parking_app(num_spots=12, occupied=2)
+    lot_id = ctx['lot_id']
+    with app.app_context():
+        assert spot_allocator.reserve(lot_id) == spot_id(lot_id, 3)
+        assert spot_allocator.reserve(lot_id) == spot_id(lot_id, 4)
+        spot_allocator.release(lot_id, '3')
+        spot_allocator.mark_occupied(lot_id, '5')
+        assert [spot_allocator.reserve(lot_id) for _ in range(3)] == [spot_id(lot_id, n) for n in (3, 6, 7)]
+        for _ in range(5):
+            spot_allocator.reserve(lot_id)
+        assert spot_allocator.reserve(lot_id) is None
+        spot_allocator.invalidate(lot_id)
+        assert spot_allocator.reserve(lot_id) == spot_id(lot_id, 3)
+
+
+def test_apps_keep_separate_bitmaps():
+    first, first_ctx = make_parking_app(occupied=2)
+    second, second_ctx = make_parking_app()
+    assert first_ctx['lot_id'] == second_ctx['lot_id']
+    with first.app_context():
+        assert spot_allocator.reserve(first_ctx['lot_id']) == spot_id(first_ctx['lot_id'], 3)
+    with second.app_context():
+        assert spot_allocator.reserve(second_ctx['lot_id']) == spot_id(second_ctx['lot_id'], 1)
+
+
+def test_auto_park_reloads_after_a_lost_claim():
+    app, ctx = make_parking_app()
+    with app.app_context():
+        spot_allocator.reserve(ctx['lot_id'])
+        spot_allocator.release(ctx['lot_id'], '1')
+        set_occupied(ctx['lot_id'], [1], True)
+    resp = auto_park(app, ctx)
+    assert resp.status_code == 200
+    assert resp.get_json()['spot_number'] == '2'
+
+
+def test_auto_park_finds_spots_freed_behind_the_bitmap():
+    app, ctx = make_parking_app(occupied=4)
+    with app.app_context():
+        assert spot_allocator.reserve(ctx['lot_id']) is None
+        set_occupied(ctx['lot_id'], [3, 4], False)
+    resp = auto_park(app, ctx)
+    assert resp.status_code == 200
+    assert resp.get_json()['spot_number'] == '3'
+
+
+def test_auto_park_falls_back_to_the_db_after_repeated_losses():
+    # Lost races cost extra statements, over the route's budget
+    app, ctx = make_parking_app(num_spots=6, SQL_QUERY_BUDGET_STRICT=False)
+    with app.app_context():
+        spot_allocator.reserve(ctx['lot_id'])
+        spot_allocator.release(ctx['lot_id'], '1')
+        set_occupied(ctx['lot_id'], [1, 2, 3, 4], True)
+        # Every reload sees a bitmap that is stale again by the time it claims
+        reserve = spot_allocator.reserve
+        spot_allocator.reserve = lambda lot_id: spot_id(lot_id, 1)
+        try:
+            resp = auto_park(app, ctx)
+        finally:
+            spot_allocator.reserve = reserve
+    assert resp.status_code == 200
+    assert resp.get_json()['spot_number'] == '5'
+
+
+def test_auto_park_reports_a_full_lot():
+    app, ctx = make_parking_app(occupied=4)
+    resp = auto_park(app, ctx)
+    assert resp.status_code == 400
+    assert resp.get_json()['error'] == 'No available spots in this lot'
+
+
+def main():
+    tests = [
+        test_reserve_takes_the_lowest_free_spot,
+        test_apps_keep_separate_bitmaps,
+        test_auto_park_reloads_after_a_lost_claim,
+        test_auto_park_finds_spots_freed_behind_the_bitmap,
+        test_auto_park_falls_back_to_the_db_after_repeated_losses,
+        test_auto_park_reports_a_full_lot,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test script for delta sync of a lot's spots (/spots/changes)
+
+Checks the delta returned for a client's `since` version (latest state of each
+changed spot only) and the full snapshot returned when the change log no
+longer reaches back to that version: trimmed, reset by a resize, or a version
+the server never issued.
+"""
+from bench_harness import make_parking_app
+from extensions import db
+from utils.parking_ops import claim_spot, release_spot, reset_spot_changes
+
+
+def get_changes(app, ctx, since):
+    resp = app.test_client().get(f"/api/parking/lots/{ctx['lot_id']}/spots/changes?since={since}",
+                                 headers=ctx['user'])
+    assert resp.status_code == 200
+    return resp.get_json()
+
+
+def test_delta_since_a_version():
+    app, ctx = make_parking_app()
+    lot_id, spots = ctx['lot_id'], ctx['spots']
+    with app.app_context():
+        claim_spot(spots[1], lot_id, 'TN01AA0001')   # version 1
+        claim_spot(spots[2], lot_id, 'TN01AA0002')   # version 2
+        release_spot(spots[1], lot_id)               # version 3
+        db.session.commit()
+
+    delta = get_changes(app, ctx, 0)
+    assert delta['version'] == 3 and delta['full'] is False
+    # Spot 1 was parked and freed again: only its latest state is sent
+    assert sorted(delta['changes'], key=lambda c: c['id']) == [
+        {'id': spots[1], 'is_occupied': False, 'vehicle_plate': None},
+        {'id': spots[2], 'is_occupied': True, 'vehicle_plate': 'TN01AA0002'},
+    ]
+    assert get_changes(app, ctx, 2) == {
+        'version': 3, 'full': False, 'changes': [{'id': spots[1], 'is_occupied': False, 'vehicle_plate': None}]}
+    assert get_changes(app, ctx, 3) == {'version': 3, 'full': False, 'changes': []}
+
+
+def test_full_resync_when_the_log_no_longer_covers_since():
+    app, ctx = make_parking_app(SPOT_CHANGE_LOG_SIZE=10)
+    lot_id, spots = ctx['lot_id'], ctx['spots']
+    with app.app_context():
+        # 100 changes; the trim at version 100 keeps versions 91-100 only
+        for _ in range(50):
+            claim_spot(spots[3], lot_id, 'TN01AA0003')
+            release_spot(spots[3], lot_id)
+        claim_spot(spots[4], lot_id, 'TN01AA0004')   # version 101
+        db.session.commit()
+
+    assert get_changes(app, ctx, 90)['full'] is False
+    snapshot = get_changes(app, ctx, 50)
+    assert snapshot['version'] == 101 and snapshot['full'] is True
+    assert [(s['spot_number'], s['is_occupied']) for s in snapshot['spots']] == [
+        ('1', False), ('2', False), ('3', False), ('4', True)]
+    # A version from before a reset of the server's data
+    assert get_changes(app, ctx, 500)['full'] is True
+
+    with app.app_context():
+        reset_spot_changes(lot_id)
+        db.session.commit()
+    resized = get_changes(app, ctx, 101)
+    assert resized['version'] == 102 and resized['full'] is True
+
+
+def main():
+    tests = [
+        test_delta_since_a_version,
+        test_full_resync_when_the_log_no_longer_covers_since,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
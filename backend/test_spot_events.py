@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Test script for the in-process spot event bus and the SSE feed
+
+Checks that a client reconnecting with Last-Event-ID gets exactly the events
+it missed, and that an id which has aged out of the backlog (or comes from
+before a restart) gets a reset event instead of a partial replay. The Redis
+bus's retention check runs against a fake stream.
+"""
+from redis.exceptions import ResponseError
+from bench_harness import make_app, make_user, auth_headers
+from utils.spot_events import LocalEventBus, RedisEventBus, get_event_bus
+
+
+def spot_event(spot_id, lot_id=1):
+    return {'lot_id': lot_id, 'spot_id': spot_id, 'occupied': True, 'plate': None}
+
+
+def test_bus_replays_events_after_the_cursor():
+    bus = LocalEventBus(backlog=10)
+    assert bus.last_id() == '0' and bus.is_retained('0')
+    ids = [bus.publish(spot_event(i)) for i in range(1, 6)]
+    assert ids == ['1', '2', '3', '4', '5']
+    assert bus.is_retained('2')
+    assert bus.read('2', timeout=0) == [(str(i), spot_event(i)) for i in (3, 4, 5)]
+    # Nothing new: waits out the timeout and returns nothing
+    assert bus.read('5', timeout=0.01) == []
+
+
+def test_bus_drops_cursors_older_than_the_backlog():
+    bus = LocalEventBus(backlog=3)
+    for i in range(1, 6):
+        bus.publish(spot_event(i))
+    # Events 3-5 are kept: a client that saw 2 missed nothing, one that saw 1 lost event 2
+    assert bus.is_retained('2')
+    assert not bus.is_retained('1')
+    # An id ahead of the bus was issued before a restart
+    assert not bus.is_retained('9')
+    assert [event_id for event_id, _ in bus.read('0', timeout=0)] == ['3', '4', '5']
+
+
+class FakeStream:
+    """The stream commands RedisEventBus uses, with exact MAXLEN trimming as on Redis 7"""
+
+    def __init__(self, report_trimmed=True):
+        self.entries = []
+        self.seq = 0
+        self.trimmed = None
+        self.report_trimmed = report_trimmed
+
+    def xadd(self, name, fields, maxlen, approximate):
+        self.seq += 1
+        self.entries.append((f'1700000000000-{self.seq}'.encode(), {k.encode(): v.encode() for k, v in fields.items()}))
+        while len(self.entries) > maxlen:
+            self.trimmed = self.entries.pop(0)[0]
+        return self.entries[-1][0]
+
+    def xinfo_stream(self, name):
+        if not self.entries:
+            raise ResponseError('no such key')
+        info = {'first-entry': self.entries[0], 'last-generated-id': self.entries[-1][0]}
+        if self.report_trimmed:
+            info['max-deleted-entry-id'] = self.trimmed or b'0-0'
+        return info
+
+    def flushall(self):
+        self.entries, self.trimmed = [], None
+
+
+def redis_bus(backlog, **kwargs):
+    bus = RedisEventBus(None, backlog, client=FakeStream(**kwargs))
+    ids = [bus.publish(spot_event(i)) for i in range(1, 6)]
+    return bus, ids
+
+
+def test_redis_bus_retention_against_the_first_entry():
+    bus, ids = redis_bus(backlog=3)
+    # ids[2:] are kept; a client that saw ids[1] (just trimmed) missed nothing
+    assert bus.is_retained(ids[1]) and bus.is_retained(ids[4])
+    assert not bus.is_retained(ids[0])
+    # Before Redis 7 only the first entry is known, so the cursor has to reach it
+    old_bus, ids = redis_bus(backlog=3, report_trimmed=False)
+    assert old_bus.is_retained(ids[2]) and not old_bus.is_retained(ids[1])
+
+
+def test_redis_bus_resets_cursors_ahead_of_the_stream():
+    bus, ids = redis_bus(backlog=10)
+    assert not bus.is_retained('1700000000000-99')
+    bus._redis.flushall()
+    # After a flush every old id is ahead of the (missing) stream
+    assert not bus.is_retained(ids[-1])
+    assert bus.is_retained('0-0')
+    assert bus.is_retained(bus.publish(spot_event(6)))
+
+
+def read_stream(client, headers, blocks):
+    """The first `blocks` SSE blocks of the feed"""
+    resp = client.get('/api/parking/events', headers=headers, buffered=False)
+    assert resp.mimetype == 'text/event-stream'
+    found = []
+    try:
+        for chunk in resp.response:
+            chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+            if not chunk.startswith(('retry:', ':')):
+                found.append(chunk)
+            if len(found) == blocks:
+                return found
+    finally:
+        resp.close()
+
+
+def setup_app(backlog):
+    app = make_app(SPOT_EVENTS_BACKLOG=backlog, SPOT_EVENTS_HEARTBEAT=0.01)
+    with app.app_context():
+        headers = auth_headers(make_user('driver@example.com'))
+        bus = get_event_bus()
+        for i in range(1, 6):
+            bus.publish(spot_event(i))
+    return app.test_client(), headers
+
+
+def test_reconnect_replays_missed_events():
+    client, headers = setup_app(backlog=10)
+    blocks = read_stream(client, dict(headers, **{'Last-Event-ID': '3'}), 2)
+    assert blocks == [
+        'id: 4\nevent: spot\ndata: {"lot_id":1,"spot_id":4,"occupied":true,"plate":null}\n\n',
+        'id: 5\nevent: spot\ndata: {"lot_id":1,"spot_id":5,"occupied":true,"plate":null}\n\n',
+    ]
+
+
+def test_expired_last_event_id_gets_a_reset():
+    client, headers = setup_app(backlog=3)
+    blocks = read_stream(client, dict(headers, **{'Last-Event-ID': '1'}), 1)
+    # Followed from the newest event on, so nothing is replayed after the reset
+    assert blocks == ['id: 5\nevent: reset\ndata: {}\n\n']
+    assert read_stream(client, dict(headers, **{'Last-Event-ID': 'garbage'}), 1) == blocks
+
+
+def main():
+    tests = [
+        test_bus_replays_events_after_the_cursor,
+        test_bus_drops_cursors_older_than_the_backlog,
+        test_redis_bus_retention_against_the_first_entry,
+        test_redis_bus_resets_cursors_ahead_of_the_stream,
+        test_reconnect_replays_missed_events,
+        test_expired_last_event_id_gets_a_reset,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
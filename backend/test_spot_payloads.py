@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Test script for the compact ?format=bitmap spot payload
+
+Decodes lot_spot_bitmap() the way a client does and checks it round-trips to
+the same spots as the full list: a spot count that isn't a multiple of 8, gaps
+in spot numbers and ids, non-numeric spot numbers and an empty lot.
+"""
+import base64
+from bench_harness import make_app, seed_lot
+from extensions import db
+from models.parking_lot import ParkingLot
+from models.parking_spot import ParkingSpot
+from models.vehicle import Vehicle
+from utils.spot_payloads import lot_spot_bitmap, lot_spot_rows
+
+
+def decode_bitmap(payload):
+    """Spot dicts (as in the full list) from a bitmap payload"""
+    bits = base64.b64decode(payload['bitmap'])
+    assert len(bits) == (payload['count'] + 7) // 8
+    ids = [first + i for first, length in payload['spot_ids'] for i in range(length)]
+    numbers = payload['spot_numbers'] or [str(i + 1) for i in range(payload['count'])]
+    plates = dict(payload['plates'])
+    assert len(ids) == len(numbers) == payload['count']
+    return [{
+        'id': ids[index],
+        'spot_number': numbers[index],
+        'is_occupied': bool(bits[index >> 3] & (0x80 >> (index & 7))),
+        'vehicle_plate': plates.get(index)
+    } for index in range(payload['count'])]
+
+
+def park(lot_id, spot_number, plate):
+    spot = ParkingSpot.query.filter_by(lot_id=lot_id, spot_number=spot_number).one()
+    spot.is_occupied = True
+    db.session.add(Vehicle(user_id=1, license_plate=plate, spot_id=spot.id))
+
+
+def test_count_not_a_multiple_of_eight():
+    app = make_app()
+    with app.app_context():
+        lot_id = seed_lot(13, occupied=3).id
+        park(lot_id, '13', 'TN01AA0013')
+        db.session.commit()
+        payload = lot_spot_bitmap(lot_id)
+        assert payload['count'] == 13 and payload['spot_numbers'] is None
+        # Padding bits of the last byte stay clear
+        assert base64.b64decode(payload['bitmap']) == bytes([0b11100000, 0b00001000])
+        assert decode_bitmap(payload) == lot_spot_rows(lot_id, numeric_order=True)
+
+
+def test_gaps_in_spot_numbers_and_ids():
+    app = make_app()
+    with app.app_context():
+        lot_id = seed_lot(20).id
+        # Drop some spots (id gaps), renumber one out of order and add a non-numeric one
+        ParkingSpot.query.filter(ParkingSpot.lot_id == lot_id,
+                                 ParkingSpot.spot_number.in_(['3', '4', '9', '17'])).delete()
+        ParkingSpot.query.filter_by(lot_id=lot_id, spot_number='2').one().spot_number = '40'
+        db.session.add(ParkingSpot(lot_id=lot_id, spot_number='VIP', is_occupied=False))
+        db.session.flush()
+        for number, plate in (('1', 'TN01AA0001'), ('40', 'TN01AA0040'), ('VIP', 'TN01AA0999')):
+            park(lot_id, number, plate)
+        db.session.commit()
+        payload = lot_spot_bitmap(lot_id)
+        assert payload['count'] == 17
+        assert payload['spot_numbers'][0] == '1' and payload['spot_numbers'][-2:] == ['40', 'VIP']
+        assert len(payload['spot_ids']) > 1
+        decoded = decode_bitmap(payload)
+        assert decoded == lot_spot_rows(lot_id, numeric_order=True)
+        assert [s['spot_number'] for s in decoded if s['is_occupied']] == ['1', '40', 'VIP']
+
+
+def test_empty_lot():
+    app = make_app()
+    with app.app_context():
+        lot = ParkingLot(name='Empty Lot', address='Empty Street', pincode='600001', price_per_hour=20.0,
+                         max_spots=0, location='Empty Street')
+        db.session.add(lot)
+        db.session.commit()
+        payload = lot_spot_bitmap(lot.id)
+        assert payload == {'count': 0, 'bitmap': '', 'spot_ids': [], 'spot_numbers': None, 'plates': []}
+        assert decode_bitmap(payload) == []
+
+
+def main():
+    tests = [
+        test_count_not_a_multiple_of_eight,
+        test_gaps_in_spot_numbers_and_ids,
+        test_empty_lot,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,111 @@
-# Redis caching utilities go here
+"""
+Tag-based view caching on top of the shared `cache` from extensions.py.
+
+Every cached view declares the tags its data depends on (``lot:<id>``,
+``user:<id>``, ``lots:all``, ``users:all``). Each tag has a generation counter
+stored in the cache, and the generations are part of the cache key. A write
+bumps the tags it touched with one INCR each, which makes every entry built
+from the old generation unreachable (it then just expires); no key lists to
+maintain, and per-query keys such as searches are invalidated too.
+
+Views can also opt into a strong ETag (hash of the cached body, computed once
+per cache fill) so pollers get a bodiless 304 while nothing has changed.
+"""
+import hashlib
+import time
+from functools import wraps
+from flask import request, make_response
+from extensions import cache
+from utils import metrics
+
+LOTS_ALL = 'lots:all'
+USERS_ALL = 'users:all'
+
+_GEN_PREFIX = 'tag_gen:'
+
+
+def lot_tag(lot_id):
+    return f'lot:{lot_id}'
+
+
+def user_tag(user_id):
+    return f'user:{user_id}'
+
+
+def _seed():
+    # Used when a counter is missing (first use, or evicted): a clock-based
+    # start never repeats a generation that old entries could still carry
+    return time.time_ns() // 1000
+
+
+def tag_generations(tags):
+    """Current generation of each tag, fetched in one round trip"""
+    keys = [_GEN_PREFIX + tag for tag in tags]
+    values = cache.get_many(*keys)
+    if any(v is None for v in values):
+        for key, value in zip(keys, values):
+            if value is None:
+                cache.add(key, _seed(), timeout=0)
+        values = cache.get_many(*keys)
+    return values
+
+
+def invalidate_tags(*tags):
+    """Bump the generation of each tag, invalidating every entry that depends on it"""
+    backend = cache.cache
+    for tag in set(tags):
+        key = _GEN_PREFIX + tag
+        if backend.inc(key) == 1:
+            # The counter had disappeared; don't restart from a low number
+            cache.set(key, _seed(), timeout=0)
+
+
+def _resolve(spec):
+    if callable(spec):
+        return spec()
+    return spec.format(**(request.view_args or {}))
+
+
+def _conditional(response, etag, cache_control):
+    if cache_control:
+        response.headers['Cache-Control'] = cache_control
+    if etag:
+        response.set_etag(etag)
+        response.make_conditional(request)
+    return response
+
+
+def cached_view(key, tags, timeout=60, etag=False, cache_control=None):
+    """
+    Cache a view's response under `key`, invalidated through `tags`.
+
+    `key` and each tag may be a callable or a string formatted with the view
+    args (e.g. 'lot:{lot_id}'); `tags` may also be a callable returning a list.
+    Only 200 responses are cached. With `etag=True` responses carry a strong
+    ETag and If-None-Match is answered with 304; `cache_control` sets the
+    Cache-Control header.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            tag_list = tags() if callable(tags) else [_resolve(tag) for tag in tags]
+            generations = tag_generations(tag_list)
+            cache_key = f"view:{_resolve(key)}@" + '.'.join(str(g) for g in generations)
+
+            cached = cache.get(cache_key)
+            metrics.record_cache(request.endpoint, cached is not None)
+            if cached is not None:
+                body, status, mimetype, body_etag = cached
+                response = make_response(body, status)
+                response.mimetype = mimetype
+                return _conditional(response, body_etag if etag else None, cache_control)
+
+            response = make_response(f(*args, **kwargs))
+            if response.status_code != 200 or response.direct_passthrough:
+                return response
+            body = response.get_data()
+            body_etag = hashlib.sha1(body).hexdigest() if etag else None
+            cache.set(cache_key, (body, response.status_code, response.mimetype, body_etag), timeout=timeout)
+            return _conditional(response, body_etag, cache_control)
+        return decorated_function
+    return decorator
@@ -0,0 +1,156 @@
+"""
+Parking history CSV exports, streamed to gzip files.
+
+Rows are read with ``yield_per`` (``EXPORT_CHUNK_SIZE`` at a time, lot name
+joined in the same SELECT), so no history is held in memory beyond one chunk,
+and written through ``gzip.open`` into ``EXPORT_DIR``. Each export task writes
+its own file named after the task id, first under a ``.part`` name that is
+renamed when complete, so concurrent exports for one user never overwrite or
+serve each other's half-written files.
+
+Progress (rows written out of the total) is reported after every chunk; the
+Celery task publishes it as the PROGRESS state that the status endpoints
+return. Downloads go through ``send_file`` with conditional responses, so
+clients can resume with HTTP Range requests.
+
+Exports, and ``.part`` files left by interrupted ones, are deleted once they
+are ``EXPORT_RETENTION`` seconds old: the user's own when they start a new
+export, everyone's from an hourly beat task.
+"""
+import csv
+import gzip
+import os
+import re
+import time
+from datetime import timedelta
+from flask import current_app, jsonify, send_file
+from sqlalchemy import func
+from extensions import db
+from models.parking_history import ParkingHistory
+from models.parking_lot import ParkingLot
+
+HEADER = ['slot_id', 'spot_id', 'lot_name', 'parking_time', 'released_time', 'cost', 'remarks']
+# IST has no daylight saving, so a fixed offset replaces a per-row pytz conversion
+IST_OFFSET = timedelta(hours=5, minutes=30)
+
+
+def export_dir():
+    return current_app.config.get('EXPORT_DIR') or os.path.join(current_app.root_path, 'exports')
+
+
+def export_prefix(user_id):
+    return f'user_{user_id}_parking_history'
+
+
+def export_filename(user_id, task_id):
+    return f'{export_prefix(user_id)}_{task_id}.csv.gz'
+
+
+def remove_old_exports(user_id=None, now=None):
+    """Delete one user's (or everyone's) exports older than EXPORT_RETENTION seconds; returns how many"""
+    directory = export_dir()
+    if not os.path.isdir(directory):
+        return 0
+    owner = re.escape(export_prefix(user_id)) if user_id is not None else r'user_\d+_parking_history'
+    pattern = re.compile(owner + r'(_[^/]*)?\.csv(\.gz)?(\.part)?$')
+    cutoff = (now or time.time()) - current_app.config.get('EXPORT_RETENTION', 24 * 3600)
+    removed = 0
+    for filename in os.listdir(directory):
+        if not pattern.match(filename):
+            continue
+        path = os.path.join(directory, filename)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            continue
+    return removed
+
+
+def _format_ist(dt):
+    return (dt + IST_OFFSET).strftime('%Y-%m-%d %I:%M %p') if dt else ''
+
+
+def history_rows(user_id):
+    """The user's history as CSV rows, newest first, fetched EXPORT_CHUNK_SIZE at a time"""
+    chunk_size = current_app.config.get('EXPORT_CHUNK_SIZE', 1000)
+    query = db.session.query(
+        ParkingHistory.id,
+        ParkingHistory.spot_id,
+        ParkingLot.name,
+        ParkingHistory.parking_time,
+        ParkingHistory.released_time,
+        ParkingHistory.total_cost,
+        ParkingHistory.status
+    ).outerjoin(ParkingLot, ParkingLot.id == ParkingHistory.lot_id).filter(
+        ParkingHistory.user_id == user_id
+    ).order_by(ParkingHistory.parking_time.desc(), ParkingHistory.id.desc()).execution_options(yield_per=chunk_size)
+    for history_id, spot_id, lot_name, parking_time, released_time, cost, status in query:
+        yield [history_id, spot_id, lot_name or '', _format_ist(parking_time), _format_ist(released_time),
+               cost or 0, status or '']
+
+
+def write_history_csv(user_id, filename, progress=None):
+    """
+    Write the user's history to EXPORT_DIR/filename (gzip CSV), first
+    deleting the user's expired exports. Calls progress(rows, total) after
+    every chunk; returns the number of rows (0 without writing a file when
+    there is no history).
+    """
+    chunk_size = current_app.config.get('EXPORT_CHUNK_SIZE', 1000)
+    remove_old_exports(user_id)
+    total = db.session.query(func.count(ParkingHistory.id)).filter(ParkingHistory.user_id == user_id).scalar()
+    if not total:
+        return 0
+    directory = export_dir()
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, filename)
+    partial = path + '.part'
+    rows = 0
+    try:
+        with gzip.open(partial, 'wt', newline='', encoding='utf-8', compresslevel=6) as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(HEADER)
+            for row in history_rows(user_id):
+                writer.writerow(row)
+                rows += 1
+                if progress and rows % chunk_size == 0:
+                    progress(rows, total)
+        os.replace(partial, path)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    if progress:
+        progress(rows, max(total, rows))
+    return rows
+
+
+def export_status(result, download_base):
+    """Status payload for an export task's AsyncResult"""
+    if result.state == 'SUCCESS':
+        data = result.result
+        if data and data.get('success'):
+            return {'ready': True, 'rows': data.get('rows'), 'download_url': f'{download_base}/{data.get("filename")}'}
+        return {'ready': False, 'error': data.get('error', 'Unknown error')}
+    if result.state == 'FAILURE':
+        return {'ready': False, 'error': 'Export failed'}
+    if result.state == 'PROGRESS':
+        return {'ready': False, 'progress': result.info}
+    return {'ready': False}
+
+
+def send_export(user_id, filename):
+    """
+    Download response for one of the user's exports; the file is served
+    conditionally, so Range and If-Range requests get 206 responses
+    """
+    prefix = export_prefix(user_id)
+    if not filename.startswith(prefix + '_') and filename != prefix + '.csv':
+        return jsonify({'error': 'Access denied'}), 403
+    path = os.path.join(export_dir(), filename)
+    if os.path.basename(filename) != filename or filename.endswith('.part') or not os.path.isfile(path):
+        return jsonify({'error': 'File not found'}), 404
+    mimetype = 'application/gzip' if filename.endswith('.gz') else 'text/csv'
+    return send_file(path, mimetype=mimetype, as_attachment=True, download_name=filename, conditional=True)
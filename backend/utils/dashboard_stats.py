@@ -0,0 +1,49 @@
+"""
+Counters for the admin dashboard.
+
+Spot totals come from the denormalized ParkingLot.total_spots/occupied_count
+counters (kept by park/unpark and the lot endpoints, see utils/lot_counters.py
+for the reconciliation) rather than COUNTs over parking_spot, and every
+counter is a scalar subquery of a single statement, so a cold dashboard is
+one round trip. The views cache the result under the lots/users tags.
+"""
+from sqlalchemy import func, select
+from extensions import db
+from models.parking_lot import ParkingLot
+from models.user import User
+from models.vehicle import Vehicle
+
+
+def _spot_totals():
+    return (
+        select(func.coalesce(func.sum(ParkingLot.total_spots), 0)).scalar_subquery(),
+        select(func.coalesce(func.sum(ParkingLot.occupied_count), 0)).scalar_subquery(),
+    )
+
+
+def dashboard_stats():
+    """Users, lots, spots and vehicles in one statement"""
+    total_users, total_lots, total_spots, occupied_spots, total_vehicles = db.session.query(
+        select(func.count()).select_from(User).scalar_subquery(),
+        select(func.count()).select_from(ParkingLot).scalar_subquery(),
+        *_spot_totals(),
+        select(func.count()).select_from(Vehicle).scalar_subquery()
+    ).one()
+    return {
+        'total_users': total_users,
+        'total_lots': total_lots,
+        'total_spots': total_spots,
+        'occupied_spots': occupied_spots,
+        'available_spots': total_spots - occupied_spots,
+        'total_vehicles': total_vehicles
+    }
+
+
+def live_spot_stats():
+    """Just the spot counters, which change on every park and unpark"""
+    total_spots, occupied_spots = db.session.query(*_spot_totals()).one()
+    return {
+        'total_spots': total_spots,
+        'occupied_spots': occupied_spots,
+        'available_spots': total_spots - occupied_spots
+    }
@@ -0,0 +1,125 @@
+"""
+Free-spot forecasts from per-lot arrival/departure rate profiles.
+
+A nightly Celery task bins the last ``FORECAST_HISTORY_WEEKS`` weeks of
+ParkingHistory into 15-minute slots of the week (672 slots, Monday 00:00 UTC
+first) with NumPy, per lot, and stores the mean arrivals and departures per
+slot as float32 arrays in ``lot_forecast_profile``. A forecast then starts from
+the lot's current occupancy counter and steps through the upcoming slots,
+adding expected arrivals and subtracting expected departures (clamped to the
+lot's capacity), without touching the history.
+"""
+from datetime import datetime, timedelta
+from itertools import accumulate, chain
+import numpy as np
+from flask import current_app
+from sqlalchemy import Integer, cast, func, or_
+from extensions import db
+from models.forecast_profile import LotForecastProfile
+from models.parking_history import ParkingHistory
+from models.parking_lot import ParkingLot
+
+SLOT_SECONDS = 15 * 60
+SLOTS_PER_WEEK = 7 * 24 * 4
+# 1970-01-01 was a Thursday; shift so slot 0 is Monday 00:00 UTC
+_EPOCH_SLOT_SHIFT = 3 * 24 * 4
+EPOCH = datetime(1970, 1, 1)
+
+
+def to_epoch(moment):
+    return int((moment - EPOCH).total_seconds())
+
+
+def slot_of_week(epoch_seconds):
+    """Slot of the week for epoch seconds (an int or a NumPy array)"""
+    return (epoch_seconds // SLOT_SECONDS + _EPOCH_SLOT_SHIFT) % SLOTS_PER_WEEK
+
+
+def build_profiles(lot_index, arrive, depart, num_lots, window_start, window_end):
+    """
+    Mean arrivals and departures per lot and slot of the week, each of shape
+    (num_lots, SLOTS_PER_WEEK), from parallel arrays of lot indexes and epoch
+    arrive/depart seconds (depart < 0 while still parked). Only events inside
+    [window_start, window_end) count.
+    """
+    weeks = max((window_end - window_start) / (7 * 24 * 3600), 1e-9)
+    size = num_lots * SLOTS_PER_WEEK
+
+    def mean_rate(times):
+        inside = (times >= window_start) & (times < window_end)
+        counts = np.bincount(lot_index[inside] * SLOTS_PER_WEEK + slot_of_week(times[inside]), minlength=size)
+        return (counts.reshape(num_lots, SLOTS_PER_WEEK) / weeks).astype(np.float32)
+
+    return mean_rate(arrive), mean_rate(depart)
+
+
+def _epoch_seconds(column):
+    return cast(func.strftime('%s', column), Integer)
+
+
+def refresh_forecast_profiles(now=None):
+    """Rebuild every lot's profile from recent history; returns the number of lots"""
+    now = now or datetime.utcnow()
+    weeks = int(current_app.config.get('FORECAST_HISTORY_WEEKS', 8))
+    window_start = now - timedelta(weeks=weeks)
+
+    lot_ids = [lot_id for lot_id, in db.session.query(ParkingLot.id).order_by(ParkingLot.id)]
+    rows = db.session.query(
+        ParkingHistory.lot_id,
+        _epoch_seconds(ParkingHistory.parking_time),
+        func.coalesce(_epoch_seconds(ParkingHistory.released_time), -1)
+    ).filter(
+        ParkingHistory.parking_time.isnot(None),
+        or_(ParkingHistory.parking_time >= window_start, ParkingHistory.released_time >= window_start)
+    ).all()
+    data = np.fromiter(chain.from_iterable(rows), dtype=np.int64, count=3 * len(rows)).reshape(-1, 3)
+
+    # Map lot ids to dense row indexes, dropping sessions of deleted lots
+    lookup = np.full(max(lot_ids, default=0) + 1, -1, dtype=np.int64)
+    lookup[lot_ids] = np.arange(len(lot_ids))
+    index = lookup[np.minimum(data[:, 0], len(lookup) - 1)]
+    index[data[:, 0] >= len(lookup)] = -1
+    known = index >= 0
+    arrivals, departures = build_profiles(
+        index[known], data[known, 1], data[known, 2], len(lot_ids), to_epoch(window_start), to_epoch(now)
+    )
+
+    LotForecastProfile.query.delete(synchronize_session=False)
+    db.session.add_all([LotForecastProfile(
+        lot_id=lot_id,
+        arrivals=arrivals[i].tobytes(),
+        departures=departures[i].tobytes(),
+        weeks=weeks,
+        built_at=now
+    ) for i, lot_id in enumerate(lot_ids)])
+    db.session.commit()
+    return len(lot_ids)
+
+
+def forecast_free_spots(lot, hours, now=None):
+    """
+    [(slot end time, expected free spots)] for the next `hours`, or None when
+    the lot has no profile yet
+    """
+    profile = db.session.get(LotForecastProfile, lot.id)
+    if profile is None:
+        return None
+    now = now or datetime.utcnow()
+    arrivals = np.frombuffer(profile.arrivals, dtype=np.float32)
+    departures = np.frombuffer(profile.departures, dtype=np.float32)
+
+    now_epoch = to_epoch(now)
+    current_start = now_epoch - now_epoch % SLOT_SECONDS
+    steps = hours * 4
+    slots = slot_of_week(current_start + np.arange(steps) * SLOT_SECONDS)
+    net = (arrivals[slots] - departures[slots]).astype(np.float64)
+    # Only the rest of the current slot is still ahead of us
+    net[0] *= (current_start + SLOT_SECONDS - now_epoch) / SLOT_SECONDS
+
+    capacity = lot.total_spots
+    occupied = accumulate(net, lambda occ, change: min(max(occ + change, 0.0), capacity), initial=float(lot.occupied_count))
+    next(occupied)
+    return [(
+        EPOCH + timedelta(seconds=int(current_start) + (step + 1) * SLOT_SECONDS),
+        capacity - expected
+    ) for step, expected in enumerate(occupied)]
@@ -0,0 +1,47 @@
+"""
+Reconciliation for the denormalized ParkingLot.total_spots / occupied_count counters.
+
+The counters are maintained incrementally by park/unpark and the admin lot
+endpoints; this recomputes them from parking_spot in one grouped query and
+repairs any lot that has drifted (manual DB edits, scripts, crashed workers).
+"""
+from sqlalchemy import func, case
+from extensions import db
+from models.parking_lot import ParkingLot
+from models.parking_spot import ParkingSpot
+
+
+def find_counter_drift():
+    """Return [(lot, actual_total, actual_occupied)] for every lot whose counters are wrong"""
+    actual = dict(
+        (lot_id, (total, occupied or 0))
+        for lot_id, total, occupied in db.session.query(
+            ParkingSpot.lot_id,
+            func.count(ParkingSpot.id),
+            func.sum(case((ParkingSpot.is_occupied.is_(True), 1), else_=0))
+        ).group_by(ParkingSpot.lot_id)
+    )
+    drifted = []
+    for lot in ParkingLot.query.all():
+        total, occupied = actual.get(lot.id, (0, 0))
+        if lot.total_spots != total or lot.occupied_count != occupied:
+            drifted.append((lot, total, occupied))
+    return drifted
+
+
+def reconcile_lot_counters(dry_run=False):
+    """Repair drifted counters and return what was (or would be) changed"""
+    changes = []
+    for lot, total, occupied in find_counter_drift():
+        changes.append({
+            'lot_id': lot.id,
+            'lot_name': lot.name,
+            'total_spots': (lot.total_spots, total),
+            'occupied_count': (lot.occupied_count, occupied)
+        })
+        if not dry_run:
+            lot.total_spots = total
+            lot.occupied_count = occupied
+    if changes and not dry_run:
+        db.session.commit()
+    return changes
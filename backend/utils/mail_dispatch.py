@@ -0,0 +1,135 @@
+"""
+Bulk email sending over reused SMTP connections.
+
+``send_messages()`` splits messages into batches of ``MAIL_BATCH_SIZE`` and
+sends each batch over one ``mail.connect()`` connection instead of opening a
+connection (connect, EHLO, QUIT) per email as ``mail.send()`` does. Sends are
+paced to ``MAIL_RATE_LIMIT`` messages per second (0 = unlimited).
+
+A message that fails with a temporary error (4xx reply, dropped or refused
+connection) is retried in a later round, up to ``MAIL_MAX_RETRIES`` rounds,
+waiting ``MAIL_RETRY_BACKOFF`` seconds before the first and twice as long
+before each next one. Permanent errors (5xx reply, bad headers) are not
+retried. When the connection drops, the rest of the batch is retried on a
+fresh one.
+
+Every batch is counted in the mail_* metrics and written as a ``mail_batch``
+log line.
+"""
+import json
+import smtplib
+import time
+from flask import current_app
+from extensions import mail
+from utils import metrics
+
+# Errors after which the connection can no longer be used
+_CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, TimeoutError)
+
+
+class RateLimiter:
+    """Spaces calls to wait() at least 1/rate seconds apart (rate 0 = no limit)"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_at = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if now < self.next_at:
+            time.sleep(self.next_at - now)
+            now = self.next_at
+        self.next_at = now + self.interval
+
+
+def is_temporary(error):
+    """True if sending may succeed on a later attempt"""
+    if isinstance(error, _CONNECTION_ERRORS):
+        return True
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return any(code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code < 500
+    return False
+
+
+def _send_batch(batch, limiter):
+    """Send one batch over one connection: returns (sent, retry, failed) lists of messages"""
+    sent, retry, failed = [], [], []
+    done = 0
+    try:
+        with mail.connect() as conn:
+            for msg in batch:
+                limiter.wait()
+                try:
+                    conn.send(msg)
+                    sent.append(msg)
+                except _CONNECTION_ERRORS:
+                    raise
+                except Exception as e:
+                    (retry if is_temporary(e) else failed).append(msg)
+                    current_app.logger.warning(f"Failed to send email to {', '.join(msg.recipients)}: {e}")
+                done += 1
+    except _CONNECTION_ERRORS as e:
+        # Connecting failed or the connection dropped: everything not yet tried goes again
+        retry.extend(batch[done:])
+        if done < len(batch):
+            current_app.logger.warning(f"SMTP connection lost after {done}/{len(batch)} emails: {e}")
+    return sent, retry, failed
+
+
+def send_messages(messages, kind='email'):
+    """
+    Send flask_mail Messages in pooled batches with rate limiting and retries.
+    `kind` labels the metrics. Returns counts and the addresses that could not
+    be reached.
+    """
+    config = current_app.config
+    batch_size = config.get('MAIL_BATCH_SIZE', 200)
+    max_retries = config.get('MAIL_MAX_RETRIES', 3)
+    backoff = config.get('MAIL_RETRY_BACKOFF', 1.0)
+    limiter = RateLimiter(config.get('MAIL_RATE_LIMIT', 0))
+
+    pending = list(messages)
+    result = {'sent': 0, 'failed': 0, 'batches': 0, 'failed_recipients': []}
+    attempt = 0
+    while pending:
+        if attempt:
+            time.sleep(backoff * 2 ** (attempt - 1))
+        retry_later = []
+        for i in range(0, len(pending), batch_size):
+            batch = pending[i:i + batch_size]
+            started = time.perf_counter()
+            sent, retry, failed = _send_batch(batch, limiter)
+            elapsed = time.perf_counter() - started
+            if attempt >= max_retries:
+                failed, retry = failed + retry, []
+            _record_batch(kind, attempt, len(batch), sent, retry, failed, elapsed)
+            result['batches'] += 1
+            result['sent'] += len(sent)
+            result['failed'] += len(failed)
+            result['failed_recipients'].extend(address for msg in failed for address in msg.recipients)
+            retry_later.extend(retry)
+        pending = retry_later
+        attempt += 1
+    return result
+
+
+def _record_batch(kind, attempt, size, sent, retry, failed, elapsed):
+    labels = (('kind', kind),)
+    metrics.inc('mail_batches_total', labels)
+    metrics.observe('mail_batch_duration_seconds', labels, elapsed, metrics.TASK_BUCKETS)
+    for outcome, msgs in (('sent', sent), ('retried', retry), ('failed', failed)):
+        if msgs:
+            metrics.inc('mail_messages_total', labels + (('outcome', outcome),), len(msgs))
+    current_app.logger.info('mail_batch %s', json.dumps({
+        'kind': kind,
+        'attempt': attempt,
+        'size': size,
+        'sent': len(sent),
+        'retried': len(retry),
+        'failed': len(failed),
+        'seconds': round(elapsed, 3),
+    }))
@@ -0,0 +1,309 @@
+"""
+Prometheus-style metrics served as text exposition at /metrics.
+
+Recording is cheap enough to leave on: every thread writes into its own shard
+(plain dicts, no locks, only the owning thread mutates them) and the shards
+are merged when /metrics is scraped. The shard of a thread that has exited is
+folded into a per-process base and dropped, so one-thread-per-request servers
+don't accumulate shards. Each process also writes its merged
+snapshot to ``METRICS_DIR/<pid>.json`` at most every ``METRICS_FLUSH_INTERVAL``
+seconds, so a scrape of any web worker reports every web and Celery worker
+process. With ``METRICS_DIR`` unset only the scraped process is reported.
+A process removes its file when it exits, and snapshots not rewritten for
+``METRICS_MAX_AGE`` seconds (a worker that was killed, or has been idle that
+long) are skipped and deleted, so dead workers are not counted forever and a
+new process that reuses a pid starts from a fresh file.
+
+Recorded:
+- http_request_duration_seconds{blueprint,endpoint,method}  histogram
+- http_requests_total{blueprint,endpoint,method,status}
+- cache_requests_total{view,result}  hit/miss of every cached_view
+- db_queries_total / db_query_seconds_total{endpoint}
+- celery_task_duration_seconds{task}  histogram
+- celery_tasks_total{task,outcome}
+- mail_batches_total / mail_batch_duration_seconds{kind}  one per SMTP connection
+- mail_messages_total{kind,outcome}  sent, retried or failed
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from flask import Response, g, request
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+TASK_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0)
+
+_HELP = {
+    'http_request_duration_seconds': ('histogram', 'Request latency by endpoint'),
+    'http_requests_total': ('counter', 'Requests by endpoint and status'),
+    'cache_requests_total': ('counter', 'Cached view lookups by result'),
+    'db_queries_total': ('counter', 'SQL statements run by endpoint'),
+    'db_query_seconds_total': ('counter', 'Time spent in SQL by endpoint'),
+    'celery_task_duration_seconds': ('histogram', 'Celery task run time'),
+    'celery_tasks_total': ('counter', 'Celery task runs by outcome'),
+    'mail_batches_total': ('counter', 'Email batches sent over one SMTP connection'),
+    'mail_batch_duration_seconds': ('histogram', 'Time to send one email batch'),
+    'mail_messages_total': ('counter', 'Emails by send outcome'),
+}
+
+_shards = []
+_shards_lock = threading.Lock()
+_local = threading.local()
+_settings = {'dir': None, 'interval': 5.0, 'max_age': 300.0}
+_last_flush = [0.0]
+_hooked = set()
+
+
+class _Shard:
+    def __init__(self):
+        self.thread = threading.current_thread()
+        self.counters = {}
+        self.histograms = {}
+
+
+# Totals of shards whose threads have exited
+_retired = _Shard()
+
+
+def _merge_shard(shard, counters, histograms):
+    for key, value in dict(shard.counters).items():
+        counters[key] = counters.get(key, 0) + value
+    for key, hist in dict(shard.histograms).items():
+        merged = histograms.setdefault(key, [0] * len(hist))
+        for i, value in enumerate(list(hist)):
+            merged[i] += value
+
+
+def _retire_dead_shards():
+    """Fold the shards of finished threads into _retired; call with _shards_lock held"""
+    dead = [shard for shard in _shards if not shard.thread.is_alive()]
+    for shard in dead:
+        _merge_shard(shard, _retired.counters, _retired.histograms)
+        _shards.remove(shard)
+
+
+def _shard():
+    shard = getattr(_local, 'shard', None)
+    if shard is None:
+        shard = _local.shard = _Shard()
+        with _shards_lock:
+            _retire_dead_shards()
+            _shards.append(shard)
+    return shard
+
+
+def inc(name, labels, value=1):
+    """Add `value` to counter `name`; `labels` is a tuple of (key, value) pairs"""
+    counters = _shard().counters
+    key = (name, labels)
+    counters[key] = counters.get(key, 0) + value
+
+
+def observe(name, labels, value, buckets=REQUEST_BUCKETS):
+    """Record `value` in histogram `name` ([per-bucket counts..., +Inf count, sum])"""
+    histograms = _shard().histograms
+    key = (name, labels, buckets)
+    hist = histograms.get(key)
+    if hist is None:
+        hist = histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+    hist[bisect_left(buckets, value)] += 1
+    hist[-1] += value
+    _maybe_flush()
+
+
+def snapshot():
+    """This process's metrics, merged across thread shards"""
+    counters, histograms = {}, {}
+    with _shards_lock:
+        _retire_dead_shards()
+        _merge_shard(_retired, counters, histograms)
+        shards = list(_shards)
+    for shard in shards:
+        _merge_shard(shard, counters, histograms)
+    return counters, histograms
+
+
+def _to_json(counters, histograms):
+    return {
+        'counters': [[name, list(labels), value] for (name, labels), value in counters.items()],
+        'histograms': [[name, list(labels), list(buckets), hist] for (name, labels, buckets), hist in histograms.items()],
+    }
+
+
+def _merge_json(data, counters, histograms):
+    for name, labels, value in data['counters']:
+        key = (name, tuple(tuple(pair) for pair in labels))
+        counters[key] = counters.get(key, 0) + value
+    for name, labels, buckets, hist in data['histograms']:
+        key = (name, tuple(tuple(pair) for pair in labels), tuple(buckets))
+        merged = histograms.setdefault(key, [0] * len(hist))
+        for i, value in enumerate(hist):
+            merged[i] += value
+
+
+def flush():
+    """Write this process's snapshot to METRICS_DIR for other processes' scrapes"""
+    directory = _settings['dir']
+    _last_flush[0] = time.monotonic()
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{os.getpid()}.json')
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(_to_json(*snapshot()), f)
+    os.replace(tmp_path, path)
+
+
+def _maybe_flush():
+    if _settings['dir'] and time.monotonic() - _last_flush[0] >= _settings['interval']:
+        try:
+            flush()
+        except OSError:
+            pass
+
+
+def collect():
+    """Metrics of every process: our live shards plus the other processes' recent snapshots"""
+    counters, histograms = snapshot()
+    directory = _settings['dir']
+    if directory and os.path.isdir(directory):
+        own = f'{os.getpid()}.json'
+        oldest = time.time() - _settings['max_age']
+        for filename in os.listdir(directory):
+            if not filename.endswith('.json') or filename == own:
+                continue
+            path = os.path.join(directory, filename)
+            try:
+                if os.path.getmtime(path) < oldest:
+                    os.remove(path)
+                    continue
+                with open(path) as f:
+                    _merge_json(json.load(f), counters, histograms)
+            except (OSError, ValueError):
+                continue
+    return counters, histograms
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+def exposition():
+    """Render everything in the Prometheus text exposition format"""
+    counters, histograms = collect()
+    series = {}
+    for (name, labels), value in counters.items():
+        series.setdefault(name, []).append(f'{name}{_format_labels(labels)} {value}')
+    for (name, labels, buckets), hist in sorted(histograms.items()):
+        lines = series.setdefault(name, [])
+        cumulative = 0
+        for bound, count in zip(list(buckets) + ['+Inf'], hist[:-1]):
+            cumulative += count
+            lines.append(f'{name}_bucket{_format_labels(labels, [("le", bound)])} {cumulative}')
+        lines.append(f'{name}_sum{_format_labels(labels)} {hist[-1]}')
+        lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+
+    output = []
+    for name in sorted(series):
+        kind, help_text = _HELP.get(name, ('untyped', name))
+        output.append(f'# HELP {name} {help_text}')
+        output.append(f'# TYPE {name} {kind}')
+        output.extend(sorted(series[name]) if kind == 'counter' else series[name])
+    return '\n'.join(output) + '\n'
+
+
+def record_cache(view, hit):
+    inc('cache_requests_total', (('view', view), ('result', 'hit' if hit else 'miss')))
+
+
+def record_db(endpoint, queries, seconds):
+    labels = (('endpoint', endpoint),)
+    inc('db_queries_total', labels, queries)
+    inc('db_query_seconds_total', labels, seconds)
+
+
+def _start_timer():
+    g._metrics_start = time.perf_counter()
+
+
+def _record_request(response):
+    started = g.pop('_metrics_start', None)
+    if started is None or request.endpoint == 'metrics':
+        return response
+    endpoint = request.endpoint or 'unmatched'
+    blueprint = request.blueprint or ''
+    observe('http_request_duration_seconds', (('blueprint', blueprint), ('endpoint', endpoint), ('method', request.method)),
+            time.perf_counter() - started)
+    inc('http_requests_total', (('blueprint', blueprint), ('endpoint', endpoint), ('method', request.method),
+                                ('status', str(response.status_code))))
+    return response
+
+
+def metrics_view():
+    return Response(exposition(), mimetype='text/plain; version=0.0.4')
+
+
+def _configure(config):
+    _settings['dir'] = config.get('METRICS_DIR')
+    _settings['interval'] = config.get('METRICS_FLUSH_INTERVAL', 5.0)
+    _settings['max_age'] = config.get('METRICS_MAX_AGE', 300.0)
+
+
+def init_metrics(app):
+    """Time every request and serve /metrics"""
+    _configure(app.config)
+    app.before_request(_start_timer)
+    app.after_request(_record_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
+    _register_once('atexit', lambda: atexit.register(remove_snapshot))
+
+
+def init_celery_metrics(celery, config):
+    """Record task durations and outcomes through Celery's signals"""
+    from celery.signals import task_prerun, task_postrun, worker_process_shutdown
+    _configure(config)
+    if 'celery' in _hooked:
+        return
+    started = {}
+
+    def on_prerun(task_id=None, **kwargs):
+        started[task_id] = time.perf_counter()
+
+    def on_postrun(task_id=None, task=None, state=None, **kwargs):
+        start = started.pop(task_id, None)
+        name = getattr(task, 'name', 'unknown')
+        if start is not None:
+            observe('celery_task_duration_seconds', (('task', name),), time.perf_counter() - start, TASK_BUCKETS)
+        inc('celery_tasks_total', (('task', name), ('outcome', state or 'UNKNOWN')))
+        _maybe_flush()
+
+    task_prerun.connect(on_prerun, weak=False)
+    task_postrun.connect(on_postrun, weak=False)
+    # Pool processes leave through os._exit, which skips atexit
+    worker_process_shutdown.connect(lambda **kwargs: remove_snapshot(), weak=False)
+    _hooked.add('celery')
+    _register_once('atexit', lambda: atexit.register(remove_snapshot))
+
+
+def _register_once(name, register):
+    if name not in _hooked:
+        _hooked.add(name)
+        register()
+
+
+def remove_snapshot():
+    """Delete this process's snapshot file (on exit)"""
+    directory = _settings['dir']
+    if not directory:
+        return
+    try:
+        os.remove(os.path.join(directory, f'{os.getpid()}.json'))
+    except OSError:
+        pass
@@ -0,0 +1,260 @@
+"""
+Monthly activity reports, aggregated and rendered in bulk.
+
+Recipients (role 'user' with an email) are read in id-ordered chunks of
+``MONTHLY_REPORT_BATCH_SIZE`` with keyset pagination. For a chunk, one grouped
+query returns bookings, spend and hours per user and lot, which gives every
+total, the most used lot and the per-lot breakdown, and one more query loads
+the month's sessions with their lot joined for the table in the email. A chunk
+costs two round trips however many users or sessions it holds, instead of a
+history query plus a lot lookup per session for every user.
+
+Sessions still open count their hours up to ``now``, as before. The month-start
+job reports on the month that just ended.
+
+Reports for closed months are kept in ``monthly_report`` (aggregates as JSON
+plus the rendered HTML), so re-sending or viewing one is a primary-key read.
+The Celery report tasks fill the store; the report endpoints only read it and
+build a missing report on the fly without saving it, so a GET never writes.
+A report is only stored once every session in it has ended, and ORM inserts,
+updates and deletes of ParkingHistory drop the stored reports of the months
+they touch. Bulk Core writes to parking_history bypass those hooks and must
+call ``invalidate_monthly_reports()`` themselves.
+"""
+import json
+from collections import defaultdict
+from datetime import datetime
+import pytz
+from flask import current_app, render_template
+from flask_mail import Message
+from sqlalchemy import event, func, inspect, tuple_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import contains_eager
+from extensions import db
+from models.monthly_report import MonthlyReport
+from models.parking_history import ParkingHistory
+from models.parking_lot import ParkingLot
+from models.user import User
+
+IST = pytz.timezone('Asia/Kolkata')
+
+
+def month_range(month, year):
+    """[start, end) datetimes of a calendar month"""
+    start = datetime(year, month, 1)
+    end = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+    return start, end
+
+
+def is_closed(month, year, now=None):
+    """True once the month has ended, after which its reports are kept"""
+    return month_range(month, year)[1] <= (now or datetime.now())
+
+
+def previous_month(now=None):
+    """(month, year) of the month before `now`"""
+    now = now or datetime.now()
+    return (12, now.year - 1) if now.month == 1 else (now.month - 1, now.year)
+
+
+def report_recipients(chunk_size=None):
+    """Yield lists of up to `chunk_size` {id, full_name, email} dicts of users who get reports"""
+    chunk_size = chunk_size or current_app.config.get('MONTHLY_REPORT_BATCH_SIZE', 500)
+    query = db.session.query(User.id, User.full_name, User.email).filter(User.role == 'user', User.email != '')
+    last_id = 0
+    while True:
+        rows = query.filter(User.id > last_id).order_by(User.id).limit(chunk_size).all()
+        if rows:
+            yield [{'id': user_id, 'full_name': full_name, 'email': email} for user_id, full_name, email in rows]
+        if len(rows) < chunk_size:
+            return
+        last_id = rows[-1][0]
+
+
+def _in_month(user_ids, start, end):
+    return (
+        ParkingHistory.user_id.in_(user_ids),
+        ParkingHistory.parking_time >= start,
+        ParkingHistory.parking_time < end,
+    )
+
+
+def monthly_summaries(user_ids, month, year, now=None):
+    """
+    Per-user aggregates for the month from one grouped query:
+    {user_id: {total_bookings, open_sessions, total_spent, total_hours,
+    completed_sessions, avg_duration, most_used_lot, parking_lot_usage,
+    cost_breakdown}}.
+    Users without sessions are left out.
+    """
+    now = now or datetime.now()
+    start, end = month_range(month, year)
+    hours = (func.julianday(func.coalesce(ParkingHistory.released_time, now))
+             - func.julianday(ParkingHistory.parking_time)) * 24
+    bookings = func.count(ParkingHistory.id)
+    ended = func.count(ParkingHistory.released_time)
+    lot_name = func.coalesce(ParkingLot.name, 'Unknown')
+    rows = db.session.query(
+        ParkingHistory.user_id,
+        lot_name,
+        bookings,
+        ended,
+        func.sum(func.coalesce(ParkingHistory.total_cost, 0)),
+        func.sum(hours)
+    ).outerjoin(ParkingLot, ParkingLot.id == ParkingHistory.lot_id).filter(
+        *_in_month(user_ids, start, end)
+    ).group_by(ParkingHistory.user_id, ParkingHistory.lot_id).order_by(
+        ParkingHistory.user_id, bookings.desc(), lot_name
+    ).all()
+
+    summaries = {}
+    for user_id, lot_name, count, count_ended, spent, lot_hours in rows:
+        summary = summaries.get(user_id)
+        if summary is None:
+            # Rows come most used lot first for each user
+            summary = summaries[user_id] = {
+                'total_bookings': 0, 'open_sessions': 0, 'total_spent': 0.0, 'total_hours': 0.0,
+                'most_used_lot': lot_name, 'parking_lot_usage': [], 'cost_breakdown': []
+            }
+        summary['total_bookings'] += count
+        summary['open_sessions'] += count - count_ended
+        summary['total_spent'] += spent or 0
+        summary['total_hours'] += lot_hours or 0
+        summary['parking_lot_usage'].append({'name': lot_name, 'count': count})
+        summary['cost_breakdown'].append({'name': lot_name, 'cost': spent or 0})
+    for summary in summaries.values():
+        summary['completed_sessions'] = summary['total_bookings']
+        summary['avg_duration'] = summary['total_hours'] / summary['total_bookings']
+        summary['cost_breakdown'].sort(key=lambda item: item['cost'], reverse=True)
+    return summaries
+
+
+def monthly_records(user_ids, month, year):
+    """{user_id: [ParkingHistory newest first, lot loaded]} for the month"""
+    start, end = month_range(month, year)
+    records = ParkingHistory.query.outerjoin(ParkingHistory.lot).options(
+        contains_eager(ParkingHistory.lot)
+    ).filter(*_in_month(user_ids, start, end)).order_by(
+        ParkingHistory.user_id, ParkingHistory.parking_time.desc()
+    ).all()
+    by_user = defaultdict(list)
+    for record in records:
+        by_user[record.user_id].append(record)
+    return by_user
+
+
+def report_subject(month, year):
+    return f"Your {datetime(year, month, 1).strftime('%B %Y')} Parking Activity Report"
+
+
+def _recent_bookings(records, limit=5):
+    return [{
+        'lot': record.lot.name if record.lot else 'Unknown',
+        'spot_id': record.spot_id,
+        'parking_time': record.parking_time.isoformat() if record.parking_time else None,
+        'released_time': record.released_time.isoformat() if record.released_time else None,
+        'total_cost': record.total_cost,
+        'status': record.status
+    } for record in records[:limit]]
+
+
+def _build_reports(users, month, year, now):
+    """Unsaved MonthlyReports for user dicts (two queries) and the ids of those with open sessions"""
+    user_ids = [user['id'] for user in users]
+    summaries = monthly_summaries(user_ids, month, year, now)
+    records = monthly_records(user_ids, month, year)
+    now_ist = datetime.now(IST)
+    empty = {'total_bookings': 0, 'open_sessions': 0, 'total_spent': 0, 'total_hours': 0,
+             'completed_sessions': 0, 'avg_duration': 0, 'most_used_lot': 'N/A',
+             'parking_lot_usage': [], 'cost_breakdown': []}
+    reports, still_open = {}, set()
+    for user in users:
+        summary = summaries.get(user['id'], empty)
+        user_records = records.get(user['id'], [])
+        html = render_template(
+            'monthly_report.html',
+            user=user,
+            total_bookings=summary['total_bookings'],
+            total_spent=summary['total_spent'],
+            most_used_lot=summary['most_used_lot'],
+            records=user_records,
+            month=datetime(year, month, 1).strftime('%B'),
+            year=year,
+            current_time=now_ist.strftime('%I:%M %p'),
+            generated_date=now_ist.strftime('%B %d, %Y at %I:%M %p'),
+            avg_duration=summary['avg_duration'],
+            total_hours=summary['total_hours'],
+            completed_sessions=summary['completed_sessions'],
+            pytz=pytz,
+            datetime=datetime
+        )
+        data = dict(summary, recent_bookings=_recent_bookings(user_records))
+        reports[user['id']] = MonthlyReport(user_id=user['id'], year=year, month=month, data=json.dumps(data),
+                                            html=html, generated_at=datetime.utcnow())
+        if summary['open_sessions']:
+            still_open.add(user['id'])
+    return reports, still_open
+
+
+def monthly_reports(users, month, year, now=None, store=True):
+    """
+    {user_id: MonthlyReport} for {id, full_name, email} user dicts. Closed
+    months are read from the store (one query) and only missing reports are
+    built, then stored if none of their sessions is still open (unless
+    `store` is False).
+    """
+    now = now or datetime.now()
+    closed = is_closed(month, year, now)
+    reports = {}
+    if closed:
+        reports = {report.user_id: report for report in MonthlyReport.query.filter(
+            MonthlyReport.user_id.in_([user['id'] for user in users]),
+            MonthlyReport.year == year,
+            MonthlyReport.month == month
+        )}
+    missing = [user for user in users if user['id'] not in reports]
+    if missing:
+        built, still_open = _build_reports(missing, month, year, now)
+        reports.update(built)
+        final = [{
+            'user_id': report.user_id, 'year': year, 'month': month, 'data': report.data,
+            'html': report.html, 'generated_at': report.generated_at
+        } for user_id, report in built.items() if user_id not in still_open]
+        if store and closed and final:
+            db.session.execute(sqlite_insert(MonthlyReport).on_conflict_do_nothing(), final)
+            db.session.commit()
+    return reports
+
+
+def report_data(report):
+    return json.loads(report.data)
+
+
+def monthly_report_messages(users, month, year, now=None):
+    """One report Message per {id, full_name, email} user dict, stored or built in bulk"""
+    reports = monthly_reports(users, month, year, now)
+    subject = report_subject(month, year)
+    return [Message(subject=subject, recipients=[user['email']], html=reports[user['id']].html) for user in users]
+
+
+def invalidate_monthly_reports(connection, keys, now=None):
+    """Delete stored reports for (user_id, datetime in the month) pairs in closed months"""
+    now = now or datetime.now()
+    this_month = datetime(now.year, now.month, 1)
+    stale = {(user_id, moment.year, moment.month) for user_id, moment in keys
+             if user_id is not None and moment is not None and moment < this_month}
+    if stale:
+        connection.execute(MonthlyReport.__table__.delete().where(
+            tuple_(MonthlyReport.user_id, MonthlyReport.year, MonthlyReport.month).in_(stale)
+        ))
+
+
+def _history_changed(mapper, connection, target):
+    state = inspect(target)
+    user_ids = {target.user_id, *state.attrs.user_id.history.deleted}
+    moments = {target.parking_time, *state.attrs.parking_time.history.deleted}
+    invalidate_monthly_reports(connection, [(u, m) for u in user_ids for m in moments])
+
+
+for _event in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(ParkingHistory, _event, _history_changed)
@@ -0,0 +1,132 @@
+"""
+Per-lot occupancy history behind the admin heatmap.
+
+A Celery beat job copies every lot's occupancy counters into
+``occupancy_sample`` once per ``OCCUPANCY_SAMPLE_INTERVAL`` seconds (one
+INSERT ... SELECT, no spot or history scans). Raw samples are kept for
+``OCCUPANCY_RAW_RETENTION_DAYS``, then merged into hourly rows that are kept
+for ``OCCUPANCY_HOURLY_RETENTION_DAYS``. Rows store sums, minimums and maximums
+rather than averages, so stats over any mix of raw and hourly rows are exact.
+"""
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import Integer, cast, func, literal, select, true
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from extensions import db
+from models.occupancy_sample import OccupancySample
+from models.parking_lot import ParkingLot
+
+HOURLY = 3600
+DAY_NAMES = ['Sun', 'Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat']
+EPOCH = datetime(1970, 1, 1)
+
+_COLUMNS = ['lot_id', 'ts', 'resolution', 'samples', 'occupied_sum', 'occupied_min', 'occupied_max', 'capacity_sum']
+
+
+def _floor(moment, seconds):
+    offset = int((moment - EPOCH).total_seconds())
+    return EPOCH + timedelta(seconds=offset - offset % seconds)
+
+
+def sample_occupancy(now=None):
+    """Record every lot's current occupancy; repeated runs within one interval are ignored"""
+    interval = int(current_app.config.get('OCCUPANCY_SAMPLE_INTERVAL', 60))
+    ts = _floor(now or datetime.utcnow(), interval)
+    rows = select(
+        ParkingLot.id,
+        literal(ts, OccupancySample.ts.type),
+        literal(interval),
+        literal(1),
+        ParkingLot.occupied_count,
+        ParkingLot.occupied_count,
+        ParkingLot.occupied_count,
+        ParkingLot.total_spots
+    ).where(true())  # SQLite needs a WHERE before ON CONFLICT in INSERT ... SELECT
+    result = db.session.execute(sqlite_insert(OccupancySample).from_select(_COLUMNS, rows).on_conflict_do_nothing())
+    db.session.commit()
+    return result.rowcount
+
+
+def compact_occupancy(now=None):
+    """Merge raw samples past their retention into hourly rows and drop expired hourly rows"""
+    config = current_app.config
+    now = now or datetime.utcnow()
+    raw_cutoff = _floor(now - timedelta(days=config.get('OCCUPANCY_RAW_RETENTION_DAYS', 7)), HOURLY)
+    hourly_cutoff = now - timedelta(days=config.get('OCCUPANCY_HOURLY_RETENTION_DAYS', 400))
+
+    hour = func.strftime('%Y-%m-%d %H:00:00.000000', OccupancySample.ts)
+    raw = (OccupancySample.resolution < HOURLY, OccupancySample.ts < raw_cutoff)
+    rows = select(
+        OccupancySample.lot_id,
+        hour,
+        literal(HOURLY),
+        func.sum(OccupancySample.samples),
+        func.sum(OccupancySample.occupied_sum),
+        func.min(OccupancySample.occupied_min),
+        func.max(OccupancySample.occupied_max),
+        func.sum(OccupancySample.capacity_sum)
+    ).where(*raw).group_by(OccupancySample.lot_id, hour)
+    stmt = sqlite_insert(OccupancySample).from_select(_COLUMNS, rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[OccupancySample.lot_id, OccupancySample.ts, OccupancySample.resolution],
+        set_={
+            'samples': OccupancySample.samples + stmt.excluded.samples,
+            'occupied_sum': OccupancySample.occupied_sum + stmt.excluded.occupied_sum,
+            'occupied_min': func.min(OccupancySample.occupied_min, stmt.excluded.occupied_min),
+            'occupied_max': func.max(OccupancySample.occupied_max, stmt.excluded.occupied_max),
+            'capacity_sum': OccupancySample.capacity_sum + stmt.excluded.capacity_sum,
+        }
+    )
+    merged = db.session.execute(stmt).rowcount
+    removed = OccupancySample.query.filter(*raw).delete(synchronize_session=False)
+    expired = OccupancySample.query.filter(OccupancySample.ts < hourly_cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    return {'hourly_rows': merged, 'raw_removed': removed, 'expired': expired}
+
+
+def _in_range(query, start, end, lot_id):
+    query = query.filter(OccupancySample.ts >= start, OccupancySample.ts < end)
+    if lot_id:
+        query = query.filter(OccupancySample.lot_id == lot_id)
+    return query
+
+
+def occupancy_stats(start, end, lot_id=None):
+    """Min/max/average occupancy per lot over [start, end)"""
+    rows = _in_range(db.session.query(
+        ParkingLot.id,
+        ParkingLot.name,
+        func.min(OccupancySample.occupied_min),
+        func.max(OccupancySample.occupied_max),
+        func.sum(OccupancySample.occupied_sum),
+        func.sum(OccupancySample.samples),
+        func.sum(OccupancySample.capacity_sum)
+    ).join(OccupancySample, OccupancySample.lot_id == ParkingLot.id), start, end, lot_id).group_by(
+        ParkingLot.id
+    ).order_by(ParkingLot.id).all()
+    return [{
+        'lot_id': lid,
+        'lot_name': name,
+        'min_occupied': low,
+        'max_occupied': high,
+        'avg_occupied': round(occupied / samples, 2),
+        'avg_occupancy_rate': round(occupied / capacity, 4) if capacity else None,
+        'samples': samples
+    } for lid, name, low, high, occupied, samples, capacity in rows]
+
+
+def occupancy_heatmap(start, end, lot_id=None):
+    """Average occupancy rate by [day of week][hour of day], in local time"""
+    offset = int(current_app.config.get('OCCUPANCY_UTC_OFFSET_MINUTES', 0))
+    local = func.datetime(OccupancySample.ts, f'{offset:+d} minutes')
+    day = cast(func.strftime('%w', local), Integer)
+    hour = cast(func.strftime('%H', local), Integer)
+    rows = _in_range(db.session.query(
+        day, hour, func.sum(OccupancySample.occupied_sum), func.sum(OccupancySample.capacity_sum)
+    ), start, end, lot_id).group_by(day, hour).all()
+
+    rates = [[None] * 24 for _ in DAY_NAMES]
+    for d, h, occupied, capacity in rows:
+        if capacity:
+            rates[d][h] = round(occupied / capacity, 4)
+    return {'days': DAY_NAMES, 'utc_offset_minutes': offset, 'rates': rates}
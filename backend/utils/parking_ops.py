@@ -0,0 +1,118 @@
+"""
+Race-free state transitions for parking spots and vehicles.
+
+Every claim/release is a single conditional UPDATE checked by rowcount, so two
+gates racing for the same spot (or two unparks of the same vehicle) can never
+both win: the loser gets False back and should roll back and answer 409.
+
+Spot transitions also move the lot's ``occupied_count`` and ``state_version``
+and append to the lot's spot_change log in the same transaction, so they only
+change when the spot really changed.
+
+An occupied spot points at its active ParkingHistory row through
+``current_history_id`` (set by ``start_session``, cleared by ``release_spot``),
+so unpark and the admin spot details find the session by primary key.
+"""
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import update, insert, delete
+from extensions import db
+from models.parking_history import ParkingHistory
+from models.parking_lot import ParkingLot
+from models.parking_spot import ParkingSpot
+from models.spot_change import SpotChange
+from models.vehicle import Vehicle
+
+
+def _record_spot_change(lot_id, spot_id, occupied, plate):
+    version = db.session.execute(
+        update(ParkingLot)
+        .where(ParkingLot.id == lot_id)
+        .values(
+            occupied_count=ParkingLot.occupied_count + (1 if occupied else -1),
+            state_version=ParkingLot.state_version + 1
+        )
+        .returning(ParkingLot.state_version)
+        .execution_options(synchronize_session=False)
+    ).scalar_one()
+    db.session.execute(insert(SpotChange).values(
+        lot_id=lot_id, version=version, spot_id=spot_id, is_occupied=occupied, vehicle_plate=plate
+    ))
+    # Trim the log now and then rather than on every write
+    log_size = current_app.config.get('SPOT_CHANGE_LOG_SIZE', 1000)
+    if version % 100 == 0:
+        db.session.execute(delete(SpotChange).where(
+            SpotChange.lot_id == lot_id, SpotChange.version <= version - log_size
+        ))
+    return version
+
+
+def reset_spot_changes(lot_id):
+    """Bump a lot's version and drop its change log, forcing clients to take a full snapshot (lot resized)"""
+    db.session.execute(
+        update(ParkingLot)
+        .where(ParkingLot.id == lot_id)
+        .values(state_version=ParkingLot.state_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.execute(delete(SpotChange).where(SpotChange.lot_id == lot_id))
+
+
+def claim_spot(spot_id, lot_id, plate=None):
+    """Mark a free spot occupied; False if it was already taken"""
+    result = db.session.execute(
+        update(ParkingSpot)
+        .where(ParkingSpot.id == spot_id, ParkingSpot.lot_id == lot_id, ParkingSpot.is_occupied.isnot(True))
+        .values(is_occupied=True)
+    )
+    if result.rowcount != 1:
+        return False
+    _record_spot_change(lot_id, spot_id, True, plate)
+    return True
+
+
+def release_spot(spot_id, lot_id):
+    """Mark an occupied spot free and clear its session pointer; False if it was already free"""
+    result = db.session.execute(
+        update(ParkingSpot)
+        .where(ParkingSpot.id == spot_id, ParkingSpot.lot_id == lot_id, ParkingSpot.is_occupied.is_(True))
+        .values(is_occupied=False, current_history_id=None)
+    )
+    if result.rowcount != 1:
+        return False
+    _record_spot_change(lot_id, spot_id, False, None)
+    return True
+
+
+def start_session(user_id, vehicle_id, spot):
+    """Log the active session for a just-claimed spot and point the spot at it"""
+    history = ParkingHistory(
+        user_id=user_id, vehicle_id=vehicle_id, lot_id=spot.lot_id, spot_id=spot.id,
+        parking_time=datetime.utcnow(), status='active'
+    )
+    db.session.add(history)
+    db.session.flush()
+    db.session.execute(
+        update(ParkingSpot).where(ParkingSpot.id == spot.id).values(current_history_id=history.id)
+    )
+    return history
+
+
+def claim_vehicle(vehicle_id, spot_id):
+    """Put an unparked vehicle into a spot; False if it is already parked"""
+    result = db.session.execute(
+        update(Vehicle)
+        .where(Vehicle.id == vehicle_id, Vehicle.spot_id.is_(None))
+        .values(spot_id=spot_id)
+    )
+    return result.rowcount == 1
+
+
+def release_vehicle(vehicle_id, spot_id):
+    """Take a vehicle out of its spot; False if it was already taken out"""
+    result = db.session.execute(
+        update(Vehicle)
+        .where(Vehicle.id == vehicle_id, Vehicle.spot_id == spot_id)
+        .values(spot_id=None)
+    )
+    return result.rowcount == 1
@@ -0,0 +1,128 @@
+"""
+Per-request SQL statement counting, budgets and N+1 detection.
+
+Engine event hooks on ``db.engine`` count every statement and its time while a
+request is being handled. After the request:
+- ``X-DB-Query-Count`` / ``X-DB-Time-ms`` response headers are set
+- a structured ``db_stats`` log line is written
+- the endpoint's budget (``SQL_QUERY_BUDGETS``, falling back to
+  ``SQL_QUERY_BUDGET_DEFAULT``) is checked
+- statements with the same shape (literals and IN-lists collapsed) issued
+  ``SQL_REPEAT_THRESHOLD`` or more times are flagged as a likely N+1
+
+Violations are logged as warnings, or raised as QueryBudgetExceeded when
+``SQL_QUERY_BUDGET_STRICT`` is on (the test harness turns it on).
+"""
+import json
+import re
+import time
+from collections import Counter
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from extensions import db
+from utils import metrics
+
+_IN_LIST = re.compile(r'\(\s*\?(\s*,\s*\?)+\s*\)')
+_NUMBER = re.compile(r'\b\d+\b')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_SPACE = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = Counter()
+
+    def record(self, statement, seconds):
+        self.count += 1
+        self.seconds += seconds
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold):
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+
+def statement_shape(statement):
+    """A statement with literals and IN-lists collapsed, so N+1 loops compare equal"""
+    shape = _STRING.sub('?', statement)
+    shape = _NUMBER.sub('?', shape)
+    shape = _IN_LIST.sub('(?)', shape)
+    return _SPACE.sub(' ', shape).strip()
+
+
+def current_stats():
+    """The running QueryStats for this request, or None outside a request"""
+    return g.get('_query_stats') if has_request_context() else None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_stats_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['query_stats_start'].pop()
+    stats = current_stats()
+    if stats is not None:
+        stats.record(statement, time.perf_counter() - started)
+
+
+def _handle_error(context):
+    if context.connection is not None and context.connection.info.get('query_stats_start'):
+        context.connection.info['query_stats_start'].pop()
+
+
+def _start_request():
+    g._query_stats = QueryStats()
+
+
+def _finish_request(response):
+    stats = g.pop('_query_stats', None)
+    if stats is None:
+        return response
+    config = current_app.config
+    elapsed_ms = stats.seconds * 1000
+    response.headers['X-DB-Query-Count'] = str(stats.count)
+    response.headers['X-DB-Time-ms'] = f'{elapsed_ms:.2f}'
+
+    endpoint = request.endpoint or request.path
+    metrics.record_db(endpoint, stats.count, stats.seconds)
+    budget = config.get('SQL_QUERY_BUDGETS', {}).get(endpoint, config.get('SQL_QUERY_BUDGET_DEFAULT'))
+    repeated = stats.repeated(config.get('SQL_REPEAT_THRESHOLD', 10))
+    current_app.logger.info('db_stats %s', json.dumps({
+        'endpoint': endpoint,
+        'method': request.method,
+        'status': response.status_code,
+        'queries': stats.count,
+        'db_ms': round(elapsed_ms, 2),
+        'budget': budget,
+        'repeated': [{'shape': shape[:200], 'count': n} for shape, n in repeated],
+    }))
+
+    problems = []
+    if budget is not None and stats.count > budget:
+        problems.append(f'{endpoint} ran {stats.count} SQL statements, budget is {budget}')
+    for shape, n in repeated:
+        problems.append(f'{endpoint} ran the same statement {n} times (likely N+1): {shape[:200]}')
+    if problems:
+        if config.get('SQL_QUERY_BUDGET_STRICT'):
+            raise QueryBudgetExceeded('; '.join(problems))
+        for problem in problems:
+            current_app.logger.warning(problem)
+    return response
+
+
+def init_query_stats(app):
+    """Hook the engine events and request handlers for `app`"""
+    with app.app_context():
+        engine = db.engine
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(engine, 'handle_error', _handle_error)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
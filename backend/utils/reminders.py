@@ -0,0 +1,79 @@
+"""
+Daily parking reminders, selected and rendered in bulk.
+
+Users who need a reminder (role 'user', no session started today) come from a
+single anti-join query, read in id-ordered chunks of ``REMINDER_BATCH_SIZE``
+with keyset pagination, so a chunk is one round trip however many users there
+are. Each chunk carries everything the email needs (name, address and whether
+the user still has an open session), so a batch task only has to load the
+active lots once and render.
+"""
+from datetime import datetime, time, timedelta
+from flask import current_app, render_template
+from flask_mail import Message
+from sqlalchemy import exists
+from extensions import db
+from models.parking_history import ParkingHistory
+from models.parking_lot import ParkingLot
+from models.user import User
+
+REMINDER_SUBJECT = "Daily Parking Reminder - Book Your Spot!"
+
+
+def _recipients_query(day):
+    day_start = datetime.combine(day, time.min)
+    parked_today = exists().where(
+        ParkingHistory.user_id == User.id,
+        ParkingHistory.parking_time >= day_start,
+        ParkingHistory.parking_time < day_start + timedelta(days=1)
+    )
+    has_open_session = exists().where(
+        ParkingHistory.user_id == User.id,
+        ParkingHistory.released_time.is_(None)
+    )
+    return db.session.query(User.id, User.full_name, User.email, has_open_session).filter(
+        User.role == 'user',
+        User.email != '',
+        ~parked_today
+    )
+
+
+def reminder_recipients(day, chunk_size=None):
+    """
+    Yield lists of up to `chunk_size` recipients (JSON-serializable dicts,
+    ready to pass to a Celery task) who have not parked on `day`
+    """
+    chunk_size = chunk_size or current_app.config.get('REMINDER_BATCH_SIZE', 500)
+    query = _recipients_query(day)
+    last_id = 0
+    while True:
+        rows = query.filter(User.id > last_id).order_by(User.id).limit(chunk_size).all()
+        if rows:
+            yield [{
+                'id': user_id,
+                'full_name': full_name,
+                'email': email,
+                'has_active_session': bool(active)
+            } for user_id, full_name, email, active in rows]
+        if len(rows) < chunk_size:
+            return
+        last_id = rows[-1][0]
+
+
+def reminder_messages(recipients, now=None):
+    """One reminder Message per recipient dict, sharing one lot query and request context"""
+    now = now or datetime.now()
+    available_lots = ParkingLot.query.filter_by(is_active=True).order_by(ParkingLot.id).all()
+    messages = []
+    with current_app.test_request_context():
+        for recipient in recipients:
+            html_content = render_template(
+                'daily_reminder.html',
+                user=recipient,
+                available_lots=available_lots,
+                has_active_session=recipient['has_active_session'],
+                current_time=now.strftime("%I:%M %p"),
+                current_date=now.strftime("%B %d, %Y")
+            )
+            messages.append(Message(subject=REMINDER_SUBJECT, recipients=[recipient['email']], html=html_content))
+    return messages
@@ -0,0 +1,126 @@
+"""
+Revenue aggregation in SQL.
+
+A completed session earns its recorded ``total_cost``; sessions closed without
+one (or with 0) fall back to duration x the lot's hourly price, as the old
+Python loops did with ``total_cost or duration_hours * price_per_hour``.
+
+Time series are served from the ``revenue_daily`` rollup (one row per lot and
+UTC release day), which unpark updates in its own transaction and
+``backfill_revenue_daily`` rebuilds from the history.
+"""
+from sqlalchemy import func, insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from extensions import db
+from models.parking_history import ParkingHistory
+from models.parking_lot import ParkingLot
+from models.revenue_daily import RevenueDaily
+
+PERIOD_FORMATS = {
+    'daily': '%Y-%m-%d',
+    'weekly': '%Y-%W',
+    'monthly': '%Y-%m',
+}
+
+
+def session_hours():
+    """SQL expression for one completed ParkingHistory row's duration in hours"""
+    return (func.julianday(ParkingHistory.released_time) - func.julianday(ParkingHistory.parking_time)) * 24
+
+
+def session_revenue(price_per_hour=ParkingLot.price_per_hour):
+    """SQL expression for one completed ParkingHistory row's revenue"""
+    return func.coalesce(func.nullif(ParkingHistory.total_cost, 0), session_hours() * price_per_hour)
+
+
+def completed_sessions(start=None, end=None):
+    """Conditions for completed sessions released in [start, end)"""
+    conditions = [
+        ParkingHistory.status == 'out',
+        ParkingHistory.parking_time.isnot(None),
+        ParkingHistory.released_time.isnot(None),
+    ]
+    if start is not None:
+        conditions.append(ParkingHistory.released_time >= start)
+    if end is not None:
+        conditions.append(ParkingHistory.released_time < end)
+    return conditions
+
+
+def revenue_per_lot(start=None, end=None):
+    """(lot_id, lot_name, revenue) for every lot, one GROUP BY over the history"""
+    # Aggregate in a single pass over the history, then attach every lot
+    totals = db.session.query(
+        ParkingHistory.lot_id.label('lot_id'),
+        func.sum(session_revenue()).label('revenue')
+    ).join(ParkingLot, ParkingLot.id == ParkingHistory.lot_id).filter(
+        *completed_sessions(start, end)
+    ).group_by(ParkingHistory.lot_id).subquery()
+    return db.session.query(
+        ParkingLot.id,
+        ParkingLot.name,
+        func.coalesce(totals.c.revenue, 0.0)
+    ).outerjoin(totals, totals.c.lot_id == ParkingLot.id).order_by(ParkingLot.id).all()
+
+
+def record_completed_session(lot_id, parking_time, released_time, revenue):
+    """Add one completed session to its day in the rollup, in the caller's transaction"""
+    stmt = sqlite_insert(RevenueDaily).values(
+        lot_id=lot_id,
+        day=released_time.date(),
+        revenue=revenue,
+        sessions=1,
+        hours=(released_time - parking_time).total_seconds() / 3600
+    )
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[RevenueDaily.lot_id, RevenueDaily.day],
+        set_={
+            'revenue': RevenueDaily.revenue + stmt.excluded.revenue,
+            'sessions': RevenueDaily.sessions + stmt.excluded.sessions,
+            'hours': RevenueDaily.hours + stmt.excluded.hours,
+        }
+    ))
+
+
+def backfill_revenue_daily(start=None, end=None):
+    """Rebuild the rollup days in [start, end) (all of them by default); returns the rows written"""
+    stale = RevenueDaily.query
+    if start is not None:
+        stale = stale.filter(RevenueDaily.day >= start.date())
+    if end is not None:
+        stale = stale.filter(RevenueDaily.day < end.date())
+    stale.delete(synchronize_session=False)
+
+    day = func.date(ParkingHistory.released_time)
+    rows = db.session.query(
+        ParkingHistory.lot_id,
+        day,
+        func.sum(session_revenue()),
+        func.count(),
+        func.sum(session_hours())
+    ).join(ParkingLot, ParkingLot.id == ParkingHistory.lot_id).filter(
+        *completed_sessions(start, end)
+    ).group_by(ParkingHistory.lot_id, day)
+    result = db.session.execute(insert(RevenueDaily).from_select(
+        ['lot_id', 'day', 'revenue', 'sessions', 'hours'], rows
+    ))
+    db.session.commit()
+    return result.rowcount
+
+
+def revenue_series(period='daily', lot_id=None, start=None, end=None):
+    """(period, revenue, sessions, hours) rows from the rollup, oldest first"""
+    bucket = func.strftime(PERIOD_FORMATS[period], RevenueDaily.day)
+    query = db.session.query(
+        bucket,
+        func.sum(RevenueDaily.revenue),
+        func.sum(RevenueDaily.sessions),
+        func.sum(RevenueDaily.hours)
+    )
+    if lot_id:
+        query = query.filter(RevenueDaily.lot_id == lot_id)
+    if start is not None:
+        query = query.filter(RevenueDaily.day >= start.date())
+    if end is not None:
+        query = query.filter(RevenueDaily.day < end.date())
+    return query.group_by(bucket).order_by(bucket).all()
@@ -0,0 +1,98 @@
+"""
+Substring search for the admin user, lot and spot searches.
+
+Each searchable table has an external-content SQLite FTS5 table with the
+``trigram`` tokenizer, kept in step by AFTER INSERT/UPDATE/DELETE triggers, so
+searches never load the base table into Python. A query of three or more
+characters is a trigram phrase MATCH (case-insensitive substring) answered from
+the index in rowid order; shorter queries fall back to LIKE over the indexed
+columns, which FTS5 can only serve with a scan, but they stop at the page limit.
+
+The tables and triggers are created by the search-index migration and, for
+databases built with ``db.create_all()``, by ``ensure_search_index()``. They are
+not in the models' metadata, so migrations/env.py passes
+``include_in_migrations`` to Alembic to keep autogenerate from dropping them
+(and the ``_data``/``_idx``/``_docsize``/``_config`` tables FTS5 adds).
+"""
+import re
+from sqlalchemy import column, or_, table, text
+from extensions import db
+
+# base table -> (search table, indexed columns)
+SEARCH_INDEXES = {
+    'user': ('user_search', ('full_name', 'email')),
+    'parking_lot': ('lot_search', ('name', 'address', 'pincode', 'location')),
+    'parking_spot': ('spot_search', ('spot_number',)),
+}
+
+MIN_MATCH_LENGTH = 3
+
+# Search tables (*_search) and their FTS5 shadow tables (*_search_*)
+_SEARCH_TABLE_NAME = re.compile(r'^\w+_search(_\w+)?$')
+
+_SEARCH_TABLES = dict(
+    (base, table(index, column('rowid'), column(index), *(column(c) for c in columns)))
+    for base, (index, columns) in SEARCH_INDEXES.items()
+)
+
+
+def search_index_ddl(base, index, columns):
+    """CREATE statements for one search table and its sync triggers"""
+    cols = ', '.join(columns)
+    new = ', '.join(f'new.{c}' for c in columns)
+    old = ', '.join(f'old.{c}' for c in columns)
+    delete_old = f"INSERT INTO {index}({index}, rowid, {cols}) VALUES ('delete', old.id, {old});"
+    insert_new = f"INSERT INTO {index}(rowid, {cols}) VALUES (new.id, {new});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5("
+        f"{cols}, content='{base}', content_rowid='id', tokenize='trigram')",
+        f'CREATE TRIGGER IF NOT EXISTS {index}_ai AFTER INSERT ON "{base}" BEGIN {insert_new} END',
+        f'CREATE TRIGGER IF NOT EXISTS {index}_ad AFTER DELETE ON "{base}" BEGIN {delete_old} END',
+        f'CREATE TRIGGER IF NOT EXISTS {index}_au AFTER UPDATE OF {cols} ON "{base}" '
+        f'BEGIN {delete_old} {insert_new} END',
+    ]
+
+
+def include_in_migrations(object, name, type_, reflected, compare_to):
+    """Alembic include_object hook that leaves the search tables out of autogenerate"""
+    if type_ == 'table':
+        return not _SEARCH_TABLE_NAME.match(name)
+    table_name = getattr(getattr(object, 'table', None), 'name', None)
+    return not (table_name and _SEARCH_TABLE_NAME.match(table_name))
+
+
+def ensure_search_index():
+    """Create any missing search table (filled from its base table) and triggers"""
+    for base, (index, columns) in SEARCH_INDEXES.items():
+        exists = db.session.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': index}
+        ).scalar()
+        for statement in search_index_ddl(base, index, columns):
+            db.session.execute(text(statement))
+        if not exists:
+            db.session.execute(text(f"INSERT INTO {index}({index}) VALUES ('rebuild')"))
+    db.session.commit()
+
+
+def search_table(base):
+    """Lightweight table construct for querying the search table of `base`"""
+    return _SEARCH_TABLES[base]
+
+
+def match_condition(base, query_str, columns=None):
+    """WHERE clause on search_table(base) for rows containing query_str in any of `columns`"""
+    index, all_columns = SEARCH_INDEXES[base]
+    fts = search_table(base)
+    columns = columns or all_columns
+    if len(query_str) >= MIN_MATCH_LENGTH:
+        phrase = '"' + query_str.replace('"', '""') + '"'
+        if columns != all_columns:
+            phrase = '{' + ' '.join(columns) + '} : ' + phrase
+        return fts.c[index].op('MATCH')(phrase)
+    return or_(*(fts.c[c].contains(query_str, autoescape=True) for c in columns))
+
+
+def matching_ids(base, query_str, columns=None):
+    """SELECT of the ids of base rows matching query_str, in id order"""
+    fts = search_table(base)
+    return db.select(fts.c.rowid).where(match_condition(base, query_str, columns)).order_by(fts.c.rowid)
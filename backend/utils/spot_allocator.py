@@ -0,0 +1,120 @@
+"""
+Per-lot free-spot allocator used by auto-park.
+
+Each lot is kept as a bitmap (a Python int) where bit ``n`` is set while spot
+number ``n`` is free, so the lowest free spot is picked with a couple of
+word-level int operations instead of a sorted scan over ``parking_spot``.
+
+The bitmap lives in process memory, one set per database engine (so apps
+sharing a process, like the tests, never see each other's lots), and is loaded
+lazily from the database with a single column query. The database stays the
+source of truth: callers must still claim the spot they get back, call
+``invalidate`` when the claim fails (another worker parked in the meantime), and
+fall back to ``lowest_free_spot`` when the bitmap has nothing usable, since
+spots freed by other workers only show up in it after a reload.
+"""
+import threading
+import weakref
+from sqlalchemy import cast, Integer
+from extensions import db
+from models.parking_spot import ParkingSpot
+
+_lock = threading.Lock()
+# engine -> {lot_id: _LotState}
+_engines = weakref.WeakKeyDictionary()
+
+
+class _LotState:
+    __slots__ = ('free', 'spot_ids')
+
+    def __init__(self):
+        self.free = 0
+        self.spot_ids = {}
+
+
+def _spot_index(spot_number):
+    try:
+        return int(spot_number)
+    except (TypeError, ValueError):
+        return None
+
+
+def _load_lot(lot_id):
+    state = _LotState()
+    rows = db.session.query(
+        ParkingSpot.id, ParkingSpot.spot_number, ParkingSpot.is_occupied
+    ).filter(ParkingSpot.lot_id == lot_id).all()
+    for spot_id, spot_number, is_occupied in rows:
+        index = _spot_index(spot_number)
+        if index is None:
+            continue
+        state.spot_ids[index] = spot_id
+        if not is_occupied:
+            state.free |= 1 << index
+    return state
+
+
+def _lots():
+    engine = db.engine
+    with _lock:
+        lots = _engines.get(engine)
+        if lots is None:
+            lots = _engines[engine] = {}
+    return lots
+
+
+def _get_state(lot_id):
+    lots = _lots()
+    state = lots.get(lot_id)
+    if state is None:
+        # Load outside the lock, the first loader to finish wins
+        loaded = _load_lot(lot_id)
+        with _lock:
+            state = lots.setdefault(lot_id, loaded)
+    return state
+
+
+def lowest_free_spot(lot_id):
+    """Id of the lot's lowest-numbered free spot straight from the database, or None if it is full"""
+    return db.session.query(ParkingSpot.id).filter(
+        ParkingSpot.lot_id == lot_id, ParkingSpot.is_occupied.isnot(True)
+    ).order_by(cast(ParkingSpot.spot_number, Integer)).limit(1).scalar()
+
+
+def reserve(lot_id):
+    """Reserve the lowest-numbered free spot of a lot and return its id, or None if the lot is full"""
+    state = _get_state(lot_id)
+    with _lock:
+        free = state.free
+        if not free:
+            return None
+        lowest = free & -free
+        state.free = free ^ lowest
+        return state.spot_ids[lowest.bit_length() - 1]
+
+
+def mark_occupied(lot_id, spot_number):
+    """Clear a spot from the free bitmap (parked through another path)"""
+    index = _spot_index(spot_number)
+    state = _lots().get(lot_id)
+    if state is None or index is None:
+        return
+    with _lock:
+        state.free &= ~(1 << index)
+
+
+def release(lot_id, spot_number):
+    """Put a spot back into the free bitmap (unparked, or a reservation was abandoned)"""
+    index = _spot_index(spot_number)
+    state = _lots().get(lot_id)
+    if state is None or index is None or index not in state.spot_ids:
+        return
+    with _lock:
+        state.free |= 1 << index
+
+
+def invalidate(lot_id):
+    """Drop a lot's bitmap so it is reloaded on next use (lot resized, deleted, or found stale)"""
+    lots = _lots()
+    with _lock:
+        lots.pop(lot_id, None)
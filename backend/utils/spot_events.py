@@ -0,0 +1,130 @@
+"""
+Spot state change feed behind the /events SSE endpoints.
+
+park/unpark/auto-park publish a compact event after their commit. Events carry
+a monotonically increasing id so a reconnecting client (Last-Event-ID) gets
+only what it missed, as long as it is still in the retained backlog.
+
+Two interchangeable buses:
+- RedisEventBus: a capped Redis stream, shared by every worker process
+  (used when SPOT_EVENTS_REDIS_URL is set).
+- LocalEventBus: an in-process ring buffer, for single-process/dev setups.
+"""
+import itertools
+import json
+import threading
+from collections import deque
+from flask import current_app
+
+EVENTS_STREAM = 'spot_events'
+
+
+class LocalEventBus:
+    def __init__(self, backlog):
+        self._events = deque(maxlen=backlog)
+        self._ids = itertools.count(1)
+        self._cond = threading.Condition()
+        self._last_id = 0
+
+    def publish(self, event):
+        with self._cond:
+            self._last_id = next(self._ids)
+            self._events.append((self._last_id, event))
+            self._cond.notify_all()
+        return str(self._last_id)
+
+    def last_id(self):
+        return str(self._last_id)
+
+    def is_retained(self, cursor):
+        """True if every event after `cursor` is still in the backlog"""
+        with self._cond:
+            oldest = self._events[0][0] if self._events else self._last_id + 1
+            # A cursor ahead of us was issued before a restart
+            return oldest - 1 <= int(cursor) <= self._last_id
+
+    def read(self, cursor, timeout):
+        """Events after `cursor`, waiting up to `timeout` seconds for new ones"""
+        cursor = int(cursor)
+        with self._cond:
+            if self._last_id <= cursor:
+                self._cond.wait(timeout)
+            if not self._events:
+                return []
+            # Ids are contiguous, so skip straight to the first unseen event
+            start = max(cursor + 1 - self._events[0][0], 0)
+            return [(str(event_id), event) for event_id, event in itertools.islice(self._events, start, None)]
+
+
+class RedisEventBus:
+    def __init__(self, url, backlog, client=None):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self._redis = client
+        self._backlog = backlog
+
+    def publish(self, event):
+        event_id = self._redis.xadd(EVENTS_STREAM, {'e': json.dumps(event)}, maxlen=self._backlog, approximate=True)
+        return event_id.decode()
+
+    def last_id(self):
+        last = self._redis.xrevrange(EVENTS_STREAM, count=1)
+        return last[0][0].decode() if last else '0-0'
+
+    def is_retained(self, cursor):
+        """
+        True if every event after `cursor` is still in the stream. Redis 7
+        reports the newest trimmed id, and a cursor at or past it missed
+        nothing; older servers only give the first entry, so the cursor must
+        reach it. A cursor past the newest id (the stream was flushed or
+        recreated) is not retained either.
+        """
+        from redis.exceptions import ResponseError
+        position = _stream_id(cursor)
+        try:
+            info = self._redis.xinfo_stream(EVENTS_STREAM)
+        except ResponseError:
+            # No stream: nothing published yet, or it was flushed
+            return position == (0, 0)
+        if position > _stream_id(info['last-generated-id']):
+            return False
+        trimmed = info.get('max-deleted-entry-id')
+        if trimmed is not None:
+            return position >= _stream_id(trimmed)
+        first = info.get('first-entry')
+        return first is None or position >= _stream_id(first[0])
+
+    def read(self, cursor, timeout):
+        result = self._redis.xread({EVENTS_STREAM: cursor}, count=500, block=int(timeout * 1000))
+        if not result:
+            return []
+        return [(event_id.decode(), json.loads(fields[b'e'])) for event_id, fields in result[0][1]]
+
+
+def _stream_id(value):
+    if isinstance(value, bytes):
+        value = value.decode()
+    ms, _, seq = value.partition('-')
+    return int(ms), int(seq or 0)
+
+
+def get_event_bus():
+    app = current_app._get_current_object()
+    bus = app.extensions.get('spot_events')
+    if bus is None:
+        backlog = app.config.get('SPOT_EVENTS_BACKLOG', 10000)
+        url = app.config.get('SPOT_EVENTS_REDIS_URL')
+        bus = RedisEventBus(url, backlog) if url else LocalEventBus(backlog)
+        app.extensions['spot_events'] = bus
+    return bus
+
+
+def publish_spot_change(spot, occupied, plate=None):
+    """Publish a spot change; never fails the request that made the change"""
+    event = {'lot_id': spot.lot_id, 'spot_id': spot.id, 'occupied': occupied, 'plate': plate}
+    try:
+        return get_event_bus().publish(event)
+    except Exception as e:
+        current_app.logger.warning(f"Failed to publish spot event: {e}")
+        return None
@@ -0,0 +1,70 @@
+"""
+Spot list payloads for the user and admin lot endpoints.
+
+Both come from one column query (spot + parked plate via an outer join)
+instead of loading ParkingSpot objects and lazy-loading each spot's vehicle.
+
+The compact ``?format=bitmap`` payload encodes occupancy for large lots as:
+- ``bitmap``: base64 bitset, bit i (MSB first within each byte) set when the
+  i-th spot in spot-number order is occupied
+- ``spot_ids``: [first_id, length] runs giving the id of each spot index
+- ``spot_numbers``: null when the numbers are simply 1..count, else the list
+- ``plates``: sparse [index, plate] pairs for the parked spots
+"""
+import base64
+from extensions import db
+from models.parking_spot import ParkingSpot
+from models.vehicle import Vehicle
+
+
+def _spot_columns(lot_id):
+    return db.session.query(
+        ParkingSpot.id, ParkingSpot.spot_number, ParkingSpot.is_occupied, Vehicle.license_plate
+    ).outerjoin(Vehicle, Vehicle.spot_id == ParkingSpot.id).filter(ParkingSpot.lot_id == lot_id).all()
+
+
+def _number_order(row):
+    spot_number = row[1]
+    return (0, int(spot_number), row[0]) if spot_number.isdigit() else (1, 0, row[0])
+
+
+def lot_spot_rows(lot_id, numeric_order=False):
+    """A lot's spots with their parked plate"""
+    rows = _spot_columns(lot_id)
+    rows.sort(key=_number_order if numeric_order else (lambda row: row[0]))
+    return [{
+        'id': spot_id,
+        'spot_number': spot_number,
+        'is_occupied': is_occupied,
+        'vehicle_plate': plate
+    } for spot_id, spot_number, is_occupied, plate in rows]
+
+
+def lot_spot_bitmap(lot_id):
+    """A lot's occupancy as a base64 bitset plus sparse plates, see module docstring"""
+    rows = _spot_columns(lot_id)
+    rows.sort(key=_number_order)
+
+    bits = bytearray((len(rows) + 7) // 8)
+    plates = []
+    spot_id_runs = []
+    sequential_numbers = True
+    for index, (spot_id, spot_number, is_occupied, plate) in enumerate(rows):
+        if is_occupied:
+            bits[index >> 3] |= 0x80 >> (index & 7)
+        if plate:
+            plates.append([index, plate])
+        if spot_id_runs and spot_id_runs[-1][0] + spot_id_runs[-1][1] == spot_id:
+            spot_id_runs[-1][1] += 1
+        else:
+            spot_id_runs.append([spot_id, 1])
+        if sequential_numbers and spot_number != str(index + 1):
+            sequential_numbers = False
+
+    return {
+        'count': len(rows),
+        'bitmap': base64.b64encode(bytes(bits)).decode('ascii'),
+        'spot_ids': spot_id_runs,
+        'spot_numbers': None if sequential_numbers else [row[1] for row in rows],
+        'plates': plates
+    }